@@ -0,0 +1,86 @@
+"""Micro-benchmark: dict rows + per-field mapping vs. compiled RowDecoder.
+
+Run from the repository root:
+
+    python -m benchmarks.row_decoding [rows]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.db.timestamps import from_epoch_ms
+from src.bot_photo.models import Session
+from src.bot_photo.repositories.sessions import SessionRepository
+
+QUERY = "SELECT * FROM sessions WHERE user_id=? ORDER BY created_at DESC"
+
+
+def _dict_row_to_session(row: dict[str, Any]) -> Session:
+    """The per-row mapping repositories used before RowDecoder."""
+    return Session(
+        id=row["id"],
+        user_id=row["user_id"],
+        style=row["style"],
+        prompt=row.get("prompt"),
+        status=row["status"],
+        result_path=row.get("result_path"),
+        result_file_id=row.get("result_file_id"),
+        tokens_spent=row.get("tokens_spent"),
+        created_at=from_epoch_ms(row.get("created_at")),
+        updated_at=from_epoch_ms(row.get("updated_at")),
+    )
+
+
+async def _seed(db: Database, rows: int) -> None:
+    await db.execute("INSERT INTO users(telegram_id) VALUES(1)")
+    async with db.transaction():
+        for index in range(rows):
+            await db.execute(
+                "INSERT INTO sessions(user_id, style, prompt, status, tokens_spent, result_path)"
+                " VALUES(1, 'dubai_rooftop', ?, 'ready', 5, ?)",
+                (f"prompt {index}", f"storage/sessions/{index}.jpg"),
+            )
+
+
+async def _best_of(repeats: int, run) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+async def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db", read_pool_size=1, slow_query_ms=0)
+        await db.connect()
+        await MigrationRunner(db).run()
+        await _seed(db, rows)
+        repo = SessionRepository(db)
+
+        async def dict_rows() -> None:
+            result = await db.fetchall(QUERY, (1,))
+            [_dict_row_to_session(row) for row in result]
+
+        async def decoded_rows() -> None:
+            await db.fetchall_as(repo._decoder, QUERY, (1,))
+
+        baseline = await _best_of(3, dict_rows)
+        compiled = await _best_of(3, decoded_rows)
+        await db.close()
+
+    print(f"rows:            {rows}")
+    print(f"dict + mapping:  {baseline * 1000:8.1f} ms")
+    print(f"RowDecoder:      {compiled * 1000:8.1f} ms")
+    print(f"speedup:         {baseline / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
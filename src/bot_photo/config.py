@@ -29,7 +29,54 @@ class Settings(BaseSettings):
     nano_banana_fallback_model: str | None = Field(
         None, alias="NANO_BANANA_FALLBACK_MODEL"
     )
+    nano_banana_concurrency: int = Field(4, alias="NANO_BANANA_CONCURRENCY")
+    nano_banana_max_concurrency: int = Field(16, alias="NANO_BANANA_MAX_CONCURRENCY")
+    nano_banana_queue_timeout_seconds: float = Field(120.0, alias="NANO_BANANA_QUEUE_TIMEOUT_SECONDS")
+    nano_banana_retry_attempts: int = Field(3, alias="NANO_BANANA_RETRY_ATTEMPTS")
+    nano_banana_retry_base_seconds: float = Field(1.0, alias="NANO_BANANA_RETRY_BASE_SECONDS")
+    nano_banana_retry_max_seconds: float = Field(20.0, alias="NANO_BANANA_RETRY_MAX_SECONDS")
+    nano_banana_deadline_seconds: float = Field(240.0, alias="NANO_BANANA_DEADLINE_SECONDS")
+    nano_banana_breaker_failure_rate: float = Field(0.5, alias="NANO_BANANA_BREAKER_FAILURE_RATE")
+    nano_banana_breaker_slow_seconds: float = Field(90.0, alias="NANO_BANANA_BREAKER_SLOW_SECONDS")
+    nano_banana_breaker_open_seconds: float = Field(30.0, alias="NANO_BANANA_BREAKER_OPEN_SECONDS")
+    nano_banana_hedge_enabled: bool = Field(False, alias="NANO_BANANA_HEDGE_ENABLED")
+    nano_banana_hedge_percentile: float = Field(0.95, alias="NANO_BANANA_HEDGE_PERCENTILE")
+    nano_banana_hedge_budget: float = Field(0.1, alias="NANO_BANANA_HEDGE_BUDGET")
+    nano_banana_face_cache_mb: float = Field(64, alias="NANO_BANANA_FACE_CACHE_MB")
+    nano_banana_face_cache_entry_mb: float = Field(1.0, alias="NANO_BANANA_FACE_CACHE_ENTRY_MB")
     database_path: Path = Field(_default_path("var/app.db"), alias="DATABASE_PATH")
+    database_read_pool_size: int = Field(4, alias="DATABASE_READ_POOL_SIZE")
+    database_group_commit_ms: float = Field(5.0, alias="DATABASE_GROUP_COMMIT_MS")
+    database_slow_query_ms: float = Field(200.0, alias="DATABASE_SLOW_QUERY_MS")
+    database_maintenance_seconds: float = Field(30.0, alias="DATABASE_MAINTENANCE_SECONDS")
+    database_wal_checkpoint_mb: float = Field(4.0, alias="DATABASE_WAL_CHECKPOINT_MB")
+    database_wal_truncate_mb: float = Field(64.0, alias="DATABASE_WAL_TRUNCATE_MB")
+    database_optimize_hours: float = Field(6.0, alias="DATABASE_OPTIMIZE_HOURS")
+    user_cache_size: int = Field(10_000, alias="USER_CACHE_SIZE")
+    user_cache_ttl_seconds: float = Field(60.0, alias="USER_CACHE_TTL_SECONDS")
+    last_seen_flush_seconds: float = Field(5.0, alias="LAST_SEEN_FLUSH_SECONDS")
+    fsm_cache_size: int = Field(5_000, alias="FSM_CACHE_SIZE")
+    fsm_flush_seconds: float = Field(1.0, alias="FSM_FLUSH_SECONDS")
+    fsm_state_ttl_hours: float = Field(72.0, alias="FSM_STATE_TTL_HOURS")
+    backup_dir: Path = Field(_default_path("var/backups"), alias="BACKUP_DIR")
+    backup_interval_hours: float = Field(24.0, alias="BACKUP_INTERVAL_HOURS")
+    backup_keep: int = Field(7, alias="BACKUP_KEEP")
+    backup_pages_per_step: int = Field(256, alias="BACKUP_PAGES_PER_STEP")
+    backup_step_pause_ms: float = Field(5.0, alias="BACKUP_STEP_PAUSE_MS")
+    backup_upload_s3: bool = Field(False, alias="BACKUP_UPLOAD_S3")
+    generation_workers: int = Field(4, alias="GENERATION_WORKERS")
+    generation_max_attempts: int = Field(3, alias="GENERATION_MAX_ATTEMPTS")
+    # None: the smallest package sold with priority generation (see handlers.payment.PACKAGES).
+    generation_priority_min_tokens: int | None = Field(None, alias="GENERATION_PRIORITY_MIN_TOKENS")
+    generation_aging_seconds: float = Field(60.0, alias="GENERATION_AGING_SECONDS")
+    retention_interval_minutes: float = Field(60.0, alias="RETENTION_INTERVAL_MINUTES")
+    retention_batch_size: int = Field(500, alias="RETENTION_BATCH_SIZE")
+    retention_usage_events_days: int = Field(30, alias="RETENTION_USAGE_EVENTS_DAYS")
+    retention_sessions_days: int = Field(0, alias="RETENTION_SESSIONS_DAYS")
+    retention_prompts_days: int = Field(0, alias="RETENTION_PROMPTS_DAYS")
+    retention_archive_path: Path | None = Field(
+        _default_path("var/archive.db"), alias="RETENTION_ARCHIVE_PATH"
+    )
     faces_path: Path = Field(_default_path("storage/faces"), alias="FACES_PATH")
     sessions_path: Path = Field(_default_path("storage/sessions"), alias="SESSIONS_PATH")
     examples_path: Path = Field(_default_path("repo/examples"), alias="EXAMPLES_PATH")
@@ -42,10 +89,18 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     @field_validator(
-        "database_path", "faces_path", "sessions_path", "examples_path", mode="before"
+        "database_path",
+        "faces_path",
+        "sessions_path",
+        "examples_path",
+        "retention_archive_path",
+        "backup_dir",
+        mode="before",
     )
     @classmethod
-    def expand_path(cls, value: str | Path) -> Path:
+    def expand_path(cls, value: str | Path | None) -> Path | None:
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
         path = Path(value).expanduser()
         if not path.is_absolute():
             path = ROOT_DIR / path
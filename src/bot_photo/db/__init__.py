@@ -1,3 +1,26 @@
+from .backup import BackupError, BackupManager, BackupResult
 from .database import Database
+from .maintenance import MaintenanceScheduler, MaintenanceStats
+from .migrator import Migration, MigrationRunner
+from .pool import PoolStats, ReaderPool
+from .retention import RetentionEngine, RetentionPolicy, RetentionReport, TableRetention
+from .stats import QueryStats, StatementSummary
 
-__all__ = ["Database"]
+__all__ = [
+    "BackupError",
+    "BackupManager",
+    "BackupResult",
+    "Database",
+    "MaintenanceScheduler",
+    "MaintenanceStats",
+    "Migration",
+    "MigrationRunner",
+    "PoolStats",
+    "QueryStats",
+    "ReaderPool",
+    "RetentionEngine",
+    "RetentionPolicy",
+    "RetentionReport",
+    "StatementSummary",
+    "TableRetention",
+]
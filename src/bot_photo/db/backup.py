@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import aiosqlite
+
+from .database import Database
+
+if TYPE_CHECKING:
+    from ..storage import S3Storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class BackupResult:
+    path: Path
+    pages: int
+    size_bytes: int
+    elapsed_ms: float
+    s3_url: str | None = None
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+class BackupManager:
+    """Scheduled online snapshots of the main database.
+
+    Each run copies the live database with ``Database.backup`` into
+    ``<directory>/<name>-<UTC timestamp>.db``, verifies the copy opens and
+    passes ``PRAGMA integrity_check`` before it replaces anything, keeps the
+    newest ``keep`` snapshots and optionally uploads a gzip copy to S3
+    (retention of remote copies is left to bucket lifecycle rules).
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        directory: Path,
+        *,
+        name: str = "app",
+        keep: int = 7,
+        interval_hours: float = 24,
+        pages_per_step: int = 256,
+        step_pause_ms: float = 5,
+        s3: S3Storage | None = None,
+        s3_prefix: str = "backups/",
+    ) -> None:
+        self._db = db
+        self._directory = directory
+        self._name = name
+        self._keep = max(keep, 1)
+        self._interval = interval_hours * 3600
+        self._pages_per_step = pages_per_step
+        self._step_pause_ms = step_pause_ms
+        self._s3 = s3
+        self._s3_prefix = s3_prefix
+        self._run_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self.last_result: BackupResult | None = None
+
+    def snapshots(self) -> list[Path]:
+        """Existing snapshots, oldest first (timestamps sort lexicographically)."""
+        return sorted(self._directory.glob(f"{self._name}-*.db"))
+
+    def start(self) -> None:
+        if self._interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> BackupResult:
+        async with self._run_lock:
+            started = time.perf_counter()
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+            final = self._directory / f"{self._name}-{stamp}.db"
+            partial = final.with_suffix(".db.partial")
+            try:
+                pages = await self._db.backup(
+                    partial,
+                    pages_per_step=self._pages_per_step,
+                    step_pause_ms=self._step_pause_ms,
+                )
+                await self.verify(partial)
+            except BaseException:
+                partial.unlink(missing_ok=True)
+                raise
+            partial.replace(final)
+            result = BackupResult(
+                path=final,
+                pages=pages,
+                size_bytes=final.stat().st_size,
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+            )
+            self._rotate()
+            if self._s3 is not None:
+                result.s3_url = await self._upload(final)
+            self.last_result = result
+            return result
+
+    async def verify(self, path: Path) -> None:
+        """Open a snapshot the way a restore would and check it is usable."""
+        expected = await self._db.fetchval("SELECT MAX(version) FROM schema_version")
+        async with aiosqlite.connect(f"file:{path.as_posix()}?mode=ro", uri=True) as conn:
+            async with conn.execute("PRAGMA integrity_check") as cursor:
+                problems = [row[0] for row in await cursor.fetchall()]
+            async with conn.execute("SELECT MAX(version) FROM schema_version") as cursor:
+                row = await cursor.fetchone()
+        if problems != ["ok"]:
+            raise BackupError(f"Snapshot {path.name} failed integrity check: {problems[:5]}")
+        if row is None or row[0] != expected:
+            raise BackupError(
+                f"Snapshot {path.name} has schema version {row[0] if row else None}, expected {expected}"
+            )
+
+    def _rotate(self) -> None:
+        for path in self.snapshots()[: -self._keep]:
+            path.unlink(missing_ok=True)
+
+    async def _upload(self, path: Path) -> str | None:
+        # Compressed and sent through files, so memory doesn't grow with the database.
+        compressed = path.with_name(f"{path.name}.gz.partial")
+        try:
+            await asyncio.to_thread(_gzip_file, path, compressed)
+            return await self._s3.upload_file(
+                compressed,
+                f"{self._s3_prefix}{path.name}.gz",
+                content_type="application/gzip",
+                public=False,  # snapshots hold user data; never public-read
+            )
+        except Exception:
+            # Uploading is best effort; the verified local snapshot is kept either way.
+            logger.exception("Failed to upload backup %s", path.name)
+            return None
+        finally:
+            compressed.unlink(missing_ok=True)
+
+    def _first_delay(self) -> float:
+        snapshots = self.snapshots()
+        if not snapshots:
+            return 0
+        age = time.time() - snapshots[-1].stat().st_mtime
+        return max(self._interval - age, 0)
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(self._first_delay())
+        while True:
+            try:
+                result = await self.run_once()
+                logger.info(
+                    "Backup %s written: %s pages, %.1f MiB in %.0f ms",
+                    result.path.name,
+                    result.pages,
+                    result.size_bytes / 1024 / 1024,
+                    result.elapsed_ms,
+                )
+            except Exception:
+                logger.exception("Database backup failed")
+            await asyncio.sleep(self._interval)
+
+
+def _gzip_file(source: Path, destination: Path) -> None:
+    with source.open("rb") as raw, gzip.open(destination, "wb") as packed:
+        shutil.copyfileobj(raw, packed, 1024 * 1024)
+
+
+__all__ = ["BackupError", "BackupManager", "BackupResult"]
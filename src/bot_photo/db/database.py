@@ -1,64 +1,359 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, AsyncIterator, Callable, Iterable, TypeVar
 
 import aiosqlite
 
+from .decoders import RowDecoder
+from .pool import PoolStats, ReaderPool
+from .stats import QueryStats
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_READ_STATEMENTS = {"select", "explain", "values"}
+_WRITE_STATEMENTS = {"insert", "update", "delete", "replace"}
+
+# PRAGMAs that only report on the database file, with or without an argument.
+_READ_PRAGMAS = {
+    "collation_list",
+    "compile_options",
+    "data_version",
+    "database_list",
+    "foreign_key_check",
+    "foreign_key_list",
+    "freelist_count",
+    "function_list",
+    "index_info",
+    "index_list",
+    "index_xinfo",
+    "integrity_check",
+    "module_list",
+    "page_count",
+    "pragma_list",
+    "quick_check",
+    "table_info",
+    "table_list",
+    "table_xinfo",
+}
+# Database-wide settings: reading them is fine, an argument or "=" sets them.
+_SETTING_PRAGMAS = {
+    "application_id",
+    "auto_vacuum",
+    "encoding",
+    "journal_mode",
+    "page_size",
+    "schema_version",
+    "user_version",
+}
+
+# Comments, string literals and quoted identifiers, so their text can't
+# pass for a keyword.
+_NOISE = re.compile(
+    r"--[^\n]*|/\*.*?(?:\*/|$)|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]",
+    re.DOTALL,
+)
+_TOKEN = re.compile(r"[a-z_][a-z0-9_$]*|[()=.;]")
+
+
+def _is_read_query(query: str) -> bool:
+    """True when the statement can run on a query-only reader connection."""
+    tokens = _TOKEN.findall(_NOISE.sub(" ", query.lower()))
+    if not tokens:
+        return False
+    keyword = tokens[0]
+    if keyword == "pragma":
+        return _is_read_pragma(tokens[1:])
+    if keyword == "with":
+        keyword = _main_statement(tokens[1:])
+    return keyword in _READ_STATEMENTS and "returning" not in tokens
+
+
+def _main_statement(tokens: list[str]) -> str:
+    """First top-level statement keyword after a WITH clause's CTEs."""
+    depth = 0
+    for token in tokens:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and (token in _READ_STATEMENTS or token in _WRITE_STATEMENTS):
+            return token
+    return ""
+
+
+def _is_read_pragma(tokens: list[str]) -> bool:
+    # PRAGMA [schema.]name [= value | (value)]
+    if len(tokens) >= 2 and tokens[1] == ".":
+        tokens = tokens[2:]
+    if not tokens:
+        return False
+    name, rest = tokens[0], [token for token in tokens[1:] if token != ";"]
+    if name in _READ_PRAGMAS:
+        return "=" not in rest
+    return name in _SETTING_PRAGMAS and not rest
+
+
+@dataclass(slots=True)
+class _PendingWrite:
+    query: str
+    args: tuple[Any, ...]
+    future: asyncio.Future[list[dict[str, Any]]]
+    queued_at: float
+
+
+@dataclass(slots=True)
+class _Transaction:
+    owner: asyncio.Task[Any] | None
+    depth: int = 0
+    on_exit: list[Callable[[], None]] = field(default_factory=list)
+
 
 class Database:
-    """Small async wrapper around aiosqlite."""
+    """Small async wrapper around aiosqlite.
 
-    def __init__(self, path: Path) -> None:
+    Writes go through one serialized writer connection; plain reads are
+    served by a pool of query-only connections so they run concurrently.
+    With ``group_commit_ms`` > 0 writes issued within that window are
+    committed together in one transaction. ``transaction()`` groups several
+    repository calls into one atomic unit of work.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        read_pool_size: int = 4,
+        group_commit_ms: float = 0,
+        slow_query_ms: float = 200,
+    ) -> None:
         self._path = path
         self._conn: aiosqlite.Connection | None = None
         self._lock = asyncio.Lock()
+        self._readers = ReaderPool(path, read_pool_size)
+        self._group_commit_delay = max(group_commit_ms, 0) / 1000
+        self._pending_writes: list[_PendingWrite] = []
+        self._flusher: asyncio.Task[None] | None = None
+        self.query_stats = QueryStats(slow_query_ms)
+        self._explain_tasks: set[asyncio.Task[None]] = set()
+        self._last_write = time.monotonic()
+        self._transaction: ContextVar[_Transaction | None] = ContextVar(
+            f"db_transaction_{id(self)}", default=None
+        )
 
     async def connect(self) -> None:
         if self._conn:
             return
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = await aiosqlite.connect(self._path.as_posix())
+        # Autocommit mode: transactions are opened explicitly where needed.
+        self._conn = await aiosqlite.connect(self._path.as_posix(), isolation_level=None)
         self._conn.row_factory = aiosqlite.Row
         await self._conn.execute("PRAGMA foreign_keys=ON;")
+        # Readers only run concurrently with the writer in WAL mode.
+        await self._conn.execute("PRAGMA journal_mode=WAL;")
+        await self._readers.open()
 
     async def close(self) -> None:
+        if self._flusher:
+            await self._flusher
+            self._flusher = None
+        # Slow-query EXPLAINs use the connections that are about to close.
+        for task in self._explain_tasks:
+            task.cancel()
+        await asyncio.gather(*self._explain_tasks, return_exceptions=True)
+        await self._readers.close()
         if self._conn:
             await self._conn.close()
             self._conn = None
 
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def idle_seconds(self) -> float:
+        """Time since the last write was issued; used to spot quiet periods."""
+        return time.monotonic() - self._last_write
+
     @property
     def connection(self) -> aiosqlite.Connection:
         if not self._conn:
             raise RuntimeError("Database is not initialized")
         return self._conn
 
-    async def run_script(self, script_path: Path) -> None:
+    def pool_stats(self) -> PoolStats:
+        return self._readers.stats()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._current_transaction() is not None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Run the enclosed statements atomically on the writer.
+
+        Every ``execute``/``fetch*`` made by the same task inside the block
+        (including through repositories) joins the transaction; nested
+        blocks become savepoints. The writer lock is held until the block
+        exits, so keep network calls outside of it.
+        """
+        current = self._current_transaction()
+        if current is not None:
+            async with self._savepoint(current):
+                yield
+            return
         async with self._lock:
-            with script_path.open("r", encoding="utf-8") as file:
-                script = file.read()
-            await self.connection.executescript(script)
-            await self.connection.commit()
+            conn = self.connection
+            await conn.execute("BEGIN IMMEDIATE")
+            current = _Transaction(owner=asyncio.current_task())
+            token = self._transaction.set(current)
+            try:
+                yield
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            else:
+                try:
+                    await conn.execute("COMMIT")
+                except Exception:
+                    if conn.in_transaction:
+                        await conn.execute("ROLLBACK")
+                    raise
+            finally:
+                self._transaction.reset(token)
+                for callback in current.on_exit:
+                    callback()
 
-    async def execute(self, query: str, params: Iterable[Any] | None = None) -> None:
+    def after_transaction(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` once the current transaction commits or rolls back.
+
+        Outside a transaction it runs immediately. Used to drop cached state
+        that a rolled back or not yet committed write may have touched.
+        """
+        current = self._current_transaction()
+        if current is None:
+            callback()
+        else:
+            current.on_exit.append(callback)
+
+    @asynccontextmanager
+    async def _savepoint(self, current: _Transaction) -> AsyncIterator[None]:
+        conn = self.connection
+        current.depth += 1
+        name = f"nested_{current.depth}"
+        await conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            await conn.execute(f"ROLLBACK TO {name}")
+            await conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            await conn.execute(f"RELEASE {name}")
+        finally:
+            current.depth -= 1
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Hold the writer lock and hand out the raw connection.
+
+        For maintenance work that needs statements which can't run inside
+        a transaction (PRAGMAs, checkpoints); regular code should use
+        ``execute``/``transaction()``.
+        """
+        if self.in_transaction:
+            raise RuntimeError("writer() can't be used inside a transaction")
         async with self._lock:
-            await self.connection.execute(query, tuple(params or ()))
-            await self.connection.commit()
+            yield self.connection
+
+    def _current_transaction(self) -> _Transaction | None:
+        current = self._transaction.get()
+        # Tasks spawned inside a transaction inherit the context but not the lock.
+        if current is not None and current.owner is asyncio.current_task():
+            return current
+        return None
+
+    async def backup(
+        self, target: Path, *, pages_per_step: int = 256, step_pause_ms: float = 5
+    ) -> int:
+        """Copy the database into ``target`` with the SQLite online backup API.
+
+        The copy runs on a dedicated connection that holds one read
+        transaction, so it is a consistent WAL snapshot: the writer is never
+        locked out and its commits don't restart the backup. Pages are copied
+        ``pages_per_step`` at a time with a pause between steps. Returns the
+        number of pages copied.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.unlink(missing_ok=True)
+        pause = max(step_pause_ms, 0) / 1000
+        copied = 0
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal copied
+            copied = total
+            if pause and remaining:
+                # Runs on the backup connection's thread, not on the event loop.
+                time.sleep(pause)
+
+        source = await aiosqlite.connect(self._path.as_posix(), isolation_level=None)
+        try:
+            await source.execute("BEGIN")
+            # The snapshot is taken by the first read, not by BEGIN.
+            async with source.execute("SELECT COUNT(*) FROM sqlite_master") as cursor:
+                await cursor.fetchall()
+            destination = await aiosqlite.connect(target.as_posix(), check_same_thread=False)
+            try:
+                await source.backup(destination, pages=max(pages_per_step, 1), progress=progress)
+                # Make the copy a single self-contained file.
+                await destination.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                await destination.close()
+            await source.execute("ROLLBACK")
+        finally:
+            await source.close()
+        return copied
+
+    async def execute(self, query: str, params: Iterable[Any] | None = None) -> None:
+        await self._write(query, tuple(params or ()))
+
+    async def execute_returning(
+        self, query: str, params: Iterable[Any] | None = None
+    ) -> dict[str, Any] | None:
+        """Run a write with a RETURNING clause on the writer and return its first row."""
+        rows = await self._write(query, tuple(params or ()))
+        return rows[0] if rows else None
 
     async def fetchone(
         self, query: str, params: Iterable[Any] | None = None
     ) -> dict[str, Any] | None:
-        async with self.connection.execute(query, tuple(params or ())) as cursor:
-            row = await cursor.fetchone()
-            return dict(row) if row else None
+        rows = await self._fetch(query, params, limit=1)
+        return rows[0] if rows else None
 
     async def fetchall(
         self, query: str, params: Iterable[Any] | None = None
     ) -> list[dict[str, Any]]:
-        async with self.connection.execute(query, tuple(params or ())) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        return await self._fetch(query, params)
+
+    async def fetchone_as(
+        self, decoder: RowDecoder[T], query: str, params: Iterable[Any] | None = None
+    ) -> T | None:
+        rows = await self._fetch(query, params, limit=1, decoder=decoder)
+        return rows[0] if rows else None
+
+    async def fetchall_as(
+        self, decoder: RowDecoder[T], query: str, params: Iterable[Any] | None = None
+    ) -> list[T]:
+        """Like ``fetchall`` but maps tuple rows straight into the decoder's dataclass."""
+        return await self._fetch(query, params, decoder=decoder)
 
     async def fetchval(
         self, query: str, params: Iterable[Any] | None = None
@@ -67,3 +362,160 @@ class Database:
         if row:
             return next(iter(row.values()))
         return None
+
+    async def _fetch(
+        self,
+        query: str,
+        params: Iterable[Any] | None,
+        limit: int | None = None,
+        decoder: RowDecoder[Any] | None = None,
+    ) -> list[Any]:
+        args = tuple(params or ())
+        queued_at = time.perf_counter()
+        if self.in_transaction:
+            rows = await self._run_fetch(self.connection, query, args, None, queued_at, decoder)
+            return rows[:limit] if limit else rows
+        if self._readers.size and _is_read_query(query):
+            async with self._readers.acquire() as conn:
+                return await self._run_fetch(conn, query, args, limit, queued_at, decoder)
+        if _is_read_query(query):
+            async with self._lock:
+                return await self._run_fetch(
+                    self.connection, query, args, limit, queued_at, decoder
+                )
+        # Writes with RETURNING are stepped to completion before the commit.
+        rows = await self._write(query, args)
+        if decoder is not None:
+            rows = [decoder.decode_mapping(row) for row in rows]
+        return rows[:limit] if limit else rows
+
+    async def _write(self, query: str, args: tuple[Any, ...]) -> list[dict[str, Any]]:
+        queued_at = time.perf_counter()
+        self._last_write = time.monotonic()
+        if self.in_transaction:
+            return await self._run_fetch(self.connection, query, args, None, queued_at)
+        if self._group_commit_delay <= 0:
+            async with self._lock:
+                return await self._run_fetch(self.connection, query, args, None, queued_at)
+        pending = _PendingWrite(
+            query, args, asyncio.get_running_loop().create_future(), queued_at
+        )
+        self._pending_writes.append(pending)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_writes())
+        return await pending.future
+
+    async def _flush_writes(self) -> None:
+        await asyncio.sleep(self._group_commit_delay)
+        async with self._lock:
+            while self._pending_writes:
+                batch, self._pending_writes = self._pending_writes, []
+                await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: list[_PendingWrite]) -> None:
+        """Run a batch in one transaction; a failing statement only fails its caller."""
+        conn = self.connection
+        results: list[list[dict[str, Any]] | BaseException | None] = []
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            for pending in batch:
+                if pending.future.done():
+                    # The caller went away before its turn.
+                    results.append(None)
+                    continue
+                await conn.execute("SAVEPOINT group_write")
+                try:
+                    results.append(
+                        await self._run_fetch(
+                            conn, pending.query, pending.args, None, pending.queued_at
+                        )
+                    )
+                except Exception as exc:
+                    await conn.execute("ROLLBACK TO group_write")
+                    results.append(exc)
+                await conn.execute("RELEASE group_write")
+            started = time.perf_counter()
+            await conn.execute("COMMIT")
+            self.query_stats.record("COMMIT", (time.perf_counter() - started) * 1000)
+        except Exception as exc:
+            if conn.in_transaction:
+                await conn.execute("ROLLBACK")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(exc)
+            return
+        for pending, result in zip(batch, results):
+            if result is None or pending.future.done():
+                continue
+            if isinstance(result, BaseException):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    async def _run_fetch(
+        self,
+        conn: aiosqlite.Connection,
+        query: str,
+        args: tuple[Any, ...],
+        limit: int | None,
+        queued_at: float,
+        decoder: RowDecoder[Any] | None = None,
+    ) -> list[Any]:
+        started = time.perf_counter()
+        result: list[Any] = []
+        failed = False
+        try:
+            async with conn.execute(query, args) as cursor:
+                if decoder is not None:
+                    # Plain tuples: the decoder resolves column positions once per layout.
+                    cursor.row_factory = None
+                    raw = await (cursor.fetchmany(limit) if limit else cursor.fetchall())
+                    if raw:
+                        columns = [column[0] for column in cursor.description]
+                        result = decoder.decode_rows(columns, raw)
+                elif limit == 1:
+                    row = await cursor.fetchone()
+                    result = [dict(row)] if row else []
+                else:
+                    result = [dict(row) for row in await cursor.fetchall()]
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            slow = self.query_stats.record(
+                query,
+                elapsed_ms,
+                rows=len(result),
+                lock_wait_ms=(started - queued_at) * 1000,
+                error=failed,
+            )
+            if slow:
+                task = asyncio.get_running_loop().create_task(
+                    self._log_slow_query(query, args, elapsed_ms)
+                )
+                self._explain_tasks.add(task)
+                task.add_done_callback(self._explain_tasks.discard)
+
+    async def _log_slow_query(self, query: str, args: tuple[Any, ...], elapsed_ms: float) -> None:
+        plan = "-"
+        try:
+            explain = f"EXPLAIN QUERY PLAN {query}"
+            if self._readers.size:
+                async with self._readers.acquire() as conn:
+                    async with conn.execute(explain, args) as cursor:
+                        rows = await cursor.fetchall()
+            else:
+                async with self._lock:
+                    async with self.connection.execute(explain, args) as cursor:
+                        rows = await cursor.fetchall()
+            plan = "; ".join(row["detail"] for row in rows) or "-"
+        except Exception:  # pragma: no cover - diagnostics only
+            logger.debug("EXPLAIN failed for slow query", exc_info=True)
+        logger.warning(
+            "Slow query (%.1f ms): %s | plan: %s", elapsed_ms, " ".join(query.split()), plan
+        )
+
+
+__all__ = ["Database"]
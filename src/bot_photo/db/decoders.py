@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, Callable, Generic, Mapping, Sequence, TypeVar
+
+T = TypeVar("T")
+
+Converter = Callable[[Any], Any]
+
+
+class RowDecoder(Generic[T]):
+    """Builds dataclass instances straight from tuple rows.
+
+    The first time a column layout is seen, field positions are resolved
+    and a small constructor function is generated for it; later rows with
+    the same layout skip name lookups and intermediate dicts entirely.
+    """
+
+    def __init__(self, model: type[T], converters: Mapping[str, Converter] | None = None) -> None:
+        if not dataclasses.is_dataclass(model):
+            raise TypeError(f"{model!r} is not a dataclass")
+        self._model = model
+        self._fields = [field for field in dataclasses.fields(model) if field.init]
+        self._converters = dict(converters or {})
+        self._compiled: dict[tuple[str, ...], Callable[[Sequence[Any]], T]] = {}
+
+    def compile(self, columns: Sequence[str]) -> Callable[[Sequence[Any]], T]:
+        key = tuple(columns)
+        decode = self._compiled.get(key)
+        if decode is None:
+            decode = self._compiled[key] = self._build(key)
+        return decode
+
+    def decode_rows(self, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> list[T]:
+        decode = self.compile(columns)
+        return [decode(row) for row in rows]
+
+    def decode_mapping(self, row: Mapping[str, Any]) -> T:
+        """Decode a dict row (e.g. from ``execute_returning``) with the same converters."""
+        columns = tuple(row)
+        return self.compile(columns)(tuple(row.values()))
+
+    def _build(self, columns: tuple[str, ...]) -> Callable[[Sequence[Any]], T]:
+        positions = {name: index for index, name in enumerate(columns)}
+        namespace: dict[str, Any] = {"_model": self._model}
+        arguments: list[str] = []
+        for field in self._fields:
+            index = positions.get(field.name)
+            if index is None:
+                if field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING:
+                    raise KeyError(f"Column {field.name!r} missing for {self._model.__name__}")
+                continue
+            value = f"row[{index}]"
+            converter = self._converters.get(field.name)
+            if converter is not None:
+                namespace[f"_convert_{field.name}"] = converter
+                value = f"_convert_{field.name}({value})"
+            arguments.append(f"{field.name}={value}")
+        source = f"def decode(row):\n    return _model({', '.join(arguments)})\n"
+        exec(source, namespace)  # noqa: S102 - generated from dataclass field names only
+        return namespace["decode"]
+
+
+__all__ = ["RowDecoder"]
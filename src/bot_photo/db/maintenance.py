@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+_MIB = 1024 * 1024
+
+
+@dataclass(slots=True)
+class MaintenanceStats:
+    wal_bytes: int = 0
+    max_wal_bytes: int = 0
+    checkpoints: int = 0
+    truncating_checkpoints: int = 0
+    busy_checkpoints: int = 0
+    last_checkpoint_ms: float = 0.0
+    max_checkpoint_ms: float = 0.0
+    optimize_runs: int = 0
+    last_optimize_ms: float = 0.0
+    vacuumed_pages: int = 0
+
+
+class MaintenanceScheduler:
+    """Keeps the WAL bounded and planner statistics fresh.
+
+    Every ``check_seconds`` it looks at the ``-wal`` file: above
+    ``passive_wal_mb`` it runs a PASSIVE checkpoint (never waits on readers
+    or writers); above ``truncate_wal_mb``, once the database has been quiet
+    for ``quiet_seconds``, a TRUNCATE checkpoint that also shrinks the file.
+    ``PRAGMA optimize`` and a bounded ``incremental_vacuum`` run every
+    ``optimize_hours``, also only in a quiet period.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        check_seconds: float = 30,
+        passive_wal_mb: float = 4,
+        truncate_wal_mb: float = 64,
+        quiet_seconds: float = 10,
+        optimize_hours: float = 6,
+        vacuum_pages: int = 1000,
+    ) -> None:
+        self._db = db
+        self._check_interval = check_seconds
+        self._passive_bytes = int(passive_wal_mb * _MIB)
+        self._truncate_bytes = int(truncate_wal_mb * _MIB)
+        self._quiet_seconds = quiet_seconds
+        self._optimize_interval = optimize_hours * 3600
+        self._vacuum_pages = vacuum_pages
+        self._last_optimize = time.monotonic()
+        self._task: asyncio.Task[None] | None = None
+        self.stats = MaintenanceStats()
+
+    def wal_size(self) -> int:
+        wal = self._db.path.with_name(self._db.path.name + "-wal")
+        try:
+            return wal.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    async def start(self) -> None:
+        if self._check_interval <= 0:
+            return
+        # Lets SQLite shrink the WAL after checkpoints that reset it.
+        async with self._db.writer() as conn:
+            await conn.execute(f"PRAGMA journal_size_limit={self._truncate_bytes}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> None:
+        wal_bytes = self.wal_size()
+        self.stats.wal_bytes = wal_bytes
+        self.stats.max_wal_bytes = max(self.stats.max_wal_bytes, wal_bytes)
+        quiet = self._db.idle_seconds >= self._quiet_seconds
+        if wal_bytes >= self._truncate_bytes and quiet:
+            await self.checkpoint("TRUNCATE")
+        elif wal_bytes >= self._passive_bytes:
+            await self.checkpoint("PASSIVE")
+        if quiet and time.monotonic() - self._last_optimize >= self._optimize_interval:
+            await self.optimize()
+
+    async def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int]:
+        """Run ``PRAGMA wal_checkpoint`` and return SQLite's (busy, log, checkpointed)."""
+        if mode not in {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}:
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        async with self._db.writer() as conn:
+            started = time.perf_counter()
+            async with conn.execute(f"PRAGMA wal_checkpoint({mode})") as cursor:
+                row = await cursor.fetchone()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        busy, log_pages, checkpointed = (int(value) for value in row) if row else (0, 0, 0)
+        self._db.query_stats.record(f"PRAGMA wal_checkpoint({mode})", elapsed_ms)
+        self.stats.checkpoints += 1
+        self.stats.truncating_checkpoints += mode == "TRUNCATE"
+        self.stats.busy_checkpoints += bool(busy)
+        self.stats.last_checkpoint_ms = elapsed_ms
+        self.stats.max_checkpoint_ms = max(self.stats.max_checkpoint_ms, elapsed_ms)
+        self.stats.wal_bytes = self.wal_size()
+        logger.debug(
+            "WAL checkpoint %s: %s/%s pages in %.1f ms%s",
+            mode,
+            checkpointed,
+            log_pages,
+            elapsed_ms,
+            " (busy)" if busy else "",
+        )
+        return busy, log_pages, checkpointed
+
+    async def optimize(self) -> None:
+        async with self._db.writer() as conn:
+            started = time.perf_counter()
+            # Bounded ANALYZE of tables whose statistics went stale.
+            await conn.execute("PRAGMA analysis_limit=400")
+            await conn.execute("PRAGMA optimize")
+            async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                row = await cursor.fetchone()
+            if row and row[0] == 2:
+                async with conn.execute("PRAGMA freelist_count") as cursor:
+                    free = await cursor.fetchone()
+                pages = min(int(free[0]) if free else 0, self._vacuum_pages)
+                if pages:
+                    # execute() steps the pragma once, which frees a single page.
+                    await conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+                    self.stats.vacuumed_pages += pages
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self._last_optimize = time.monotonic()
+        self.stats.optimize_runs += 1
+        self.stats.last_optimize_ms = elapsed_ms
+        self._db.query_stats.record("PRAGMA optimize", elapsed_ms)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Database maintenance failed")
+
+
+__all__ = ["MaintenanceScheduler", "MaintenanceStats"]
@@ -1,53 +1,53 @@
-PRAGMA journal_mode=WAL;
-PRAGMA foreign_keys=ON;
-
-CREATE TABLE IF NOT EXISTS users (
-    telegram_id INTEGER PRIMARY KEY,
-    username TEXT,
-    full_name TEXT,
-    tokens INTEGER NOT NULL DEFAULT 0,
-    is_admin INTEGER NOT NULL DEFAULT 0,
-    is_blocked INTEGER NOT NULL DEFAULT 0,
+-- Baseline schema. Uses IF NOT EXISTS so databases created before
+-- migrations existed are adopted as version 1 unchanged.
+
+CREATE TABLE IF NOT EXISTS users (
+    telegram_id INTEGER PRIMARY KEY,
+    username TEXT,
+    full_name TEXT,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    is_blocked INTEGER NOT NULL DEFAULT 0,
     hourly_limit INTEGER NOT NULL DEFAULT 0,
-    last_seen_at TEXT DEFAULT CURRENT_TIMESTAMP,
-    agreement_accepted_at TEXT,
-    demo_viewed_at TEXT
-);
-
-CREATE TABLE IF NOT EXISTS faces (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
-    title TEXT,
-    file_id TEXT,
-    file_path TEXT,
-    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE IF NOT EXISTS sessions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
-    style TEXT NOT NULL,
-    prompt TEXT,
-    status TEXT NOT NULL,
-    result_path TEXT,
-    result_file_id TEXT,
-    tokens_spent INTEGER,
-    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE IF NOT EXISTS prompt_generations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
-    template TEXT,
-    prompt TEXT NOT NULL,
-    status TEXT NOT NULL,
-    result_path TEXT,
-    result_file_id TEXT,
-    tokens_spent INTEGER,
-    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
-
+    last_seen_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    agreement_accepted_at TEXT,
+    demo_viewed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS faces (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    title TEXT,
+    file_id TEXT,
+    file_path TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    style TEXT NOT NULL,
+    prompt TEXT,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_file_id TEXT,
+    tokens_spent INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS prompt_generations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    template TEXT,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_file_id TEXT,
+    tokens_spent INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS usage_events (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
@@ -0,0 +1,9 @@
+-- Indexes for the per-user "latest first" lists and the rate-limit window.
+
+CREATE INDEX IF NOT EXISTS idx_faces_user_created ON faces(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_created ON sessions(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_prompt_generations_user_created ON prompt_generations(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_usage_events_user_kind_created ON usage_events(user_id, kind, created_at);
+
+-- Refresh planner statistics for the new indexes.
+ANALYZE;
@@ -0,0 +1,130 @@
+-- Store timestamps as INTEGER UTC epoch milliseconds instead of TEXT.
+-- SQLite can't change a column type in place, so every table is rebuilt
+-- (the runner disables foreign keys for the duration of the migration).
+-- Unparseable legacy values become NULL, or "now" for NOT NULL columns.
+-- AUTOINCREMENT counters are carried over so ids of deleted rows are not reused.
+
+CREATE TABLE users_new (
+    telegram_id INTEGER PRIMARY KEY,
+    username TEXT,
+    full_name TEXT,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    is_blocked INTEGER NOT NULL DEFAULT 0,
+    hourly_limit INTEGER NOT NULL DEFAULT 0,
+    last_seen_at INTEGER DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+    agreement_accepted_at INTEGER,
+    demo_viewed_at INTEGER
+);
+INSERT INTO users_new
+SELECT telegram_id, username, full_name, tokens, is_admin, is_blocked, hourly_limit,
+       CAST(ROUND((julianday(last_seen_at) - 2440587.5) * 86400000) AS INTEGER),
+       CAST(ROUND((julianday(agreement_accepted_at) - 2440587.5) * 86400000) AS INTEGER),
+       CAST(ROUND((julianday(demo_viewed_at) - 2440587.5) * 86400000) AS INTEGER)
+FROM users;
+DROP TABLE users;
+ALTER TABLE users_new RENAME TO users;
+
+CREATE TABLE faces_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    title TEXT,
+    file_id TEXT,
+    file_path TEXT,
+    created_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+);
+INSERT INTO faces_new
+SELECT id, user_id, title, file_id, file_path,
+       COALESCE(CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+FROM faces;
+DELETE FROM sqlite_sequence WHERE name='faces_new';
+INSERT INTO sqlite_sequence(name, seq) SELECT 'faces_new', seq FROM sqlite_sequence WHERE name='faces';
+DROP TABLE faces;
+ALTER TABLE faces_new RENAME TO faces;
+
+CREATE TABLE sessions_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    style TEXT NOT NULL,
+    prompt TEXT,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_file_id TEXT,
+    tokens_spent INTEGER,
+    created_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+    updated_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+);
+INSERT INTO sessions_new
+SELECT id, user_id, style, prompt, status, result_path, result_file_id, tokens_spent,
+       COALESCE(CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+       COALESCE(CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+FROM sessions;
+DELETE FROM sqlite_sequence WHERE name='sessions_new';
+INSERT INTO sqlite_sequence(name, seq) SELECT 'sessions_new', seq FROM sqlite_sequence WHERE name='sessions';
+DROP TABLE sessions;
+ALTER TABLE sessions_new RENAME TO sessions;
+
+CREATE TABLE prompt_generations_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    template TEXT,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    result_file_id TEXT,
+    tokens_spent INTEGER,
+    created_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+);
+INSERT INTO prompt_generations_new
+SELECT id, user_id, template, prompt, status, result_path, result_file_id, tokens_spent,
+       COALESCE(CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+FROM prompt_generations;
+DELETE FROM sqlite_sequence WHERE name='prompt_generations_new';
+INSERT INTO sqlite_sequence(name, seq) SELECT 'prompt_generations_new', seq FROM sqlite_sequence WHERE name='prompt_generations';
+DROP TABLE prompt_generations;
+ALTER TABLE prompt_generations_new RENAME TO prompt_generations;
+
+CREATE TABLE usage_events_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    created_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+);
+INSERT INTO usage_events_new
+SELECT id, user_id, kind,
+       COALESCE(CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+FROM usage_events;
+DELETE FROM sqlite_sequence WHERE name='usage_events_new';
+INSERT INTO sqlite_sequence(name, seq) SELECT 'usage_events_new', seq FROM sqlite_sequence WHERE name='usage_events';
+DROP TABLE usage_events;
+ALTER TABLE usage_events_new RENAME TO usage_events;
+
+CREATE TABLE payments_new (
+    invoice_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(telegram_id) ON DELETE CASCADE,
+    amount_usdt REAL NOT NULL,
+    tokens INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    invoice_url TEXT,
+    payload TEXT,
+    created_at INTEGER NOT NULL DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+    paid_at INTEGER,
+    credited_at INTEGER
+);
+INSERT INTO payments_new
+SELECT invoice_id, user_id, amount_usdt, tokens, status, invoice_url, payload,
+       COALESCE(CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER), CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+       CAST(ROUND((julianday(paid_at) - 2440587.5) * 86400000) AS INTEGER),
+       CAST(ROUND((julianday(credited_at) - 2440587.5) * 86400000) AS INTEGER)
+FROM payments;
+DROP TABLE payments;
+ALTER TABLE payments_new RENAME TO payments;
+
+-- Indexes were dropped together with the old tables.
+CREATE INDEX idx_payments_user ON payments(user_id);
+CREATE INDEX idx_faces_user_created ON faces(user_id, created_at);
+CREATE INDEX idx_sessions_user_created ON sessions(user_id, created_at);
+CREATE INDEX idx_prompt_generations_user_created ON prompt_generations(user_id, created_at);
+CREATE INDEX idx_usage_events_user_kind_created ON usage_events(user_id, kind, created_at);
+
+ANALYZE;
@@ -0,0 +1,7 @@
+-- Age indexes so retention can find expired rows without a full scan.
+
+CREATE INDEX IF NOT EXISTS idx_usage_events_created ON usage_events(created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_prompt_generations_created ON prompt_generations(created_at);
+
+ANALYZE;
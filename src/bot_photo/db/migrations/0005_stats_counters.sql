@@ -0,0 +1,30 @@
+-- Counters behind the admin statistics screen, maintained by the repositories
+-- in the same transaction as the rows they count.
+-- scope is 'all' (bucket ''), 'day' (bucket YYYY-MM-DD, UTC) or 'status' (bucket = status).
+
+CREATE TABLE IF NOT EXISTS stats_counters (
+    metric TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    bucket TEXT NOT NULL DEFAULT '',
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, scope, bucket)
+) WITHOUT ROWID;
+
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'users', 'all', '', COUNT(*) FROM users;
+
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'sessions', 'all', '', COUNT(*) FROM sessions;
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'sessions', 'day', strftime('%Y-%m-%d', created_at / 1000, 'unixepoch'), COUNT(*)
+FROM sessions GROUP BY 3;
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'sessions', 'status', status, COUNT(*) FROM sessions GROUP BY status;
+
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'prompts', 'all', '', COUNT(*) FROM prompt_generations;
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'prompts', 'day', strftime('%Y-%m-%d', created_at / 1000, 'unixepoch'), COUNT(*)
+FROM prompt_generations GROUP BY 3;
+INSERT INTO stats_counters(metric, scope, bucket, value)
+SELECT 'prompts', 'status', status, COUNT(*) FROM prompt_generations GROUP BY status;
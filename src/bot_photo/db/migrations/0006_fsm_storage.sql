@@ -0,0 +1,11 @@
+-- Persistent aiogram FSM state. key is "bot:chat:user:thread:business:destiny",
+-- data holds the JSON-encoded data dict (NULL when empty).
+
+CREATE TABLE IF NOT EXISTS fsm_storage (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data BLOB,
+    updated_at INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated ON fsm_storage(updated_at);
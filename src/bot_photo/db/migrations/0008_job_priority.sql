@@ -0,0 +1,13 @@
+-- Priority scheduling of generation jobs. priority is the user's class at
+-- enqueue time (0 = priority package, 1 = paid, 2 = free) and due_at is
+-- created_at plus the aging allowance of that class. Workers take the
+-- smallest due_at, so paid jobs go first but a free job that has waited
+-- out its allowance is not overtaken by newer paid ones.
+
+ALTER TABLE generation_jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 2;
+ALTER TABLE generation_jobs ADD COLUMN due_at INTEGER;
+
+UPDATE generation_jobs SET due_at = created_at;
+
+DROP INDEX IF EXISTS idx_generation_jobs_status;
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_due ON generation_jobs(status, due_at, id);
@@ -0,0 +1,45 @@
+-- Keep stats_counters up to date with triggers, so the counted writes stay a
+-- single statement (and keep going through group commit) instead of opening
+-- a transaction for a pre-SELECT plus a separate counter upsert.
+
+CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO stats_counters(metric, scope, bucket, value) VALUES ('users', 'all', '', 1)
+    ON CONFLICT(metric, scope, bucket) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_sessions_insert AFTER INSERT ON sessions
+BEGIN
+    INSERT INTO stats_counters(metric, scope, bucket, value) VALUES
+        ('sessions', 'all', '', 1),
+        ('sessions', 'day', strftime('%Y-%m-%d', NEW.created_at / 1000, 'unixepoch'), 1),
+        ('sessions', 'status', NEW.status, 1)
+    ON CONFLICT(metric, scope, bucket) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_sessions_status AFTER UPDATE OF status ON sessions
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO stats_counters(metric, scope, bucket, value) VALUES
+        ('sessions', 'status', OLD.status, -1),
+        ('sessions', 'status', NEW.status, 1)
+    ON CONFLICT(metric, scope, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_prompts_insert AFTER INSERT ON prompt_generations
+BEGIN
+    INSERT INTO stats_counters(metric, scope, bucket, value) VALUES
+        ('prompts', 'all', '', 1),
+        ('prompts', 'day', strftime('%Y-%m-%d', NEW.created_at / 1000, 'unixepoch'), 1),
+        ('prompts', 'status', NEW.status, 1)
+    ON CONFLICT(metric, scope, bucket) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_prompts_status AFTER UPDATE OF status ON prompt_generations
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    INSERT INTO stats_counters(metric, scope, bucket, value) VALUES
+        ('prompts', 'status', OLD.status, -1),
+        ('prompts', 'status', NEW.status, 1)
+    ON CONFLICT(metric, scope, bucket) DO UPDATE SET value = value + excluded.value;
+END;
@@ -0,0 +1,29 @@
+-- Decrement stats_counters when rows go away (retention, manual cleanup), so
+-- the counters always describe the rows currently stored, which is also what
+-- StatsRepository.reconcile() rebuilds them from.
+
+CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'users' AND scope = 'all' AND bucket = '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_sessions_delete AFTER DELETE ON sessions
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'sessions' AND (
+        (scope = 'all' AND bucket = '')
+        OR (scope = 'day' AND bucket = strftime('%Y-%m-%d', OLD.created_at / 1000, 'unixepoch'))
+        OR (scope = 'status' AND bucket = OLD.status)
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_prompts_delete AFTER DELETE ON prompt_generations
+BEGIN
+    UPDATE stats_counters SET value = value - 1
+    WHERE metric = 'prompts' AND (
+        (scope = 'all' AND bucket = '')
+        OR (scope = 'day' AND bucket = strftime('%Y-%m-%d', OLD.created_at / 1000, 'unixepoch'))
+        OR (scope = 'status' AND bucket = OLD.status)
+    );
+END;
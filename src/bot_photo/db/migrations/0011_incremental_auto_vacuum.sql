@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- Switch to incremental auto-vacuum so pages freed by retention and deletes
+-- can be handed back to the file system with PRAGMA incremental_vacuum.
+-- The mode only changes on an existing database through a full VACUUM,
+-- which can't run inside a transaction; both statements are safe to repeat.
+
+PRAGMA auto_vacuum=INCREMENTAL;
+VACUUM;
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+# First line of a script that must run outside a transaction (e.g. VACUUM).
+_NO_TRANSACTION = "-- migrate: no-transaction"
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    def statements(self) -> list[str]:
+        """Split the script into complete statements (trigger bodies stay intact)."""
+        statements: list[str] = []
+        buffer = ""
+        for line in self.path.read_text(encoding="utf-8").splitlines(keepends=True):
+            if not buffer and (not line.strip() or line.lstrip().startswith("--")):
+                continue
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ""
+        if buffer.strip():
+            raise ValueError(f"Incomplete statement at the end of {self.path.name}")
+        return statements
+
+    @property
+    def transactional(self) -> bool:
+        with self.path.open(encoding="utf-8") as handle:
+            return handle.readline().strip() != _NO_TRANSACTION
+
+
+class MigrationRunner:
+    """Applies ``NNNN_name.sql`` files in order and records them in ``schema_version``.
+
+    Each migration runs in its own transaction with foreign keys switched
+    off (so table rebuilds don't cascade) and a foreign key check before
+    commit. Scripts starting with ``-- migrate: no-transaction`` run
+    statement by statement in autocommit mode instead and must be safe to
+    repeat. Already applied versions are skipped, so a restart costs one
+    SELECT.
+    """
+
+    def __init__(self, db: Database, directory: Path = MIGRATIONS_DIR) -> None:
+        self._db = db
+        self._directory = directory
+
+    def discover(self) -> list[Migration]:
+        migrations: list[Migration] = []
+        for path in self._directory.glob("*.sql"):
+            match = _FILENAME.match(path.name)
+            if not match:
+                continue
+            migrations.append(Migration(int(match.group(1)), match.group(2), path))
+        migrations.sort(key=lambda item: item.version)
+        versions = [item.version for item in migrations]
+        if len(versions) != len(set(versions)):
+            raise RuntimeError("Duplicate migration versions found")
+        return migrations
+
+    async def current_version(self) -> int:
+        await self._ensure_version_table()
+        value = await self._db.fetchval("SELECT MAX(version) FROM schema_version")
+        return int(value or 0)
+
+    async def run(self) -> list[int]:
+        current = await self.current_version()
+        applied: list[int] = []
+        for migration in self.discover():
+            if migration.version <= current:
+                continue
+            await self._apply(migration)
+            applied.append(migration.version)
+        return applied
+
+    async def _ensure_version_table(self) -> None:
+        await self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+
+    async def _apply(self, migration: Migration) -> None:
+        statements = migration.statements()
+        logger.info("Applying migration %04d_%s", migration.version, migration.name)
+        if not migration.transactional:
+            await self._apply_without_transaction(migration, statements)
+            return
+        async with self._db.writer() as conn:
+            await conn.execute("PRAGMA foreign_keys=OFF")
+            try:
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for statement in statements:
+                        await conn.execute(statement)
+                    async with conn.execute("PRAGMA foreign_key_check") as cursor:
+                        violations = await cursor.fetchall()
+                    if violations:
+                        raise RuntimeError(
+                            f"Migration {migration.version} broke foreign keys: {len(violations)} rows"
+                        )
+                    await conn.execute(
+                        "INSERT INTO schema_version(version, name) VALUES(?, ?)",
+                        (migration.version, migration.name),
+                    )
+                    await conn.execute("COMMIT")
+                except BaseException:
+                    await conn.execute("ROLLBACK")
+                    raise
+            finally:
+                await conn.execute("PRAGMA foreign_keys=ON")
+
+    async def _apply_without_transaction(self, migration: Migration, statements: list[str]) -> None:
+        async with self._db.writer() as conn:
+            for statement in statements:
+                await conn.execute(statement)
+            await conn.execute(
+                "INSERT INTO schema_version(version, name) VALUES(?, ?)",
+                (migration.version, migration.name),
+            )
+
+
+__all__ = ["MIGRATIONS_DIR", "Migration", "MigrationRunner"]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiosqlite
+
+
+@dataclass(slots=True)
+class PoolStats:
+    size: int
+    idle: int
+    acquisitions: int
+    waits: int
+    total_wait_ms: float
+    max_wait_ms: float
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_ms / self.acquisitions if self.acquisitions else 0.0
+
+
+class ReaderPool:
+    """Fixed set of query-only connections that read next to the writer (WAL)."""
+
+    def __init__(self, path: Path, size: int) -> None:
+        self._path = path
+        self._size = max(size, 0)
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._acquisitions = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._connections)
+
+    async def open(self) -> None:
+        if self._connections:
+            return
+        for _ in range(self._size):
+            conn = await aiosqlite.connect(self._path.as_posix())
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA query_only=ON;")
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        self._idle = asyncio.Queue()
+        for conn in connections:
+            await conn.close()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self._connections:
+            raise RuntimeError("Reader pool is not open")
+        started = time.perf_counter()
+        if self._idle.empty():
+            self._waits += 1
+        conn = await self._idle.get()
+        waited = time.perf_counter() - started
+        self._acquisitions += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            size=self.size,
+            idle=self._idle.qsize(),
+            acquisitions=self._acquisitions,
+            waits=self._waits,
+            total_wait_ms=self._total_wait * 1000,
+            max_wait_ms=self._max_wait * 1000,
+        )
+
+
+__all__ = ["PoolStats", "ReaderPool"]
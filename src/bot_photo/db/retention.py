@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+
+import aiosqlite
+
+from .database import Database
+from .timestamps import now_ms
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_ARCHIVE_SCHEMA = "archive"
+_DAY_MS = 86_400_000
+
+
+@dataclass(frozen=True, slots=True)
+class RetentionPolicy:
+    """Rows of ``table`` older than ``max_age_days`` are archived (or dropped).
+
+    ``where`` is an extra SQL condition for rows that must stay regardless of
+    age, e.g. generations that are still processing.
+    """
+
+    table: str
+    max_age_days: int
+    archive: bool = False
+    time_column: str = "created_at"
+    where: str | None = None
+
+    def __post_init__(self) -> None:
+        for name in (self.table, self.time_column):
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"Invalid identifier in retention policy: {name!r}")
+        if self.max_age_days <= 0:
+            raise ValueError("max_age_days must be positive")
+
+
+@dataclass(slots=True)
+class TableRetention:
+    table: str
+    archived: int = 0
+    deleted: int = 0
+    batches: int = 0
+
+
+@dataclass(slots=True)
+class RetentionReport:
+    tables: list[TableRetention] = field(default_factory=list)
+    freed_bytes: int = 0
+    file_bytes: int = 0
+    elapsed_ms: float = 0.0
+
+    @property
+    def deleted(self) -> int:
+        return sum(item.deleted for item in self.tables)
+
+
+class RetentionEngine:
+    """Moves expired rows out of the hot database in small batches.
+
+    Each batch is its own short transaction on the writer and the engine
+    sleeps between batches, so regular writes interleave with a large
+    cleanup instead of queuing behind it. Archived rows are copied into an
+    attached database with ``INSERT OR IGNORE`` before they are deleted,
+    which keeps a batch safe to replay if a crash lands between the two
+    files; the archive is attached to the writer only for the length of a
+    run. Delete triggers on the counted tables decrement ``stats_counters``
+    in the same statement, so the admin totals keep matching the rows that
+    remain. Rows are copied by column name, and columns added to a hot table
+    since the archive was created are added to the archive first. Freed
+    pages are handed back with ``incremental_vacuum`` at the end of a run
+    (migration 0011 switches the database to ``auto_vacuum=INCREMENTAL``).
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        policies: Sequence[RetentionPolicy],
+        *,
+        archive_path: Path | None = None,
+        batch_size: int = 500,
+        pause_ms: float = 20,
+        interval_minutes: float = 60,
+    ) -> None:
+        if any(policy.archive for policy in policies) and archive_path is None:
+            raise ValueError("archive_path is required for archiving policies")
+        self._db = db
+        self._policies = list(policies)
+        self._archive_path = archive_path
+        self._batch_size = max(batch_size, 1)
+        self._pause = max(pause_ms, 0) / 1000
+        self._interval = interval_minutes * 60
+        self._archive_columns: dict[str, list[str]] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.last_report: RetentionReport | None = None
+
+    def start(self) -> None:
+        if not self._policies or self._interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> RetentionReport:
+        started = time.perf_counter()
+        report = RetentionReport()
+        async with self._db.writer() as conn:
+            attached = await self._attach_archive(conn)
+            live_before, _ = await _page_usage(conn)
+        try:
+            for policy in self._policies:
+                report.tables.append(await self._apply(policy))
+        finally:
+            if attached:
+                async with self._db.writer() as conn:
+                    await conn.execute(f"DETACH DATABASE {_ARCHIVE_SCHEMA}")
+        async with self._db.writer() as conn:
+            if await _pragma(conn, "auto_vacuum") == 2:
+                # execute() steps the pragma once, which frees a single page.
+                await conn.executescript("PRAGMA incremental_vacuum;")
+            live_after, file_bytes = await _page_usage(conn)
+        report.freed_bytes = max(live_before - live_after, 0)
+        report.file_bytes = file_bytes
+        report.elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_report = report
+        return report
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                report = await self.run_once()
+            except Exception:
+                logger.exception("Retention run failed")
+            else:
+                if report.deleted:
+                    logger.info(
+                        "Retention removed %s rows (%s), freed %.1f KiB, db file %.1f MiB",
+                        report.deleted,
+                        ", ".join(
+                            f"{item.table}: {item.deleted}" for item in report.tables if item.deleted
+                        ),
+                        report.freed_bytes / 1024,
+                        report.file_bytes / 1024 / 1024,
+                    )
+            await asyncio.sleep(self._interval)
+
+    async def _apply(self, policy: RetentionPolicy) -> TableRetention:
+        result = TableRetention(policy.table)
+        cutoff = now_ms() - policy.max_age_days * _DAY_MS
+        condition = f"{policy.time_column} < ?"
+        if policy.where:
+            condition += f" AND ({policy.where})"
+        select_ids = f"""
+            SELECT id FROM main.{policy.table}
+            WHERE {condition}
+            ORDER BY {policy.time_column}, id
+            LIMIT ?
+            """
+        while True:
+            async with self._db.transaction():
+                rows = await self._db.fetchall(select_ids, (cutoff, self._batch_size))
+                ids = [row["id"] for row in rows]
+                if not ids:
+                    break
+                placeholders = ", ".join("?" for _ in ids)
+                if policy.archive:
+                    columns = ", ".join(self._archive_columns[policy.table])
+                    await self._db.execute(
+                        f"""
+                        INSERT OR IGNORE INTO {_ARCHIVE_SCHEMA}.{policy.table} ({columns})
+                        SELECT {columns} FROM main.{policy.table} WHERE id IN ({placeholders})
+                        """,
+                        ids,
+                    )
+                deleted = await self._db.fetchall(
+                    f"DELETE FROM main.{policy.table} WHERE id IN ({placeholders}) RETURNING id",
+                    ids,
+                )
+            result.batches += 1
+            result.deleted += len(deleted)
+            if policy.archive:
+                result.archived += len(ids)
+            if len(ids) < self._batch_size:
+                break
+            # Let queued writers take the lock before the next batch.
+            await asyncio.sleep(self._pause)
+        return result
+
+    async def _attach_archive(self, conn: aiosqlite.Connection) -> bool:
+        """Attach the archive for this run only; True when the caller must detach it."""
+        if not any(policy.archive for policy in self._policies):
+            return False
+        self._archive_path.parent.mkdir(parents=True, exist_ok=True)
+        await conn.execute(
+            f"ATTACH DATABASE ? AS {_ARCHIVE_SCHEMA}", (self._archive_path.as_posix(),)
+        )
+        try:
+            for policy in self._policies:
+                if policy.archive:
+                    self._archive_columns[policy.table] = await _sync_archive_table(
+                        conn, policy.table
+                    )
+        except BaseException:
+            await conn.execute(f"DETACH DATABASE {_ARCHIVE_SCHEMA}")
+            raise
+        return True
+
+
+async def _sync_archive_table(conn: aiosqlite.Connection, table: str) -> list[str]:
+    """Create or extend the archive copy of ``table``; returns the columns to copy.
+
+    The archive has the hot table's columns, keyed on ``id`` but without
+    foreign keys. Columns the hot table gained later are appended; columns
+    it dropped stay in the archive and are left NULL for newer rows.
+    """
+    columns = await _table_columns(conn, "main", table)
+    if not columns:
+        raise RuntimeError(f"Table {table} does not exist")
+    archived = {name for name, _ in await _table_columns(conn, _ARCHIVE_SCHEMA, table)}
+    if not archived:
+        definitions = [f"{name} {declared}".strip() for name, declared in columns]
+        await conn.execute(
+            f"CREATE TABLE {_ARCHIVE_SCHEMA}.{table} ({', '.join(definitions)}, PRIMARY KEY(id))"
+        )
+    for name, declared in columns:
+        if archived and name not in archived:
+            await conn.execute(
+                f"ALTER TABLE {_ARCHIVE_SCHEMA}.{table} ADD COLUMN {name} {declared}".strip()
+            )
+    return [name for name, _ in columns]
+
+
+async def _table_columns(
+    conn: aiosqlite.Connection, schema: str, table: str
+) -> list[tuple[str, str]]:
+    async with conn.execute(f"PRAGMA {schema}.table_info({table})") as cursor:
+        return [(row[1], row[2]) for row in await cursor.fetchall()]
+
+
+async def _pragma(conn: aiosqlite.Connection, name: str) -> int:
+    async with conn.execute(f"PRAGMA main.{name}") as cursor:
+        row = await cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+async def _page_usage(conn: aiosqlite.Connection) -> tuple[int, int]:
+    """Bytes held by live pages and the total size of the main database file."""
+    page_size = await _pragma(conn, "page_size")
+    page_count = await _pragma(conn, "page_count")
+    free_pages = await _pragma(conn, "freelist_count")
+    return (page_count - free_pages) * page_size, page_count * page_size
+
+
+__all__ = ["RetentionEngine", "RetentionPolicy", "RetentionReport", "TableRetention"]
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_GROUP = r"\( ?\?(?: ?, ?\?)* ?\)"
+# "IN (?, ?, ?)" of any length.
+_IN_LIST = re.compile(r"\bIN " + _GROUP, re.IGNORECASE)
+# "VALUES (?, ?), (?, ?), ..." of any number of rows.
+_REPEATED_GROUPS = re.compile(rf"({_GROUP})(?: ?, ?{_GROUP})+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(query: str) -> str:
+    """Collapse whitespace, literals and placeholder lists so the same statement shares one histogram.
+
+    Batched statements differ only in how many ``?`` groups they bind, so
+    ``IN (?, ?)`` becomes ``IN (...)`` and repeated ``VALUES`` rows are cut
+    down to the first one; every batch size then shares one key.
+    Results are cached per raw SQL string.
+    """
+    text = _STRING_LITERAL.sub("?", query)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _IN_LIST.sub("IN (...)", text)
+    return _REPEATED_GROUPS.sub(r"\1", text)
+
+
+def _percentile(ordered: list[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass(slots=True)
+class StatementSummary:
+    statement: str
+    count: int
+    errors: int
+    rows: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    lock_wait_ms: float
+
+    @property
+    def avg_rows(self) -> float:
+        return self.rows / self.count if self.count else 0.0
+
+
+@dataclass(slots=True)
+class _StatementStats:
+    count: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    lock_wait_ms: float = 0.0
+    last_explained: float = 0.0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+
+class QueryStats:
+    """Per-statement latency histograms kept over the most recent samples."""
+
+    def __init__(self, slow_threshold_ms: float = 200.0, explain_interval: float = 300.0) -> None:
+        self.slow_threshold_ms = slow_threshold_ms
+        self._explain_interval = explain_interval
+        self._statements: dict[str, _StatementStats] = {}
+        self._started_at = time.monotonic()
+
+    def record(
+        self,
+        query: str,
+        elapsed_ms: float,
+        *,
+        rows: int = 0,
+        lock_wait_ms: float = 0.0,
+        error: bool = False,
+    ) -> bool:
+        """Store one execution. Returns True when it is slow and due for an EXPLAIN."""
+        key = normalize_statement(query)
+        stats = self._statements.get(key)
+        if stats is None:
+            stats = self._statements[key] = _StatementStats()
+        stats.count += 1
+        stats.rows += rows
+        stats.total_ms += elapsed_ms
+        stats.lock_wait_ms += lock_wait_ms
+        stats.samples.append(elapsed_ms)
+        if error:
+            stats.errors += 1
+        if self.slow_threshold_ms <= 0 or elapsed_ms < self.slow_threshold_ms:
+            return False
+        now = time.monotonic()
+        if now - stats.last_explained < self._explain_interval and stats.last_explained:
+            return False
+        stats.last_explained = now
+        return True
+
+    def summaries(self, limit: int | None = None) -> list[StatementSummary]:
+        """Statements ordered by total time spent, heaviest first."""
+        result: list[StatementSummary] = []
+        for statement, stats in self._statements.items():
+            ordered = sorted(stats.samples)
+            result.append(
+                StatementSummary(
+                    statement=statement,
+                    count=stats.count,
+                    errors=stats.errors,
+                    rows=stats.rows,
+                    total_ms=stats.total_ms,
+                    p50_ms=_percentile(ordered, 50),
+                    p95_ms=_percentile(ordered, 95),
+                    p99_ms=_percentile(ordered, 99),
+                    lock_wait_ms=stats.lock_wait_ms,
+                )
+            )
+        result.sort(key=lambda item: item.total_ms, reverse=True)
+        return result[:limit] if limit else result
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self._started_at
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self._started_at = time.monotonic()
+
+
+__all__ = ["QueryStats", "StatementSummary", "normalize_statement"]
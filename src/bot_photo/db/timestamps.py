@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def to_epoch_ms(value: datetime | str | None) -> int | None:
+    """Convert a datetime (naive values are UTC) or ISO string to epoch milliseconds."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1000)
+
+
+def from_epoch_ms(value: int | None) -> datetime | None:
+    """Epoch milliseconds to a naive UTC datetime, matching ``datetime.utcnow()``."""
+    if value is None:
+        return None
+    return _EPOCH + timedelta(milliseconds=value)
+
+
+__all__ = ["from_epoch_ms", "now_ms", "to_epoch_ms"]
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
+import html
+
 from aiogram import F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from ..keyboards import admin_cancel_keyboard, admin_main_keyboard, admin_manage_user_keyboard
-from ..models import AdminState, User
-from ..utils import get_database, get_settings, get_token_service, get_users_repo
+from ..models import AdminState, StatsSnapshot, User
+from ..services.circuit import BreakerStats
+from ..services.concurrency import LimiterStats
+from ..services.face_cache import FaceCacheStats
+from ..services.retry import RetryStats
+from ..services.generation_queue import QueueClassStats
+from ..services.hedging import HedgeStats
+from ..utils import (
+    get_database,
+    get_db_maintenance,
+    get_generation_client,
+    get_generation_queue,
+    get_settings,
+    get_stats_repo,
+    get_token_service,
+    get_users_repo,
+)
 
 router = Router(name="admin")
 
@@ -44,17 +61,126 @@ async def admin_stats(callback: types.CallbackQuery, user: User) -> None:
     if not user.is_admin:
         await callback.answer("Нет доступа", show_alert=True)
         return
-    db = get_database(callback.message.bot)
-    users_count = await db.fetchval("SELECT COUNT(*) FROM users")
-    sessions = await db.fetchval("SELECT COUNT(*) FROM sessions")
-    prompts = await db.fetchval("SELECT COUNT(*) FROM prompt_generations")
-    text = (
-        "📊 Статистика\n"
-        f"Пользователей: {users_count or 0}\n"
-        f"Фотосессий: {sessions or 0}\n"
-        f"Prompt генераций: {prompts or 0}"
+    snapshot = await get_stats_repo(callback.message.bot).snapshot()
+    queue = await get_generation_queue(callback.message.bot).class_stats()
+    client = get_generation_client(callback.message.bot)
+    text = _format_queue(
+        queue,
+        client.limiter_stats(),
+        client.retry_stats(),
+        client.breaker_stats(),
+        client.hedge_stats(),
+        client.face_cache_stats(),
+    )
+    await callback.message.answer(_format_stats(snapshot) + "\n\n" + text)
+    await callback.answer()
+
+
+@router.message(Command("reconcile_stats"))
+async def command_reconcile_stats(message: types.Message, user: User) -> None:
+    if not user.is_admin:
+        await message.answer("Недоступно")
+        return
+    snapshot = await get_stats_repo(message.bot).reconcile()
+    await message.answer("Счётчики пересчитаны.\n\n" + _format_stats(snapshot))
+
+
+def _format_stats(snapshot: StatsSnapshot) -> str:
+    lines = [
+        "📊 Статистика",
+        f"Пользователей: {snapshot.total('users')}",
+        f"Фотосессий: {snapshot.total('sessions')} (сегодня {snapshot.created_today('sessions')})",
+        f"Prompt генераций: {snapshot.total('prompts')} (сегодня {snapshot.created_today('prompts')})",
+    ]
+    for metric, title in (("sessions", "Фотосессии"), ("prompts", "Prompt генерации")):
+        statuses = snapshot.statuses(metric)
+        if statuses:
+            parts = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+            lines.append(f"{title} по статусам: {parts}")
+    return "\n".join(lines)
+
+
+def _format_queue(
+    classes: list[QueueClassStats],
+    limits: list[LimiterStats],
+    retries: RetryStats,
+    breakers: list[BreakerStats],
+    hedging: HedgeStats | None,
+    faces: FaceCacheStats,
+) -> str:
+    lines = ["⏱ Очередь генераций"]
+    for item in classes:
+        lines.append(
+            f"{item.name}: в очереди {item.queued} (ждёт до {item.oldest_wait_ms / 1000:.0f} с), "
+            f"взято {item.claimed}, ожидание ср. {item.avg_wait_ms / 1000:.1f} / "
+            f"p95 {item.p95_wait_ms / 1000:.1f} / макс {item.max_wait_ms / 1000:.1f} с"
+        )
+    for limit in limits:
+        lines.append(
+            f"{limit.name}: лимит {limit.limit}, в работе {limit.in_flight}, ждут {limit.queued}, "
+            f"перегрузок {limit.overloads} (снижений {limit.decreases}), "
+            f"отказов {limit.rejected + limit.timed_out}, задержка {limit.latency_ms / 1000:.1f} с"
+        )
+    reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(retries.reasons.items()))
+    lines.append(
+        f"Повторы: {retries.retries} на {retries.calls} вызовов, спасено {retries.recovered}, "
+        f"исчерпано {retries.exhausted}, вне бюджета {retries.out_of_budget}"
+        + (f" ({reasons})" if reasons else "")
     )
-    await callback.message.answer(text)
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    for breaker in breakers:
+        line = (
+            f"{icons.get(breaker.state, '')} {breaker.name}: {breaker.state}, "
+            f"ошибок {breaker.bad_rate:.0%} из {breaker.window_calls}, "
+            f"открывался {breaker.opened} раз, отсечено {breaker.short_circuited}"
+        )
+        if breaker.retry_in:
+            line += f", проба через {breaker.retry_in:.0f} с"
+        lines.append(line)
+    if hedging is not None:
+        trigger = f"{hedging.trigger_ms / 1000:.1f} с" if hedging.trigger_ms is not None else "набирает статистику"
+        lines.append(
+            f"Хеджирование: порог {trigger}, продублировано {hedging.hedged} из {hedging.requests}, "
+            f"выиграл дубль {hedging.hedge_wins}, упёрлось в бюджет {hedging.budget_denied}"
+        )
+    lines.append(
+        f"Кэш лиц: {faces.entries} шт., {faces.bytes / 1024 / 1024:.1f}/{faces.max_bytes / 1024 / 1024:.0f} МБ, "
+        f"попаданий {faces.hits}, промахов {faces.misses} ({faces.hit_rate:.0%}), вытеснено {faces.evictions}, "
+        f"отправлено с диска {faces.streamed}"
+    )
+    return "\n".join(lines)
+
+
+@router.callback_query(F.data == "admin:db_stats")
+async def admin_db_stats(callback: types.CallbackQuery, user: User) -> None:
+    if not user.is_admin:
+        await callback.answer("Нет доступа", show_alert=True)
+        return
+    db = get_database(callback.message.bot)
+    pool = db.pool_stats()
+    cache = get_users_repo(callback.message.bot).cache_stats()
+    maintenance = get_db_maintenance(callback.message.bot).stats
+    lines = [
+        "🗄 Запросы к БД",
+        f"Пул чтения: {pool.idle}/{pool.size} свободно, ожиданий {pool.waits}, "
+        f"среднее {pool.avg_wait_ms:.1f} мс, макс {pool.max_wait_ms:.1f} мс",
+        f"Кэш пользователей: {cache.size}/{cache.capacity}, попаданий {cache.hits}, "
+        f"промахов {cache.misses} ({cache.hit_rate:.0%}), вытеснено {cache.evictions}",
+        f"WAL: {maintenance.wal_bytes / 1024 / 1024:.1f} МБ (макс {maintenance.max_wal_bytes / 1024 / 1024:.1f}), "
+        f"чекпоинтов {maintenance.checkpoints} (занято {maintenance.busy_checkpoints}), "
+        f"последний {maintenance.last_checkpoint_ms:.1f} мс, макс {maintenance.max_checkpoint_ms:.1f} мс",
+        "",
+    ]
+    summaries = db.query_stats.summaries(limit=10)
+    for item in summaries:
+        lines.append(
+            f"<code>{html.escape(item.statement[:80])}</code>\n"
+            f"  ×{item.count} (ошибок {item.errors}), p50 {item.p50_ms:.1f} / p95 {item.p95_ms:.1f} / "
+            f"p99 {item.p99_ms:.1f} мс, строк ~{item.avg_rows:.1f}, ожидание {item.lock_wait_ms:.0f} мс"
+        )
+    if not summaries:
+        lines.append("Пока нет данных.")
+    await callback.message.answer("\n".join(lines))
     await callback.answer()
 
 
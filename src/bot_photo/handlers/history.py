@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from typing import Any
+
 from aiogram import F, Router, types
 from aiogram.types import FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
 
-from ..keyboards import main_menu_keyboard
+from ..keyboards import main_menu_keyboard, page_navigation_row, parse_page_callback
+from ..models import Page, PromptGeneration, Session
 from ..utils import get_prompt_repo, get_sessions_repo, get_settings
 from .sessions import STYLE_LABELS
 
@@ -14,9 +17,9 @@ router = Router(name="history")
 async def show_history(callback: types.CallbackQuery) -> None:
     sessions_repo = get_sessions_repo(callback.message.bot)
     prompt_repo = get_prompt_repo(callback.message.bot)
-    sessions = await sessions_repo.list_for_user(callback.from_user.id)
-    prompts = await prompt_repo.list_for_user(callback.from_user.id)
-    if not sessions and not prompts:
+    sessions = await sessions_repo.list_page(callback.from_user.id)
+    prompts = await prompt_repo.list_page(callback.from_user.id)
+    if not sessions.items and not prompts.items:
         await callback.message.answer(
             "Пока пусто. Запусти <Новая съёмка> или <Генерация по prompt>.",
             reply_markup=main_menu_keyboard(
@@ -26,27 +29,75 @@ async def show_history(callback: types.CallbackQuery) -> None:
         await callback.answer()
         return
     await callback.answer()
-    if sessions:
-        await callback.message.answer("Недавние фотосессии:")
-        for session in sessions:
-            style_label = STYLE_LABELS.get(session.style, session.style)
-            caption = f"{style_label} — {session.status}"
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="Открыть фото",
-                            callback_data=f"history:session:{session.id}",
-                        )
-                    ]
+    if sessions.items:
+        await _send_sessions_page(callback.message, sessions)
+    if prompts.items:
+        await _send_prompts_page(callback.message, prompts)
+
+
+@router.callback_query(F.data.startswith("history:sessions:"))
+async def page_history_sessions(callback: types.CallbackQuery) -> None:
+    before, after = parse_page_callback(callback.data)
+    sessions_repo = get_sessions_repo(callback.message.bot)
+    page = await sessions_repo.list_page(callback.from_user.id, before=before, after=after)
+    if not page.items:
+        await callback.answer("Больше ничего нет.", show_alert=True)
+        return
+    await _send_sessions_page(callback.message, page)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("history:prompts:"))
+async def page_history_prompts(callback: types.CallbackQuery) -> None:
+    before, after = parse_page_callback(callback.data)
+    prompt_repo = get_prompt_repo(callback.message.bot)
+    page = await prompt_repo.list_page(callback.from_user.id, before=before, after=after)
+    if not page.items:
+        await callback.answer("Больше ничего нет.", show_alert=True)
+        return
+    await callback.message.edit_text(
+        _format_prompts(page), reply_markup=_navigation_keyboard(page, "history:prompts")
+    )
+    await callback.answer()
+
+
+async def _send_sessions_page(message: types.Message, page: Page[Session]) -> None:
+    await message.answer("Фотосессии:")
+    for session in page.items:
+        style_label = STYLE_LABELS.get(session.style, session.style)
+        caption = f"{style_label} — {session.status}"
+        keyboard = InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton(
+                        text="Открыть фото",
+                        callback_data=f"history:session:{session.id}",
+                    )
                 ]
-            )
-            await callback.message.answer(caption, reply_markup=keyboard)
-    if prompts:
-        lines = ["Недавние prompt-запросы:"]
-        for record in prompts:
-            lines.append(f"• {record.prompt[:40]}: - {record.status}")
-        await callback.message.answer("\n".join(lines))
+            ]
+        )
+        await message.answer(caption, reply_markup=keyboard)
+    navigation = _navigation_keyboard(page, "history:sessions")
+    if navigation:
+        await message.answer("Листать фотосессии:", reply_markup=navigation)
+
+
+async def _send_prompts_page(message: types.Message, page: Page[PromptGeneration]) -> None:
+    await message.answer(
+        _format_prompts(page), reply_markup=_navigation_keyboard(page, "history:prompts")
+    )
+
+
+def _format_prompts(page: Page[PromptGeneration]) -> str:
+    lines = ["Prompt-запросы:"]
+    for record in page.items:
+        lines.append(f"• {record.prompt[:40]}: - {record.status}")
+    return "\n".join(lines)
+
+
+def _navigation_keyboard(page: Page[Any], prefix: str) -> InlineKeyboardMarkup | None:
+    row = page_navigation_row(page, prefix)
+    return InlineKeyboardMarkup(inline_keyboard=[row]) if row else None
 
 
 @router.callback_query(F.data.startswith("history:session:"))
@@ -7,7 +7,7 @@ from aiogram import Router, types
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiocryptopay.exceptions import CryptoPayAPIError
 
-from ..utils import get_crypto_pay_service, get_payments_repo, get_token_service, get_settings
+from ..utils import get_crypto_pay_service, get_database, get_payments_repo, get_token_service, get_settings
 
 router = Router(name="payment")
 
@@ -22,6 +22,8 @@ class Package:
     label: str
     highlight: bool = False
     bonus: str | None = None
+    # Buying this package (or a larger one) puts the user's jobs in the priority class.
+    priority: bool = False
 
 
 PACKAGES: list[Package] = [
@@ -36,6 +38,7 @@ PACKAGES: list[Package] = [
         price_rub=1990,
         label="💎",
         bonus="Приоритетная генерация (без очереди)",
+        priority=True,
     ),
     Package(
         "godmode",
@@ -49,6 +52,11 @@ PACKAGES: list[Package] = [
 ]
 
 
+def priority_min_tokens() -> int | None:
+    """Tokens of the smallest package that buys priority generation, if any."""
+    return min((pkg.tokens for pkg in PACKAGES if pkg.priority), default=None)
+
+
 def _format_package(pkg: Package) -> str:
     base = f"{pkg.label} {pkg.title} — {pkg.photos} фото ({pkg.tokens} токенов) — {pkg.price_rub}₽"
     if pkg.highlight:
@@ -219,32 +227,37 @@ async def payment_check(callback: types.CallbackQuery) -> None:
             await callback.answer("Счёт не найден.", show_alert=True)
             return
 
-        payment = await payments_repo.get(invoice_id)
-        tokens = payment.tokens if payment else None
-        if tokens is None:
-            tokens = _tokens_from_payload(invoice.payload)
+        status = str(invoice.status).lower()
+        credited_tokens: int | None = None
+        # Lookup, status update and crediting are one unit of work: concurrent
+        # "check" taps serialize here and only the first one credits tokens.
+        async with get_database(callback.message.bot).transaction():
+            payment = await payments_repo.get(invoice_id)
+            tokens = payment.tokens if payment else None
+            if tokens is None:
+                tokens = _tokens_from_payload(invoice.payload)
+            if tokens is not None:
+                already_credited = payment.status == "credited" if payment else False
+                await payments_repo.save_invoice(
+                    invoice_id=invoice.invoice_id,
+                    user_id=callback.from_user.id,
+                    amount_usdt=float(invoice.amount),
+                    tokens=tokens,
+                    status="credited" if already_credited else str(invoice.status),
+                    invoice_url=invoice.bot_invoice_url,
+                    payload=invoice.payload,
+                    paid_at=invoice.paid_at,
+                )
+                if status == "paid" and not already_credited:
+                    new_balance = await token_service.add(callback.from_user.id, tokens)
+                    updated = await payments_repo.mark_credited(invoice_id)
+                    credited_tokens = updated.tokens if updated else tokens
         if tokens is None:
             await callback.answer("Не удалось определить пакет. Напишите в поддержку.", show_alert=True)
             return
 
-        await payments_repo.save_invoice(
-            invoice_id=invoice.invoice_id,
-            user_id=callback.from_user.id,
-            amount_usdt=float(invoice.amount),
-            tokens=tokens,
-            status=str(invoice.status),
-            invoice_url=invoice.bot_invoice_url,
-            payload=invoice.payload,
-            paid_at=invoice.paid_at,
-        )
-
-        status = str(invoice.status).lower()
         if status == "paid":
-            already_credited = payment.status == "credited" if payment else False
-            if not already_credited:
-                new_balance = await token_service.add(callback.from_user.id, tokens)
-                updated = await payments_repo.mark_credited(invoice_id)
-                credited_tokens = updated.tokens if updated else tokens
+            if credited_tokens is not None:
                 text = (
                     "<b>Оплата прошла ✅</b>\n\n"
                     f"Зачислено: {credited_tokens} токенов\n"
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
-import base64
 import logging
-from pathlib import Path
-from typing import Any
 
 from aiogram import F, Router, types
 from aiogram.fsm.context import FSMContext
-from aiogram.types import FSInputFile
 
-from ..keyboards import main_menu_keyboard, prompt_templates_keyboard, sessions_keyboard
-from ..models import PromptState
-from ..services.nano_banana import NanoBananaAPIError
+from ..keyboards import (
+    main_menu_keyboard,
+    page_navigation_row,
+    parse_page_callback,
+    prompt_templates_keyboard,
+)
+from ..models import Face, Page, PromptState
+from ..services.generation_queue import PROMPT_JOB
 from ..utils import (
-    get_file_storage,
+    get_database,
     get_faces_repo,
-    get_generation_client,
+    get_generation_queue,
     get_prompt_repo,
     get_settings,
     get_token_service,
@@ -81,6 +82,8 @@ async def _start_prompt_generation(
         tokens = get_token_service(message.bot)
         users_repo = get_users_repo(message.bot)
         prompt_repo = get_prompt_repo(message.bot)
+        database = get_database(message.bot)
+        queue = get_generation_queue(message.bot)
         user = await users_repo.get_by_id(message.from_user.id)
         if not user:
             await message.answer("Нет профиля. Нажми /start.")
@@ -90,49 +93,38 @@ async def _start_prompt_generation(
             return
 
         cost = settings.cost_per_prompt
-        balance_before = await tokens.balance(user.telegram_id)
-        if balance_before < cost:
+        job = None
+        async with database.transaction():
+            balance_before = await tokens.balance(user.telegram_id)
+            if balance_before >= cost:
+                balance_left = await tokens.spend(user.telegram_id, cost)
+                record = await prompt_repo.create(
+                    user_id=user.telegram_id,
+                    prompt=prompt,
+                    template=template,
+                    status="processing",
+                    tokens_spent=cost,
+                )
+                job = await queue.enqueue(
+                    PROMPT_JOB,
+                    record_id=record.id,
+                    user_id=user.telegram_id,
+                    chat_id=message.chat.id,
+                    payload={"prompt": prompt, "template": template, "face_id": face_id, "cost": cost},
+                )
+        if job is None:
             await message.answer(
                 f"Недостаточно токенов: нужно {cost}, у тебя {balance_before}. Открой профиль и пополни баланс."
             )
             return
 
-        balance_left = await tokens.spend(user.telegram_id, cost)
+        await state.clear()
         await message.answer(f"Списано {cost} токенов. Остаток: {balance_left}.")
-        record = await prompt_repo.create(
-            user_id=user.telegram_id,
-            prompt=prompt,
-            template=template,
-            status="processing",
-            tokens_spent=cost,
-        )
         status_line = "⏳ Генерируем по prompt..."
         if face_id:
             status_line = f"{status_line}\nРеференс лицо: #{face_id}"
         status_message = await message.answer(status_line)
-        try:
-            nano = get_generation_client(message.bot)
-            face_urls: list[str] | None = None
-            if face_id:
-                face_urls = [await _ensure_face_file_by_id(message, face_id)]
-            result = await nano.generate_prompt(prompt=prompt, template=template, face_urls=face_urls)
-            bytes_image = _extract_image(result)
-            storage = get_file_storage(message.bot)
-            path_saved = await storage.save_generation(bytes_image)
-            await prompt_repo.update_status(record.id, status="ready", result_path=path_saved.as_posix())
-            await status_message.delete()
-            await message.answer_photo(
-                FSInputFile(path_saved),
-                caption="Готово!",
-                reply_markup=sessions_keyboard(),
-            )
-        except Exception as exc:  # pragma: no cover
-            logging.exception("Failed to generate prompt")
-            await tokens.add(user.telegram_id, cost)
-            await prompt_repo.update_status(record.id, status="failed")
-            await status_message.edit_text(f"Не вышло сгенерировать: {exc}")
-        finally:
-            await state.clear()
+        await queue.submit(job, status_message)
     except Exception as e:
         logging.exception("Error in _start_prompt_generation: %s", e)
         await message.answer("Произошла непредвиденная ошибка при обработке запроса.")
@@ -140,73 +132,35 @@ async def _start_prompt_generation(
 
 async def _ask_face(message: types.Message, user_id: int) -> None:
     faces_repo = get_faces_repo(message.bot)
-    faces = await faces_repo.list_faces(user_id)
+    page = await faces_repo.list_page(user_id)
     lines = ["Выбери лицо для генерации по prompt:"]
-    inline_keyboard = []
-    if faces:
-        for face in faces:
-            title = face.title or f"Лицо #{face.id}"
-            inline_keyboard.append(
-                [types.InlineKeyboardButton(text=f"🧑‍🦰 {title}", callback_data=f"prompt:face:{face.id}")]
-            )
-    else:
+    if not page.items:
         lines.append("У тебя пока нет сохранённых лиц. Можно продолжить без лица.")
-    inline_keyboard.append([types.InlineKeyboardButton(text="➡️ Без лица", callback_data="prompt:face:skip")])
-    inline_keyboard.append([types.InlineKeyboardButton(text="🏠 В меню", callback_data="menu:home")])
-    await message.answer("\n".join(lines), reply_markup=types.InlineKeyboardMarkup(inline_keyboard=inline_keyboard))
+    await message.answer("\n".join(lines), reply_markup=_prompt_faces_keyboard(page))
 
 
-async def _ensure_face_file_by_id(message: types.Message, face_id: int) -> str:
-    faces_repo = get_faces_repo(message.bot)
-    face = await faces_repo.get_by_id(face_id, message.from_user.id)
-    if not face:
-        raise RuntimeError("Лицо не найдено.")
-    if face.file_path:
-        path = Path(face.file_path)
-        if path.exists():
-            return path.as_posix()
-    if not face.file_id:
-        raise RuntimeError("Нет файла лица.")
-    storage = get_file_storage(message.bot)
-    new_path = await storage.save_face(message.bot, message.from_user.id, face.file_id)
-    await faces_repo.update_file_path(face.id, message.from_user.id, new_path.as_posix())
-    return new_path.as_posix()
-
-
-def _extract_image(response: dict[str, Any]) -> bytes:
-    data = _extract_inline_image(response)
-    if data:
-        return data
-    images = response.get("images") or response.get("data")
-    if images:
-        raw = images[0]
-        if isinstance(raw, dict):
-            raw = raw.get("b64_json") or raw.get("content")
-        if isinstance(raw, str):
-            return base64.b64decode(raw)
-    raise RuntimeError("Ответ модели пустой")
-
-
-def _extract_inline_image(response: dict[str, Any]) -> bytes | None:
-    candidates = response.get("candidates") or []
-    for candidate in candidates:
-        content = candidate.get("content") or {}
-        parts = content.get("parts") or []
-        data = _decode_inline_parts(parts)
-        if data:
-            return data
-    contents = response.get("contents") or []
-    for content in contents:
-        parts = content.get("parts") or []
-        data = _decode_inline_parts(parts)
-        if data:
-            return data
-    return None
-
-
-def _decode_inline_parts(parts: list[dict[str, Any]]) -> bytes | None:
-    for part in parts:
-        inline_data = part.get("inline_data") or part.get("inlineData")
-        if isinstance(inline_data, dict) and inline_data.get("data"):
-            return base64.b64decode(inline_data["data"])
-    return None
+@router.callback_query(PromptState.waiting_face, lambda c: c.data and c.data.startswith("prompt:faces:page:"))
+async def page_prompt_faces(callback: types.CallbackQuery) -> None:
+    before, after = parse_page_callback(callback.data)
+    faces_repo = get_faces_repo(callback.message.bot)
+    page = await faces_repo.list_page(callback.from_user.id, before=before, after=after)
+    if not page.items:
+        await callback.answer("Больше лиц нет.", show_alert=True)
+        return
+    await callback.message.edit_reply_markup(reply_markup=_prompt_faces_keyboard(page))
+    await callback.answer()
+
+
+def _prompt_faces_keyboard(page: Page[Face]) -> types.InlineKeyboardMarkup:
+    inline_keyboard = []
+    for face in page.items:
+        title = face.title or f"Лицо #{face.id}"
+        inline_keyboard.append(
+            [types.InlineKeyboardButton(text=f"🧑‍🦰 {title}", callback_data=f"prompt:face:{face.id}")]
+        )
+    navigation = page_navigation_row(page, "prompt:faces:page")
+    if navigation:
+        inline_keyboard.append(navigation)
+    inline_keyboard.append([types.InlineKeyboardButton(text="➡️ Без лица", callback_data="prompt:face:skip")])
+    inline_keyboard.append([types.InlineKeyboardButton(text="🏠 В меню", callback_data="menu:home")])
+    return types.InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
@@ -1,21 +1,29 @@
 from __future__ import annotations
 
-import base64
 import logging
-from pathlib import Path
 from typing import Any
 
 from aiogram import F, Router, types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
 
-from ..keyboards import faces_keyboard, main_menu_keyboard, orientation_keyboard, sessions_keyboard, styles_keyboard
-from ..models import PhotoSessionState
+from ..keyboards import (
+    faces_keyboard,
+    main_menu_keyboard,
+    orientation_keyboard,
+    page_navigation_row,
+    parse_page_callback,
+    sessions_keyboard,
+    styles_keyboard,
+)
+from ..models import Face, Page, PhotoSessionState
+from ..services.generation_queue import SESSION_JOB
 from ..utils import (
+    get_database,
     get_examples_service,
     get_faces_repo,
     get_file_storage,
-    get_generation_client,
+    get_generation_queue,
     get_sessions_repo,
     get_settings,
     get_token_service,
@@ -183,12 +191,32 @@ async def face_upload_prompt(callback: types.CallbackQuery) -> None:
 @router.callback_query(PhotoSessionState.waiting_face, lambda c: c.data == "faces:list")
 async def show_faces(callback: types.CallbackQuery, state: FSMContext) -> None:
     faces_repo = get_faces_repo(callback.message.bot)
-    faces = await faces_repo.list_faces(callback.from_user.id)
-    if not faces:
+    page = await faces_repo.list_page(callback.from_user.id)
+    if not page.items:
         await callback.answer("Сохранённых лиц нет.", show_alert=True)
         return
+    await callback.message.answer(
+        "Выбери лицо из сохранённых:",
+        reply_markup=_saved_faces_keyboard(page),
+    )
+    await callback.answer()
+
+
+@router.callback_query(PhotoSessionState.waiting_face, lambda c: c.data and c.data.startswith("faces:page:"))
+async def page_faces(callback: types.CallbackQuery) -> None:
+    before, after = parse_page_callback(callback.data)
+    faces_repo = get_faces_repo(callback.message.bot)
+    page = await faces_repo.list_page(callback.from_user.id, before=before, after=after)
+    if not page.items:
+        await callback.answer("Больше лиц нет.", show_alert=True)
+        return
+    await callback.message.edit_reply_markup(reply_markup=_saved_faces_keyboard(page))
+    await callback.answer()
+
+
+def _saved_faces_keyboard(page: Page[Face]) -> InlineKeyboardMarkup:
     inline_keyboard = []
-    for face in faces:
+    for face in page.items:
         title = face.title or f"Лицо #{face.id}"
         inline_keyboard.append(
             [
@@ -196,20 +224,18 @@ async def show_faces(callback: types.CallbackQuery, state: FSMContext) -> None:
                 InlineKeyboardButton(text=f"🗑 {title}", callback_data=f"faces:delete:{face.id}"),
             ]
         )
+    navigation = page_navigation_row(page, "faces:page")
+    if navigation:
+        inline_keyboard.append(navigation)
     inline_keyboard.append([InlineKeyboardButton(text="🏠 Домой", callback_data="menu:home")])
-    await callback.message.answer(
-        "Выбери лицо из сохранённых:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=inline_keyboard),
-    )
-    await callback.answer()
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
 @router.callback_query(PhotoSessionState.waiting_face, lambda c: c.data and c.data.startswith("faces:use:"))
 async def use_saved_face(callback: types.CallbackQuery, state: FSMContext) -> None:
     face_id = int(callback.data.split(":")[2])
     faces_repo = get_faces_repo(callback.message.bot)
-    faces = await faces_repo.list_faces(callback.from_user.id)
-    selected = next((face for face in faces if face.id == face_id), None)
+    selected = await faces_repo.get_by_id(face_id, callback.from_user.id)
     if not selected:
         await callback.answer("Такого лица нет.", show_alert=True)
         return
@@ -369,9 +395,8 @@ async def _start_generation(
 ) -> None:
     settings = get_settings(message.bot)
     token_service = get_token_service(message.bot)
-    users_repo = get_users_repo(message.bot)
     sessions_repo = get_sessions_repo(message.bot)
-    examples_service = get_examples_service(message.bot)
+    queue = get_generation_queue(message.bot)
     user = await _get_or_create_user(message.bot, actor)
     if not user:
         await message.answer("Не удалось получить профиль. Нажми /start.")
@@ -382,141 +407,56 @@ async def _start_generation(
         return
 
     cost = settings.cost_per_session
-    balance_before = await token_service.balance(user.telegram_id)
-    logging.debug("Tokens before spend user=%s balance=%s cost=%s", user.telegram_id, balance_before, cost)
-    if balance_before < cost:
+    job = None
+    # Balance check, spend, session record and job commit together so a second tap can't double-spend.
+    async with get_database(message.bot).transaction():
+        balance_before = await token_service.balance(user.telegram_id)
+        logging.debug("Tokens before spend user=%s balance=%s cost=%s", user.telegram_id, balance_before, cost)
+        if balance_before >= cost:
+            balance_left = await token_service.spend(user.telegram_id, cost)
+            session = await sessions_repo.create_session(
+                user_id=user.telegram_id,
+                style=style,
+                prompt=prompt,
+                status="processing",
+                tokens_spent=cost,
+            )
+            job = await queue.enqueue(
+                SESSION_JOB,
+                record_id=session.id,
+                user_id=user.telegram_id,
+                chat_id=message.chat.id,
+                payload={
+                    "style": style,
+                    "orientation": orientation,
+                    "prompt": prompt,
+                    "faces": [
+                        {key: face.get(key) for key in ("face_id", "file_id", "file_path")}
+                        for face in faces
+                    ],
+                    "cost": cost,
+                },
+            )
+    if job is None:
         await message.answer(
             f"Недостаточно токенов: нужно {cost}, у тебя {balance_before}. Открой профиль и пополни баланс."
         )
         return
 
-    balance_left = await token_service.spend(user.telegram_id, cost)
     logging.debug("Tokens after spend user=%s balance=%s", user.telegram_id, balance_left)
-    await message.answer(f"Списано {cost} токенов. Остаток: {balance_left}.")
-    session = await sessions_repo.create_session(
-        user_id=user.telegram_id,
-        style=style,
-        prompt=prompt,
-        status="processing",
-        tokens_spent=cost,
-    )
-    await state.set_state(PhotoSessionState.processing)
-
-    status_message = await message.answer("⏳ Генерируем, подожди...")
-    image_bytes: bytes | None = None
-    error_text: str | None = None
-    session_status = "ready"
-    nano = get_generation_client(message.bot)
-    try:
-        face_paths = [await _ensure_face_file(message, face) for face in faces]
-        result = await nano.generate_photosession(
-            style=style,
-            prompt=prompt,
-            orientation=orientation,
-            face_urls=face_paths,
-        )
-        image_bytes = _extract_first_image(result)
-    except Exception as exc:  # pragma: no cover
-        fallback = examples_service.get_by_style(style)
-        if fallback and fallback.file_path.exists():
-            image_bytes = fallback.file_path.read_bytes()
-            error_text = (
-                "Основная генерация недоступна, показан эталон из примеров. "
-                "Токены возвращены."
-            )
-            session_status = "fallback"
-            await token_service.add(user.telegram_id, cost)
-        else:
-            await token_service.add(user.telegram_id, cost)
-            await sessions_repo.update_status(session.id, status="failed")
-            await status_message.edit_text(f"Не вышло сгенерировать: {exc}")
-            await state.clear()
-            return
-
-    storage = get_file_storage(message.bot)
-    image_path = await storage.save_generation(image_bytes)
-    await sessions_repo.update_status(
-        session_id=session.id,
-        status=session_status,
-        result_path=image_path.as_posix(),
-    )
-    await status_message.delete()
-    await message.answer_photo(
-        FSInputFile(image_path),
-        caption="Готово! Вот твоя съёмка. Хочешь ещё? Запусти новую сцену.",
-        reply_markup=sessions_keyboard(),
-    )
-    if error_text:
-        await message.answer(error_text)
     await state.clear()
-
-async def _ensure_face_file(message: types.Message, face: dict[str, Any]) -> str:
-    path_value = face.get("file_path")
-    if path_value:
-        candidate = Path(path_value)
-        if candidate.exists():
-            return candidate.as_posix()
-    file_id = face.get("file_id")
-    if not file_id:
-        raise RuntimeError("Не удалось получить файл лица.")
-    storage = get_file_storage(message.bot)
-    new_path = await storage.save_face(message.bot, message.from_user.id, file_id)
-    faces_repo = get_faces_repo(message.bot)
-    if face.get("face_id"):
-        await faces_repo.update_file_path(face["face_id"], message.from_user.id, new_path.as_posix())
-    face["file_path"] = new_path.as_posix()
-    return new_path.as_posix()
-
-
-def _extract_first_image(response: dict[str, Any]) -> bytes:
-    data = _extract_inline_image(response)
-    if data:
-        return data
-    images = response.get("images") or response.get("data")
-    if images:
-        raw = images[0]
-        if isinstance(raw, dict):
-            raw = raw.get("b64_json") or raw.get("content")
-        if isinstance(raw, str):
-            return base64.b64decode(raw)
-        if isinstance(raw, bytes):
-            return raw
-    raise RuntimeError("Nano banana вернул пустой результат")
-
-
-def _extract_inline_image(response: dict[str, Any]) -> bytes | None:
-    candidates = response.get("candidates") or []
-    for candidate in candidates:
-        content = candidate.get("content") or {}
-        parts = content.get("parts") or []
-        data = _decode_inline_parts(parts)
-        if data:
-            return data
-    contents = response.get("contents") or []
-    for content in contents:
-        parts = content.get("parts") or []
-        data = _decode_inline_parts(parts)
-        if data:
-            return data
-    return None
-
-
-def _decode_inline_parts(parts: list[dict[str, Any]]) -> bytes | None:
-    for part in parts:
-        inline_data = part.get("inline_data") or part.get("inlineData")
-        if isinstance(inline_data, dict) and inline_data.get("data"):
-            return base64.b64decode(inline_data["data"])
-    return None
+    await message.answer(f"Списано {cost} токенов. Остаток: {balance_left}.")
+    status_message = await message.answer("⏳ Генерируем, пришлю фото, как только будет готово.")
+    await queue.submit(job, status_message)
 
 
 @router.callback_query(lambda c: c.data == "session:share")
 async def share_last_session(callback: types.CallbackQuery) -> None:
     sessions_repo = get_sessions_repo(callback.message.bot)
-    sessions = await sessions_repo.list_for_user(callback.from_user.id, limit=1)
-    if not sessions:
+    session = await sessions_repo.latest_for_user(callback.from_user.id)
+    if session is None:
         await callback.answer("Пока нет готовых съёмок.", show_alert=True)
         return
-    session = sessions[0]
     if not session.result_path:
         await callback.answer("У последней съёмки нет файла.", show_alert=True)
         return
@@ -528,6 +468,7 @@ async def share_last_session(callback: types.CallbackQuery) -> None:
     )
     await callback.answer("Фото отправлено. Просто пересылай его дальше.")
 
+
 async def _get_or_create_user(bot: types.Bot, from_user: types.User):
     users_repo = get_users_repo(bot)
     user = await users_repo.get_by_id(from_user.id)
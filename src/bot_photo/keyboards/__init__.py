@@ -6,6 +6,8 @@ from .common import (
     faces_keyboard,
     main_menu_keyboard,
     orientation_keyboard,
+    page_navigation_row,
+    parse_page_callback,
     prompt_templates_keyboard,
     sessions_keyboard,
     styles_keyboard,
@@ -19,6 +21,8 @@ __all__ = [
     "faces_keyboard",
     "main_menu_keyboard",
     "orientation_keyboard",
+    "page_navigation_row",
+    "parse_page_callback",
     "prompt_templates_keyboard",
     "sessions_keyboard",
     "styles_keyboard",
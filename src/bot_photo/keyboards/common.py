@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Any, Iterable
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from ..models import Page, PageCursor
+
 
 def agreement_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
@@ -12,14 +14,14 @@ def agreement_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
-    builder.row(InlineKeyboardButton(text="📸 Новая съёмка", callback_data="menu:new_session"))
-    builder.row(InlineKeyboardButton(text="💬 Генерация по prompt", callback_data="menu:prompt"))
-    builder.row(InlineKeyboardButton(text="🕓 История", callback_data="menu:history"))
-    builder.row(InlineKeyboardButton(text="👤 Профиль", callback_data="menu:profile"))
-    builder.row(InlineKeyboardButton(text="📄 Политика и соглашение", callback_data="menu:docs"))
-    if is_admin:
+def main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.row(InlineKeyboardButton(text="📸 Новая съёмка", callback_data="menu:new_session"))
+    builder.row(InlineKeyboardButton(text="💬 Генерация по prompt", callback_data="menu:prompt"))
+    builder.row(InlineKeyboardButton(text="🕓 История", callback_data="menu:history"))
+    builder.row(InlineKeyboardButton(text="👤 Профиль", callback_data="menu:profile"))
+    builder.row(InlineKeyboardButton(text="📄 Политика и соглашение", callback_data="menu:docs"))
+    if is_admin:
         builder.row(InlineKeyboardButton(text="🛠 Админка", callback_data="menu:admin"))
     return builder.as_markup()
 
@@ -44,14 +46,14 @@ def orientation_keyboard() -> InlineKeyboardMarkup:
     return builder.adjust(1).as_markup()
 
 
-def faces_keyboard() -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
-    builder.button(text="📤 Загрузить лицо", callback_data="faces:upload")
-    builder.button(text="🧑‍🦰 Выбрать сохранённое", callback_data="faces:list")
-    builder.button(text="🗑 Удалить лицо", callback_data="faces:delete_list")
-    builder.button(text="⬅️ Назад", callback_data="menu:home")
-    builder.button(text="✅ Готово", callback_data="faces:done")
-    return builder.adjust(1).as_markup()
+def faces_keyboard() -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📤 Загрузить лицо", callback_data="faces:upload")
+    builder.button(text="🧑‍🦰 Выбрать сохранённое", callback_data="faces:list")
+    builder.button(text="🗑 Удалить лицо", callback_data="faces:delete_list")
+    builder.button(text="⬅️ Назад", callback_data="menu:home")
+    builder.button(text="✅ Готово", callback_data="faces:done")
+    return builder.adjust(1).as_markup()
 
 
 def prompt_templates_keyboard() -> InlineKeyboardMarkup:
@@ -80,6 +82,7 @@ def sessions_keyboard() -> InlineKeyboardMarkup:
 def admin_main_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.row(InlineKeyboardButton(text="📈 Статистика", callback_data="admin:stats"))
+    builder.row(InlineKeyboardButton(text="🗄 Запросы к БД", callback_data="admin:db_stats"))
     builder.row(InlineKeyboardButton(text="💳 Выдать токены", callback_data="admin:give_tokens"))
     builder.row(InlineKeyboardButton(text="🧑‍💻 Управление админами", callback_data="admin:manage_admins"))
     builder.row(InlineKeyboardButton(text="🎞 Примеры", callback_data="admin:examples"))
@@ -102,3 +105,26 @@ def admin_manage_user_keyboard(user_id: int, is_admin: bool) -> InlineKeyboardMa
         builder.button(text="Дать админку", callback_data=f"admin_manage:grant:{user_id}")
     builder.button(text="Отмена", callback_data="admin:cancel")
     return builder.as_markup()
+
+
+def page_navigation_row(page: Page[Any], prefix: str) -> list[InlineKeyboardButton]:
+    """Newer/older buttons for a keyset page; callback data is ``<prefix>:<direction>:<cursor>``."""
+    buttons: list[InlineKeyboardButton] = []
+    if page.newer:
+        buttons.append(
+            InlineKeyboardButton(text="⬅️ Новее", callback_data=f"{prefix}:newer:{page.newer.encode()}")
+        )
+    if page.older:
+        buttons.append(
+            InlineKeyboardButton(text="Старше ➡️", callback_data=f"{prefix}:older:{page.older.encode()}")
+        )
+    return buttons
+
+
+def parse_page_callback(data: str) -> tuple[PageCursor | None, PageCursor | None]:
+    """Turn ``<prefix>:<direction>:<cursor>`` back into ``(before, after)``."""
+    _, direction, cursor = data.rsplit(":", 2)
+    position = PageCursor.decode(cursor)
+    if direction == "older":
+        return position, None
+    return None, position
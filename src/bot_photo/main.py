@@ -2,25 +2,43 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from pathlib import Path
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from .config import Settings
-from .db import Database
+from .db import (
+    BackupManager,
+    Database,
+    MaintenanceScheduler,
+    MigrationRunner,
+    RetentionEngine,
+    RetentionPolicy,
+)
 from .handlers import routers
+from .handlers.payment import priority_min_tokens
 from .middlewares import UserRegistrationMiddleware
 from .repositories.faces import FaceRepository
+from .repositories.jobs import JobRepository
 from .repositories.prompts import PromptRepository
 from .repositories.sessions import SessionRepository
+from .repositories.stats import StatsRepository
 from .repositories.usage import UsageRepository
 from .repositories.users import UserRepository
 from .repositories.payments import PaymentRepository
-from .services import ExamplesService, NanoBananaClient, RateLimitService, TokenService, CryptoPayService
-from .storage import FileStorage, S3Storage
+from .services import (
+    CryptoPayService,
+    ExamplesService,
+    FaceEncodingCache,
+    GenerationQueue,
+    Hedger,
+    NanoBananaClient,
+    RateLimitService,
+    RetryPolicy,
+    TokenService,
+)
+from .storage import FileStorage, S3Storage, SQLiteStorage
 from .utils import init_context
 
 
@@ -31,20 +49,54 @@ async def main() -> None:
         settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
 
-    database = Database(settings.database_path)
+    database = Database(
+        settings.database_path,
+        read_pool_size=settings.database_read_pool_size,
+        group_commit_ms=settings.database_group_commit_ms,
+        slow_query_ms=settings.database_slow_query_ms,
+    )
     await database.connect()
-    schema_path = Path(__file__).resolve().parent / "db" / "schema.sql"
-    await database.run_script(schema_path)
+    await MigrationRunner(database).run()
+    maintenance = MaintenanceScheduler(
+        database,
+        check_seconds=settings.database_maintenance_seconds,
+        passive_wal_mb=settings.database_wal_checkpoint_mb,
+        truncate_wal_mb=settings.database_wal_truncate_mb,
+        optimize_hours=settings.database_optimize_hours,
+    )
+    await maintenance.start()
+    fsm_storage = SQLiteStorage(
+        database,
+        cache_size=settings.fsm_cache_size,
+        flush_seconds=settings.fsm_flush_seconds,
+        ttl_seconds=settings.fsm_state_ttl_hours * 3600,
+    )
+    fsm_storage.start()
+    dp = Dispatcher(storage=fsm_storage)
 
-    users_repo = UserRepository(database)
+    retention = RetentionEngine(
+        database,
+        _retention_policies(settings),
+        archive_path=settings.retention_archive_path,
+        batch_size=settings.retention_batch_size,
+        interval_minutes=settings.retention_interval_minutes,
+    )
+    retention.start()
+
+    users_repo = UserRepository(
+        database,
+        cache_size=settings.user_cache_size,
+        cache_ttl_seconds=settings.user_cache_ttl_seconds,
+    )
+    users_repo.start_flushing(settings.last_seen_flush_seconds)
     faces_repo = FaceRepository(database)
     sessions_repo = SessionRepository(database)
     prompts_repo = PromptRepository(database)
     usage_repo = UsageRepository(database)
     payments_repo = PaymentRepository(database)
+    stats_repo = StatsRepository(database)
+    jobs_repo = JobRepository(database)
 
     s3_storage = None
     if settings.s3_enabled:
@@ -56,6 +108,17 @@ async def main() -> None:
             region=settings.s3_region,
         )
     file_storage = FileStorage(settings.faces_path, settings.sessions_path, s3=s3_storage)
+    backups = BackupManager(
+        database,
+        settings.backup_dir,
+        name=settings.database_path.stem,
+        keep=settings.backup_keep,
+        interval_hours=settings.backup_interval_hours,
+        pages_per_step=settings.backup_pages_per_step,
+        step_pause_ms=settings.backup_step_pause_ms,
+        s3=s3_storage if settings.backup_upload_s3 else None,
+    )
+    backups.start()
     examples_service = ExamplesService(settings.examples_path)
     examples_service.load()
     token_service = TokenService(users_repo)
@@ -65,6 +128,51 @@ async def main() -> None:
         base_url=settings.nano_banana_base_url,
         model=settings.nano_banana_model,
         fallback_model=settings.nano_banana_fallback_model,
+        concurrency=settings.nano_banana_concurrency,
+        max_concurrency=settings.nano_banana_max_concurrency,
+        queue_timeout=settings.nano_banana_queue_timeout_seconds,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.nano_banana_retry_attempts,
+            base_delay=settings.nano_banana_retry_base_seconds,
+            max_delay=settings.nano_banana_retry_max_seconds,
+            deadline=settings.nano_banana_deadline_seconds,
+        ),
+        breaker_failure_rate=settings.nano_banana_breaker_failure_rate,
+        breaker_slow_seconds=settings.nano_banana_breaker_slow_seconds,
+        breaker_open_seconds=settings.nano_banana_breaker_open_seconds,
+        hedger=Hedger(
+            percentile=settings.nano_banana_hedge_percentile,
+            budget=settings.nano_banana_hedge_budget,
+        )
+        if settings.nano_banana_hedge_enabled
+        else None,
+        face_cache=FaceEncodingCache(
+            int(settings.nano_banana_face_cache_mb * 1024 * 1024),
+            max_entry_bytes=int(settings.nano_banana_face_cache_entry_mb * 1024 * 1024),
+        ),
+        # Next to the sessions folder, so finished downloads are moved there by a rename.
+        download_dir=settings.sessions_path / ".incoming",
+    )
+    generation_queue = GenerationQueue(
+        bot,
+        database,
+        jobs_repo,
+        sessions=sessions_repo,
+        prompts=prompts_repo,
+        faces=faces_repo,
+        tokens=token_service,
+        examples=examples_service,
+        files=file_storage,
+        client=nano_client,
+        payments=payments_repo,
+        priority_min_tokens=(
+            settings.generation_priority_min_tokens
+            if settings.generation_priority_min_tokens is not None
+            else priority_min_tokens()
+        ),
+        aging_seconds=settings.generation_aging_seconds,
+        workers=settings.generation_workers,
+        max_attempts=settings.generation_max_attempts,
     )
     crypto_pay_service = CryptoPayService(
         token=settings.crypto_bot_token,
@@ -81,6 +189,8 @@ async def main() -> None:
             "prompts": prompts_repo,
             "usage": usage_repo,
             "payments": payments_repo,
+            "stats": stats_repo,
+            "jobs": jobs_repo,
         },
         services={
             "tokens": token_service,
@@ -88,6 +198,8 @@ async def main() -> None:
             "nano": nano_client,
             "examples": examples_service,
             "crypto_pay": crypto_pay_service,
+            "db_maintenance": maintenance,
+            "generation_queue": generation_queue,
         },
         file_storage=file_storage,
     )
@@ -97,13 +209,39 @@ async def main() -> None:
     for router in routers:
         dp.include_router(router)
 
+    await generation_queue.start()
     try:
         await dp.start_polling(bot)
     finally:
+        # Stop workers before closing what they use; unfinished jobs resume on the next start.
+        await generation_queue.stop()
         await crypto_pay_service.close()
         await nano_client.close()
+        await retention.stop()
+        await backups.stop()
+        await maintenance.stop()
+        await users_repo.stop_flushing()
+        # Usually already closed by the dispatcher shutdown; flushes any leftovers.
+        await fsm_storage.close()
         await database.close()
 
 
+def _retention_policies(settings: Settings) -> list[RetentionPolicy]:
+    # Rate limits only look back an hour, so usage events are never archived.
+    policies: list[RetentionPolicy] = []
+    if settings.retention_usage_events_days > 0:
+        policies.append(RetentionPolicy("usage_events", settings.retention_usage_events_days))
+    archive = settings.retention_archive_path is not None
+    for table, days in (
+        ("sessions", settings.retention_sessions_days),
+        ("prompt_generations", settings.retention_prompts_days),
+    ):
+        if days > 0:
+            policies.append(
+                RetentionPolicy(table, days, archive=archive, where="status != 'processing'")
+            )
+    return policies
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -7,6 +7,7 @@ from aiogram import types
 from aiogram.types import TelegramObject
 
 from ..config import Settings
+from ..models import User
 from ..repositories.users import UserRepository
 
 
@@ -24,20 +25,38 @@ class UserRegistrationMiddleware(BaseMiddleware):
     ) -> Any:
         from_user = data.get("event_from_user")
         if from_user:
-            user = await self._users.upsert_user(
-                telegram_id=from_user.id,
-                username=from_user.username,
-                full_name=from_user.full_name,
-                is_admin=from_user.id in self._settings.admin_ids,
-                starting_tokens=self._settings.starting_tokens,
-                hourly_limit=self._settings.hourly_limit,
-            )
+            user = await self._resolve_user(from_user)
             data["user"] = user
             if not user.agreement_accepted_at and not self._is_agreement_flow(event):
                 await self._send_agreement_hint(event)
                 return None
         return await handler(event, data)
 
+    async def _resolve_user(self, from_user: types.User) -> User:
+        """Known users with an unchanged profile come from the repository cache.
+
+        Only new users and profile changes pay for the upsert; activity is
+        recorded through the buffered ``last_seen_at``.
+        """
+        is_admin = from_user.id in self._settings.admin_ids
+        user = await self._users.get_by_id(from_user.id)
+        if (
+            user is not None
+            and user.username == from_user.username
+            and user.full_name == from_user.full_name
+            and user.is_admin == is_admin
+        ):
+            self._users.mark_seen(from_user.id)
+            return user
+        return await self._users.upsert_user(
+            telegram_id=from_user.id,
+            username=from_user.username,
+            full_name=from_user.full_name,
+            is_admin=is_admin,
+            starting_tokens=self._settings.starting_tokens,
+            hourly_limit=self._settings.hourly_limit,
+        )
+
     def _is_agreement_flow(self, event: TelegramObject) -> bool:
         if isinstance(event, types.Message):
             return bool(event.text and event.text.startswith("/start"))
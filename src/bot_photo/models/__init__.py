@@ -1,15 +1,22 @@
 from .face import Face
+from .job import GenerationJob
 from .prompt_generation import PromptGeneration
 from .session import Session
+from .page import Page, PageCursor
 from .payment import Payment
+from .stats import StatsSnapshot
 from .states import AdminState, AgreementState, PhotoSessionState, PromptState
 from .user import User
 
 __all__ = [
     "Face",
+    "GenerationJob",
     "PromptGeneration",
     "Session",
+    "Page",
+    "PageCursor",
     "Payment",
+    "StatsSnapshot",
     "AdminState",
     "AgreementState",
     "PhotoSessionState",
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(slots=True)
+class GenerationJob:
+    id: int
+    kind: str
+    record_id: int
+    user_id: int
+    chat_id: int
+    status_message_id: int | None
+    payload: dict[str, Any]
+    status: str
+    priority: int
+    due_at: datetime | None
+    attempts: int
+    last_error: str | None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class PageCursor:
+    """Keyset position: (created_at in epoch ms, id) of a row on a page edge."""
+
+    created_at: int
+    id: int
+
+    def encode(self) -> str:
+        return f"{self.created_at}.{self.id}"
+
+    @classmethod
+    def decode(cls, value: str) -> PageCursor:
+        created_at, _, row_id = value.partition(".")
+        return cls(int(created_at), int(row_id))
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    items: list[T] = field(default_factory=list)
+    # Pass as ``before`` to get the next (older) page / as ``after`` for the previous one.
+    older: PageCursor | None = None
+    newer: PageCursor | None = None
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class StatsSnapshot:
+    totals: dict[str, int] = field(default_factory=dict)
+    today: dict[str, int] = field(default_factory=dict)
+    by_status: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def total(self, metric: str) -> int:
+        return self.totals.get(metric, 0)
+
+    def created_today(self, metric: str) -> int:
+        return self.today.get(metric, 0)
+
+    def statuses(self, metric: str) -> dict[str, int]:
+        return self.by_status.get(metric, {})
+
+
+__all__ = ["StatsSnapshot"]
@@ -1,6 +1,13 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
+from typing import Any, Callable, TypeVar
+
 from ..db import Database
+from ..db.decoders import RowDecoder
+from ..models import Page, PageCursor
+
+T = TypeVar("T")
 
 
 class BaseRepository:
@@ -11,5 +18,85 @@ class BaseRepository:
     def db(self) -> Database:
         return self._db
 
+    async def _insert_returning(
+        self, table: str, values: dict[str, Any], *, on_conflict: str = ""
+    ) -> dict[str, Any]:
+        """INSERT (or upsert via ``on_conflict``) and get the stored row back in one statement."""
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        row = await self.db.execute_returning(
+            f"INSERT INTO {table}({columns}) VALUES({placeholders}) {on_conflict} RETURNING *",
+            tuple(values.values()),
+        )
+        if not row:
+            raise RuntimeError(f"Failed to insert into {table}")
+        return row
+
+    async def _fetch_page(
+        self,
+        decoder: RowDecoder[T],
+        table: str,
+        user_id: int,
+        cursor_of: Callable[[T], PageCursor],
+        *,
+        limit: int,
+        before: PageCursor | None = None,
+        after: PageCursor | None = None,
+    ) -> Page[T]:
+        """Keyset page over ``(created_at, id)`` newest first.
+
+        Served by the ``(user_id, created_at)`` index (rowid is the implicit
+        last key column), so a deep page costs the same as the first one.
+        """
+        if before and after:
+            raise ValueError("Pass either before or after, not both")
+        if after is not None:
+            items = await self.db.fetchall_as(
+                decoder,
+                f"""
+                SELECT * FROM {table}
+                WHERE user_id=? AND (created_at, id) > (?, ?)
+                ORDER BY created_at ASC, id ASC
+                LIMIT ?
+                """,
+                (user_id, after.created_at, after.id, limit + 1),
+            )
+            has_newer = len(items) > limit
+            items = items[:limit][::-1]
+            return Page(
+                items=items,
+                older=cursor_of(items[-1]) if items else None,
+                newer=cursor_of(items[0]) if items and has_newer else None,
+            )
+        if before is not None:
+            query = f"""
+                SELECT * FROM {table}
+                WHERE user_id=? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """
+            params: tuple[Any, ...] = (user_id, before.created_at, before.id, limit + 1)
+        else:
+            query = f"""
+                SELECT * FROM {table}
+                WHERE user_id=?
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """
+            params = (user_id, limit + 1)
+        items = await self.db.fetchall_as(decoder, query, params)
+        has_older = len(items) > limit
+        items = items[:limit]
+        return Page(
+            items=items,
+            older=cursor_of(items[-1]) if items and has_older else None,
+            newer=cursor_of(items[0]) if items and before is not None else None,
+        )
+
+
+def day_bucket(epoch_ms: int) -> str:
+    """UTC calendar day used as the ``day`` bucket in ``stats_counters``."""
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
 
-__all__ = ["BaseRepository"]
+__all__ = ["BaseRepository", "day_bucket"]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(slots=True)
+class CacheStats:
+    size: int
+    capacity: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded LRU map whose entries expire ``ttl_seconds`` after they were stored.
+
+    Read-through callers take ``write_token()`` before their query and pass it
+    to ``fill``; the value is dropped if any ``put``/``invalidate`` happened in
+    between, so a slow read can't overwrite a newer write.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._capacity = max(capacity, 0)
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def write_token(self) -> int:
+        return self._writes
+
+    def fill(self, key: K, value: V, token: int) -> None:
+        """Store a value read from the database unless a write raced with the read."""
+        if token == self._writes:
+            self._store(key, value)
+
+    def put(self, key: K, value: V) -> None:
+        """Store the authoritative value produced by a write."""
+        self._writes += 1
+        self._store(key, value)
+
+    def invalidate(self, key: K) -> None:
+        self._writes += 1
+        self._invalidations += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._writes += 1
+        self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            size=len(self._entries),
+            capacity=self._capacity,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            invalidations=self._invalidations,
+        )
+
+    def _store(self, key: K, value: V) -> None:
+        if self._capacity <= 0 or self._ttl <= 0:
+            return
+        self._entries[key] = (self._clock() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+__all__ = ["CacheStats", "LRUCache"]
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Any
 
-from ..models import Face
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, to_epoch_ms
+from ..models import Page, PageCursor, Face
 from .base import BaseRepository
 
 
@@ -11,23 +12,18 @@ class FaceRepository(BaseRepository):
     async def add_face(
         self, user_id: int, title: str | None, file_id: str | None, file_path: str | None
     ) -> Face:
-        await self.db.execute(
-            "INSERT INTO faces(user_id, title, file_id, file_path) VALUES(?, ?, ?, ?)",
-            (user_id, title, file_id, file_path),
-        )
-        row = await self.db.fetchone(
-            "SELECT * FROM faces WHERE rowid=last_insert_rowid()"
+        row = await self._insert_returning(
+            "faces",
+            {"user_id": user_id, "title": title, "file_id": file_id, "file_path": file_path},
         )
-        if not row:
-            raise RuntimeError("Failed to insert face")
         return self._row_to_face(row)
 
     async def list_faces(self, user_id: int, limit: int = 10) -> list[Face]:
-        rows = await self.db.fetchall(
+        return await self.db.fetchall_as(
+            self._decoder,
             "SELECT * FROM faces WHERE user_id=? ORDER BY created_at DESC LIMIT ?",
             (user_id, limit),
         )
-        return [self._row_to_face(row) for row in rows]
 
     async def delete_face(self, face_id: int, user_id: int) -> None:
         await self.db.execute(
@@ -45,22 +41,35 @@ class FaceRepository(BaseRepository):
         )
 
     async def get_by_id(self, face_id: int, user_id: int) -> Face | None:
-        row = await self.db.fetchone("SELECT * FROM faces WHERE id=? AND user_id=?", (face_id, user_id))
-        return self._row_to_face(row) if row else None
+        return await self.db.fetchone_as(
+            self._decoder, "SELECT * FROM faces WHERE id=? AND user_id=?", (face_id, user_id)
+        )
 
-    def _row_to_face(self, row: dict[str, Any]) -> Face:
-        return Face(
-            id=row["id"],
-            user_id=row["user_id"],
-            title=row.get("title"),
-            file_id=row.get("file_id"),
-            file_path=row.get("file_path"),
-            created_at=self._parse_datetime(row.get("created_at")),
+    async def list_page(
+        self,
+        user_id: int,
+        limit: int = 10,
+        before: PageCursor | None = None,
+        after: PageCursor | None = None,
+    ) -> Page[Face]:
+        return await self._fetch_page(
+            self._decoder,
+            "faces",
+            user_id,
+            self._cursor_of,
+            limit=limit,
+            before=before,
+            after=after,
         )
 
     @staticmethod
-    def _parse_datetime(value: str | None) -> datetime:
-        return datetime.fromisoformat(value) if value else datetime.utcnow()
+    def _cursor_of(face: Face) -> PageCursor:
+        return PageCursor(to_epoch_ms(face.created_at) or 0, face.id)
+
+    def _row_to_face(self, row: dict[str, Any]) -> Face:
+        return self._decoder.decode_mapping(row)
+
+    _decoder = RowDecoder(Face, converters={"created_at": from_epoch_ms})
 
 
 __all__ = ["FaceRepository"]
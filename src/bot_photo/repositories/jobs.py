@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, now_ms
+from ..models import GenerationJob
+from .base import BaseRepository
+
+
+class JobRepository(BaseRepository):
+    """Queue rows in ``generation_jobs``: queued -> running -> deleted.
+
+    A finished job is deleted in the same transaction that stores its result
+    or refund, so the table only ever holds outstanding work.
+    """
+
+    async def enqueue(
+        self,
+        kind: str,
+        record_id: int,
+        user_id: int,
+        chat_id: int,
+        payload: dict[str, Any],
+        *,
+        priority: int,
+        due_at: int,
+    ) -> GenerationJob:
+        """Add a job; call it inside the transaction that spends the tokens."""
+        row = await self._insert_returning(
+            "generation_jobs",
+            {
+                "kind": kind,
+                "record_id": record_id,
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "payload": json.dumps(payload, ensure_ascii=False),
+                "priority": priority,
+                "due_at": due_at,
+            },
+        )
+        return self._decoder.decode_mapping(row)
+
+    async def set_status_message(self, job_id: int, message_id: int) -> bool:
+        """Remember the "please wait" message; False when the job already finished."""
+        row = await self.db.execute_returning(
+            "UPDATE generation_jobs SET status_message_id=? WHERE id=? RETURNING id",
+            (message_id, job_id),
+        )
+        return row is not None
+
+    async def claim(self) -> GenerationJob | None:
+        """Atomically take the queued job with the earliest ``due_at`` and mark it running."""
+        return await self.db.fetchone_as(
+            self._decoder,
+            """
+            UPDATE generation_jobs
+            SET status='running', attempts=attempts + 1, updated_at=?
+            WHERE id = (
+                SELECT id FROM generation_jobs
+                WHERE status='queued'
+                ORDER BY due_at, id
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            (now_ms(),),
+        )
+
+    async def requeue_running(self) -> int:
+        """Put jobs interrupted by a shutdown or crash back in the queue."""
+        rows = await self.db.fetchall(
+            "UPDATE generation_jobs SET status='queued', updated_at=? WHERE status='running' RETURNING id",
+            (now_ms(),),
+        )
+        return len(rows)
+
+    async def complete(self, job_id: int) -> int | None:
+        """Delete a finished job and return its status message id (if any)."""
+        row = await self.db.execute_returning(
+            "DELETE FROM generation_jobs WHERE id=? RETURNING status_message_id", (job_id,)
+        )
+        return row["status_message_id"] if row else None
+
+    async def release(self, job_id: int, error: str) -> None:
+        """Return a job whose run crashed to the queue for another attempt."""
+        await self.db.execute(
+            "UPDATE generation_jobs SET status='queued', last_error=?, updated_at=? WHERE id=?",
+            (error[:1000], now_ms(), job_id),
+        )
+
+    async def count_pending(self) -> int:
+        return await self.db.fetchval("SELECT COUNT(*) FROM generation_jobs") or 0
+
+    async def queued_by_priority(self) -> dict[int, tuple[int, int | None]]:
+        """``priority -> (queued jobs, created_at of the oldest one)``."""
+        rows = await self.db.fetchall(
+            """
+            SELECT priority, COUNT(*) AS queued, MIN(created_at) AS oldest
+            FROM generation_jobs
+            WHERE status='queued'
+            GROUP BY priority
+            """
+        )
+        return {row["priority"]: (row["queued"], row["oldest"]) for row in rows}
+
+    _decoder = RowDecoder(
+        GenerationJob,
+        converters={
+            "payload": json.loads,
+            "due_at": from_epoch_ms,
+            "created_at": from_epoch_ms,
+            "updated_at": from_epoch_ms,
+        },
+    )
+
+
+__all__ = ["JobRepository"]
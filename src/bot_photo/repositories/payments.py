@@ -3,8 +3,10 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from .base import BaseRepository
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, now_ms, to_epoch_ms
 from ..models import Payment
+from .base import BaseRepository
 
 
 class PaymentRepository(BaseRepository):
@@ -20,63 +22,64 @@ class PaymentRepository(BaseRepository):
         payload: str | None = None,
         paid_at: datetime | None = None,
     ) -> Payment:
-        paid_at_str = paid_at.isoformat() if isinstance(paid_at, datetime) else paid_at
-        await self.db.execute(
-            """
-            INSERT INTO payments(invoice_id, user_id, amount_usdt, tokens, status, invoice_url, payload, paid_at)
-            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        row = await self._insert_returning(
+            "payments",
+            {
+                "invoice_id": invoice_id,
+                "user_id": user_id,
+                "amount_usdt": amount_usdt,
+                "tokens": tokens,
+                "status": status,
+                "invoice_url": invoice_url,
+                "payload": payload,
+                "paid_at": to_epoch_ms(paid_at),
+            },
+            on_conflict="""
             ON CONFLICT(invoice_id) DO UPDATE SET
                 status=excluded.status,
                 invoice_url=COALESCE(excluded.invoice_url, payments.invoice_url),
                 payload=COALESCE(excluded.payload, payments.payload),
                 paid_at=COALESCE(excluded.paid_at, payments.paid_at)
             """,
-            (invoice_id, user_id, amount_usdt, tokens, status, invoice_url, payload, paid_at_str),
         )
-        payment = await self.get(invoice_id)
-        if not payment:
-            raise RuntimeError("Failed to persist payment")
-        return payment
+        return self._row_to_payment(row)
 
     async def mark_credited(self, invoice_id: int) -> Payment | None:
-        await self.db.execute(
+        row = await self.db.execute_returning(
             """
             UPDATE payments
             SET status='credited',
-                paid_at=COALESCE(paid_at, CURRENT_TIMESTAMP),
-                credited_at=CURRENT_TIMESTAMP
+                paid_at=COALESCE(paid_at, ?),
+                credited_at=?
             WHERE invoice_id=?
+            RETURNING *
             """,
-            (invoice_id,),
+            (now_ms(), now_ms(), invoice_id),
         )
-        return await self.get(invoice_id)
+        return self._row_to_payment(row) if row else None
 
     async def get(self, invoice_id: int) -> Payment | None:
-        row = await self.db.fetchone("SELECT * FROM payments WHERE invoice_id=?", (invoice_id,))
-        return self._row_to_payment(row) if row else None
+        return await self.db.fetchone_as(
+            self._decoder, "SELECT * FROM payments WHERE invoice_id=?", (invoice_id,)
+        )
 
-    def _row_to_payment(self, row: dict[str, Any]) -> Payment:
-        return Payment(
-            invoice_id=row["invoice_id"],
-            user_id=row["user_id"],
-            amount_usdt=row["amount_usdt"],
-            tokens=row["tokens"],
-            status=row["status"],
-            invoice_url=row.get("invoice_url"),
-            payload=row.get("payload"),
-            created_at=self._parse_datetime(row.get("created_at")),
-            paid_at=self._parse_datetime(row.get("paid_at")),
-            credited_at=self._parse_datetime(row.get("credited_at")),
+    async def max_credited_tokens(self, user_id: int) -> int | None:
+        """Largest package the user has paid for, or None if they never paid."""
+        return await self.db.fetchval(
+            "SELECT MAX(tokens) FROM payments WHERE user_id=? AND status='credited'", (user_id,)
         )
 
-    @staticmethod
-    def _parse_datetime(value: str | None) -> datetime | None:
-        if not value:
-            return None
-        try:
-            return datetime.fromisoformat(value)
-        except ValueError:
-            return None
+    def _row_to_payment(self, row: dict[str, Any]) -> Payment:
+        return self._decoder.decode_mapping(row)
+
+    _decoder = RowDecoder(
+        Payment,
+        converters={
+            "created_at": from_epoch_ms,
+            "paid_at": from_epoch_ms,
+            "credited_at": from_epoch_ms,
+        },
+    )
 
 
 __all__ = ["PaymentRepository"]
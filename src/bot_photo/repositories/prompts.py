@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Any
 
-from ..models import PromptGeneration
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, to_epoch_ms
+from ..models import Page, PageCursor, PromptGeneration
 from .base import BaseRepository
 
 
@@ -16,18 +17,16 @@ class PromptRepository(BaseRepository):
         status: str,
         tokens_spent: int,
     ) -> PromptGeneration:
-        await self.db.execute(
-            """
-            INSERT INTO prompt_generations(user_id, prompt, template, status, tokens_spent)
-            VALUES(?, ?, ?, ?, ?)
-            """,
-            (user_id, prompt, template, status, tokens_spent),
+        row = await self._insert_returning(
+            "prompt_generations",
+            {
+                "user_id": user_id,
+                "prompt": prompt,
+                "template": template,
+                "status": status,
+                "tokens_spent": tokens_spent,
+            },
         )
-        row = await self.db.fetchone(
-            "SELECT * FROM prompt_generations WHERE rowid=last_insert_rowid()"
-        )
-        if not row:
-            raise RuntimeError("Prompt record failed")
         return self._row_to_prompt(row)
 
     async def update_status(
@@ -48,7 +47,8 @@ class PromptRepository(BaseRepository):
         )
 
     async def list_for_user(self, user_id: int, limit: int = 10) -> list[PromptGeneration]:
-        rows = await self.db.fetchall(
+        return await self.db.fetchall_as(
+            self._decoder,
             """
             SELECT * FROM prompt_generations
             WHERE user_id=?
@@ -57,24 +57,32 @@ class PromptRepository(BaseRepository):
             """,
             (user_id, limit),
         )
-        return [self._row_to_prompt(row) for row in rows]
 
-    def _row_to_prompt(self, row: dict[str, Any]) -> PromptGeneration:
-        return PromptGeneration(
-            id=row["id"],
-            user_id=row["user_id"],
-            template=row.get("template"),
-            prompt=row["prompt"],
-            status=row["status"],
-            result_path=row.get("result_path"),
-            result_file_id=row.get("result_file_id"),
-            tokens_spent=row.get("tokens_spent"),
-            created_at=self._parse_datetime(row.get("created_at")),
+    async def list_page(
+        self,
+        user_id: int,
+        limit: int = 10,
+        before: PageCursor | None = None,
+        after: PageCursor | None = None,
+    ) -> Page[PromptGeneration]:
+        return await self._fetch_page(
+            self._decoder,
+            "prompt_generations",
+            user_id,
+            self._cursor_of,
+            limit=limit,
+            before=before,
+            after=after,
         )
 
     @staticmethod
-    def _parse_datetime(value: str | None) -> datetime:
-        return datetime.fromisoformat(value) if value else datetime.utcnow()
+    def _cursor_of(record: PromptGeneration) -> PageCursor:
+        return PageCursor(to_epoch_ms(record.created_at) or 0, record.id)
+
+    def _row_to_prompt(self, row: dict[str, Any]) -> PromptGeneration:
+        return self._decoder.decode_mapping(row)
+
+    _decoder = RowDecoder(PromptGeneration, converters={"created_at": from_epoch_ms})
 
 
 __all__ = ["PromptRepository"]
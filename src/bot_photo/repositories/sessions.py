@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Any
 
-from ..models import Session
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, to_epoch_ms, now_ms
+from ..models import Page, PageCursor, Session
 from .base import BaseRepository
 
 
@@ -16,18 +17,16 @@ class SessionRepository(BaseRepository):
         status: str,
         tokens_spent: int,
     ) -> Session:
-        await self.db.execute(
-            """
-            INSERT INTO sessions(user_id, style, prompt, status, tokens_spent)
-            VALUES(?, ?, ?, ?, ?)
-            """,
-            (user_id, style, prompt, status, tokens_spent),
+        row = await self._insert_returning(
+            "sessions",
+            {
+                "user_id": user_id,
+                "style": style,
+                "prompt": prompt,
+                "status": status,
+                "tokens_spent": tokens_spent,
+            },
         )
-        row = await self.db.fetchone(
-            "SELECT * FROM sessions WHERE rowid=last_insert_rowid()"
-        )
-        if not row:
-            raise RuntimeError("Session create failed")
         return self._row_to_session(row)
 
     async def update_status(
@@ -42,40 +41,52 @@ class SessionRepository(BaseRepository):
             UPDATE sessions
             SET status=?, result_path=COALESCE(?, result_path),
                 result_file_id=COALESCE(?, result_file_id),
-                updated_at=CURRENT_TIMESTAMP
+                updated_at=?
             WHERE id=?
             """,
-            (status, result_path, result_file_id, session_id),
+            (status, result_path, result_file_id, now_ms(), session_id),
+        )
+
+    async def latest_for_user(self, user_id: int) -> Session | None:
+        return await self.db.fetchone_as(
+            self._decoder,
+            "SELECT * FROM sessions WHERE user_id=? ORDER BY created_at DESC, id DESC LIMIT 1",
+            (user_id,),
         )
 
-    async def list_for_user(self, user_id: int, limit: int = 10) -> list[Session]:
-        rows = await self.db.fetchall(
-            "SELECT * FROM sessions WHERE user_id=? ORDER BY created_at DESC LIMIT ?",
-            (user_id, limit),
-        )
-        return [self._row_to_session(row) for row in rows]
-
-    async def get_by_id(self, session_id: int) -> Session | None:
-        row = await self.db.fetchone("SELECT * FROM sessions WHERE id=?", (session_id,))
-        return self._row_to_session(row) if row else None
-
-    def _row_to_session(self, row: dict[str, Any]) -> Session:
-        return Session(
-            id=row["id"],
-            user_id=row["user_id"],
-            style=row["style"],
-            prompt=row.get("prompt"),
-            status=row["status"],
-            result_path=row.get("result_path"),
-            result_file_id=row.get("result_file_id"),
-            tokens_spent=row.get("tokens_spent"),
-            created_at=self._parse_datetime(row.get("created_at")),
-            updated_at=self._parse_datetime(row.get("updated_at")),
+    async def get_by_id(self, session_id: int) -> Session | None:
+        return await self.db.fetchone_as(
+            self._decoder, "SELECT * FROM sessions WHERE id=?", (session_id,)
+        )
+
+    async def list_page(
+        self,
+        user_id: int,
+        limit: int = 10,
+        before: PageCursor | None = None,
+        after: PageCursor | None = None,
+    ) -> Page[Session]:
+        return await self._fetch_page(
+            self._decoder,
+            "sessions",
+            user_id,
+            self._cursor_of,
+            limit=limit,
+            before=before,
+            after=after,
         )
 
     @staticmethod
-    def _parse_datetime(value: str | None) -> datetime:
-        return datetime.fromisoformat(value) if value else datetime.utcnow()
+    def _cursor_of(session: Session) -> PageCursor:
+        return PageCursor(to_epoch_ms(session.created_at) or 0, session.id)
+
+    def _row_to_session(self, row: dict[str, Any]) -> Session:
+        return self._decoder.decode_mapping(row)
+
+    _decoder = RowDecoder(
+        Session,
+        converters={"created_at": from_epoch_ms, "updated_at": from_epoch_ms},
+    )
 
 
 __all__ = ["SessionRepository"]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from ..db.timestamps import now_ms
+from ..models import StatsSnapshot
+from .base import BaseRepository, day_bucket
+
+# Rebuilds every counter from the rows currently stored in the main database.
+_RECONCILE_STATEMENTS = (
+    "DELETE FROM stats_counters",
+    "INSERT INTO stats_counters(metric, scope, bucket, value) SELECT 'users', 'all', '', COUNT(*) FROM users",
+    *(
+        statement
+        for metric, table in (("sessions", "sessions"), ("prompts", "prompt_generations"))
+        for statement in (
+            f"INSERT INTO stats_counters(metric, scope, bucket, value) "
+            f"SELECT '{metric}', 'all', '', COUNT(*) FROM {table}",
+            f"INSERT INTO stats_counters(metric, scope, bucket, value) "
+            f"SELECT '{metric}', 'day', strftime('%Y-%m-%d', created_at / 1000, 'unixepoch'), COUNT(*) "
+            f"FROM {table} GROUP BY 3",
+            f"INSERT INTO stats_counters(metric, scope, bucket, value) "
+            f"SELECT '{metric}', 'status', status, COUNT(*) FROM {table} GROUP BY status",
+        )
+    ),
+)
+
+
+class StatsRepository(BaseRepository):
+    """Reads ``stats_counters``, which triggers on the counted tables keep up to date."""
+
+    async def snapshot(self) -> StatsSnapshot:
+        rows = await self.db.fetchall(
+            """
+            SELECT metric, scope, bucket, value FROM stats_counters
+            WHERE scope IN ('all', 'status') OR (scope='day' AND bucket=?)
+            """,
+            (day_bucket(now_ms()),),
+        )
+        snapshot = StatsSnapshot()
+        for row in rows:
+            metric, scope, value = row["metric"], row["scope"], row["value"]
+            if scope == "all":
+                snapshot.totals[metric] = value
+            elif scope == "day":
+                snapshot.today[metric] = value
+            elif value:
+                snapshot.by_status.setdefault(metric, {})[row["bucket"]] = value
+        return snapshot
+
+    async def reconcile(self) -> StatsSnapshot:
+        """Recount everything from scratch, e.g. after editing the database by hand."""
+        async with self.db.transaction():
+            for statement in _RECONCILE_STATEMENTS:
+                await self.db.execute(statement)
+        return await self.snapshot()
+
+
+__all__ = ["StatsRepository"]
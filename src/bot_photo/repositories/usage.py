@@ -1,25 +1,24 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-
+from ..db.timestamps import now_ms
 from .base import BaseRepository
 
 
 class UsageRepository(BaseRepository):
     async def add_event(self, user_id: int, kind: str) -> None:
         await self.db.execute(
-            "INSERT INTO usage_events(user_id, kind) VALUES(?, ?)", (user_id, kind)
+            "INSERT INTO usage_events(user_id, kind, created_at) VALUES(?, ?, ?)",
+            (user_id, kind, now_ms()),
         )
 
     async def count_recent(self, user_id: int, kind: str, window_minutes: int) -> int:
-        threshold = datetime.utcnow() - timedelta(minutes=window_minutes)
-        formatted = threshold.strftime("%Y-%m-%d %H:%M:%S")
+        threshold = now_ms() - window_minutes * 60_000
         value = await self.db.fetchval(
             """
             SELECT COUNT(*) FROM usage_events
             WHERE user_id=? AND kind=? AND created_at >= ?
             """,
-            (user_id, kind, formatted),
+            (user_id, kind, threshold),
         )
         return int(value or 0)
 
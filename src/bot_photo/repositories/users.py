@@ -1,13 +1,42 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import logging
 from typing import Any
 
+from ..db import Database
+from ..db.decoders import RowDecoder
+from ..db.timestamps import from_epoch_ms, now_ms
 from ..models import User
 from .base import BaseRepository
+from .cache import CacheStats, LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Keeps the batched UPDATE well below SQLite's bound-parameter limit.
+_SEEN_BATCH = 400
 
 
 class UserRepository(BaseRepository):
+    """Users with a read-through LRU cache keyed by ``telegram_id``.
+
+    Writes refresh the cache from their ``RETURNING`` row. Inside a
+    ``Database.transaction()`` the cache is bypassed and the user is dropped
+    again when the transaction ends, so a rollback can't leave stale data.
+
+    ``mark_seen`` buffers ``last_seen_at`` in memory; the buffer is written
+    with one UPDATE per flush instead of one per incoming update.
+    """
+
+    def __init__(self, db: Database, cache_size: int = 10_000, cache_ttl_seconds: float = 60) -> None:
+        super().__init__(db)
+        self._cache: LRUCache[int, User] = LRUCache(cache_size, cache_ttl_seconds)
+        self._pending_seen: dict[int, int] = {}
+        self._seen_flusher: asyncio.Task[None] | None = None
+
+    def cache_stats(self) -> CacheStats:
+        return self._cache.stats()
+
     async def upsert_user(
         self,
         telegram_id: int,
@@ -17,105 +46,188 @@ class UserRepository(BaseRepository):
         starting_tokens: int,
         hourly_limit: int,
     ) -> User:
-        await self.db.execute(
-            """
-            INSERT INTO users(telegram_id, username, full_name, tokens, is_admin, hourly_limit)
-            VALUES(?, ?, ?, ?, ?, ?)
+        row = await self._insert_returning(
+            "users",
+            {
+                "telegram_id": telegram_id,
+                "username": username,
+                "full_name": full_name,
+                "tokens": starting_tokens,
+                "is_admin": 1 if is_admin else 0,
+                "hourly_limit": hourly_limit,
+                "last_seen_at": now_ms(),
+            },
+            on_conflict="""
             ON CONFLICT(telegram_id) DO UPDATE SET
                 username=excluded.username,
                 full_name=excluded.full_name,
                 is_admin=excluded.is_admin,
-                last_seen_at=CURRENT_TIMESTAMP,
+                last_seen_at=excluded.last_seen_at,
                 tokens=users.tokens
             """,
-            (
-                telegram_id,
-                username,
-                full_name,
-                starting_tokens,
-                1 if is_admin else 0,
-                hourly_limit,
-            ),
         )
-        user = await self.get_by_id(telegram_id)
-        if user:
-            return user
-        raise RuntimeError("Failed to create user")
+        self._pending_seen.pop(telegram_id, None)
+        return self._remember(row)
 
     async def get_by_id(self, telegram_id: int) -> User | None:
-        row = await self.db.fetchone("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
-        return self._row_to_user(row) if row else None
+        if self.db.in_transaction:
+            # Reads that guard a write (balance checks) must see the writer's view.
+            return await self._load(telegram_id)
+        user = self._cache.get(telegram_id)
+        if user is not None:
+            return user
+        token = self._cache.write_token()
+        user = await self._load(telegram_id)
+        if user is not None:
+            self._cache.fill(telegram_id, user, token)
+        return user
 
     async def update_tokens(self, telegram_id: int, delta: int) -> int:
         # Clamp to non-negative and return the new balance.
-        row = await self.db.fetchone(
+        row = await self.db.execute_returning(
             """
             UPDATE users
             SET tokens = MAX(tokens + ?, 0),
-                last_seen_at = CURRENT_TIMESTAMP
+                last_seen_at = ?
             WHERE telegram_id=?
-            RETURNING tokens
+            RETURNING *
             """,
-            (delta, telegram_id),
+            (delta, now_ms(), telegram_id),
         )
         if not row:
+            self._forget(telegram_id)
             return 0
-        return row["tokens"]
+        return self._remember(row).tokens
 
     async def set_demo_viewed(self, telegram_id: int) -> None:
-        await self.db.execute(
-            "UPDATE users SET demo_viewed_at=CURRENT_TIMESTAMP WHERE telegram_id=?",
-            (telegram_id,),
+        await self._update(
+            telegram_id,
+            "UPDATE users SET demo_viewed_at=? WHERE telegram_id=? RETURNING *",
+            (now_ms(), telegram_id),
         )
 
+    def mark_seen(self, telegram_id: int) -> None:
+        """Remember the user was active; written by the next ``flush_last_seen``."""
+        self._pending_seen[telegram_id] = now_ms()
+
+    async def flush_last_seen(self) -> int:
+        pending, self._pending_seen = self._pending_seen, {}
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), _SEEN_BATCH):
+                chunk = items[start : start + _SEEN_BATCH]
+                values = ", ".join("(?, ?)" for _ in chunk)
+                await self.db.execute(
+                    f"""
+                    WITH seen(telegram_id, seen_at) AS (VALUES {values})
+                    UPDATE users
+                    SET last_seen_at = (
+                        SELECT seen_at FROM seen WHERE seen.telegram_id = users.telegram_id
+                    )
+                    WHERE telegram_id IN (SELECT telegram_id FROM seen)
+                    """,
+                    tuple(value for item in chunk for value in item),
+                )
+        except BaseException:
+            # Put unwritten marks back unless a newer one arrived meanwhile.
+            for telegram_id, seen_at in items:
+                self._pending_seen.setdefault(telegram_id, seen_at)
+            raise
+        return len(items)
+
+    def start_flushing(self, interval_seconds: float) -> None:
+        if interval_seconds <= 0:
+            return
+        if self._seen_flusher is None or self._seen_flusher.done():
+            self._seen_flusher = asyncio.create_task(self._flush_seen_loop(interval_seconds))
+
+    async def stop_flushing(self) -> None:
+        if self._seen_flusher is not None:
+            self._seen_flusher.cancel()
+            try:
+                await self._seen_flusher
+            except asyncio.CancelledError:
+                pass
+            self._seen_flusher = None
+        await self.flush_last_seen()
+
+    async def _flush_seen_loop(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush_last_seen()
+            except Exception:
+                logger.exception("Failed to flush last_seen_at")
+
     async def record_last_seen(self, telegram_id: int) -> None:
-        await self.db.execute(
-            "UPDATE users SET last_seen_at=CURRENT_TIMESTAMP WHERE telegram_id=?",
-            (telegram_id,),
+        await self._update(
+            telegram_id,
+            "UPDATE users SET last_seen_at=? WHERE telegram_id=? RETURNING *",
+            (now_ms(), telegram_id),
         )
 
     async def set_blocked(self, telegram_id: int, blocked: bool) -> None:
-        await self.db.execute(
-            "UPDATE users SET is_blocked=? WHERE telegram_id=?", (1 if blocked else 0, telegram_id)
+        await self._update(
+            telegram_id,
+            "UPDATE users SET is_blocked=? WHERE telegram_id=? RETURNING *",
+            (1 if blocked else 0, telegram_id),
         )
 
     async def set_agreement_accepted(self, telegram_id: int) -> None:
-        await self.db.execute(
-            "UPDATE users SET agreement_accepted_at=CURRENT_TIMESTAMP WHERE telegram_id=?",
-            (telegram_id,),
+        await self._update(
+            telegram_id,
+            "UPDATE users SET agreement_accepted_at=? WHERE telegram_id=? RETURNING *",
+            (now_ms(), telegram_id),
         )
 
     async def set_admin_status(self, telegram_id: int, is_admin: bool) -> None:
-        await self.db.execute(
-            "UPDATE users SET is_admin=? WHERE telegram_id=?", (1 if is_admin else 0, telegram_id)
+        await self._update(
+            telegram_id,
+            "UPDATE users SET is_admin=? WHERE telegram_id=? RETURNING *",
+            (1 if is_admin else 0, telegram_id),
         )
     
     async def get_all_users(self) -> list[User]:
-        rows = await self.db.fetchall("SELECT * FROM users")
-        return [self._row_to_user(row) for row in rows]
+        return await self.db.fetchall_as(self._decoder, "SELECT * FROM users")
 
-    def _row_to_user(self, row: dict[str, Any]) -> User:
-        return User(
-            telegram_id=row["telegram_id"],
-            username=row.get("username"),
-            full_name=row.get("full_name"),
-            tokens=row.get("tokens", 0),
-            is_admin=bool(row.get("is_admin", 0)),
-            is_blocked=bool(row.get("is_blocked", 0)),
-            hourly_limit=row.get("hourly_limit", 5),
-            last_seen_at=self._parse_datetime(row.get("last_seen_at")),
-            agreement_accepted_at=self._parse_datetime(row.get("agreement_accepted_at")),
-            demo_viewed_at=self._parse_datetime(row.get("demo_viewed_at")),
+    async def _load(self, telegram_id: int) -> User | None:
+        return await self.db.fetchone_as(
+            self._decoder, "SELECT * FROM users WHERE telegram_id=?", (telegram_id,)
         )
 
-    @staticmethod
-    def _parse_datetime(value: str | None) -> datetime | None:
-        if not value:
-            return None
-        try:
-            return datetime.fromisoformat(value)
-        except ValueError:
-            return None
+    async def _update(self, telegram_id: int, query: str, params: tuple[Any, ...]) -> None:
+        row = await self.db.execute_returning(query, params)
+        if row:
+            self._remember(row)
+        else:
+            self._forget(telegram_id)
+
+    def _remember(self, row: dict[str, Any]) -> User:
+        user = self._row_to_user(row)
+        if self.db.in_transaction:
+            self._forget(user.telegram_id)
+        else:
+            self._cache.put(user.telegram_id, user)
+        return user
+
+    def _forget(self, telegram_id: int) -> None:
+        self._cache.invalidate(telegram_id)
+        if self.db.in_transaction:
+            self.db.after_transaction(lambda: self._cache.invalidate(telegram_id))
+
+    def _row_to_user(self, row: dict[str, Any]) -> User:
+        return self._decoder.decode_mapping(row)
+
+    _decoder = RowDecoder(
+        User,
+        converters={
+            "is_admin": bool,
+            "is_blocked": bool,
+            "last_seen_at": from_epoch_ms,
+            "agreement_accepted_at": from_epoch_ms,
+            "demo_viewed_at": from_epoch_ms,
+        },
+    )
 
 
 __all__ = ["UserRepository"]
@@ -1,14 +1,22 @@
 from .examples import Example, ExamplesService
+from .face_cache import FaceEncodingCache
+from .generation_queue import GenerationQueue
+from .hedging import Hedger
 from .limits import RateLimitService
 from .nano_banana import NanoBananaClient
+from .retry import RetryPolicy
 from .tokens import TokenService
 from .crypto_pay import CryptoPayService
 
 __all__ = [
     "Example",
     "ExamplesService",
+    "FaceEncodingCache",
+    "GenerationQueue",
+    "Hedger",
     "RateLimitService",
     "NanoBananaClient",
+    "RetryPolicy",
     "TokenService",
     "CryptoPayService",
 ]
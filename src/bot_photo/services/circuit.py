@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(slots=True)
+class BreakerStats:
+    name: str
+    state: str
+    window_calls: int
+    bad_rate: float
+    opened: int
+    short_circuited: int
+    retry_in: float
+
+
+@dataclass(frozen=True, slots=True)
+class BreakerPermit:
+    """What ``acquire`` admitted a call as; hand it back to ``release``."""
+
+    probe: bool
+    # Times the circuit had opened when the call was admitted.
+    generation: int
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's circuit is open; the call was not sent."""
+
+    def __init__(self, name: str, retry_in: float) -> None:
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit for {name} is open, next probe in {retry_in:.0f} s")
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over the last ``window`` calls.
+
+    A call is bad when it overloaded or failed upstream, or when it
+    succeeded slower than ``slow_call_seconds``. Once at least ``min_calls``
+    are in the window and the bad share reaches ``failure_rate``, the circuit
+    opens and calls fail immediately for ``open_seconds``. Then up to
+    ``probes`` calls go through (half-open): a good one closes the circuit
+    with a clean window, a bad one opens it again. Only calls admitted as
+    probes decide the half-open state; calls admitted while closed that
+    finish after the circuit opened are ignored. Calls reported without an
+    outcome (e.g. a rejected prompt) only release their probe slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 90.0,
+        open_seconds: float = 30.0,
+        probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._outcomes: deque[bool] = deque(maxlen=max(window, 1))
+        self._min_calls = max(min_calls, 1)
+        self._failure_rate = failure_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._open_seconds = open_seconds
+        self._probes = max(probes, 1)
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._opened = 0
+        self._short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self._open_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def acquire(self) -> BreakerPermit:
+        """Admit a call or raise ``CircuitOpenError``; pair with ``release``."""
+        state = self.state
+        if state == CLOSED:
+            return BreakerPermit(probe=False, generation=self._opened)
+        if state == HALF_OPEN and self._probes_in_flight < self._probes:
+            self._state = HALF_OPEN
+            self._probes_in_flight += 1
+            return BreakerPermit(probe=True, generation=self._opened)
+        self._short_circuited += 1
+        raise CircuitOpenError(self._name, self._retry_in())
+
+    def release(self, permit: BreakerPermit, outcome: str | None, latency: float) -> None:
+        """Report a call admitted by ``acquire``: "success", "overload" or None."""
+        if permit.generation != self._opened:
+            return  # admitted before the circuit last opened
+        if permit.probe:
+            self._release_probe(outcome, latency)
+            return
+        if outcome is None or self._state != CLOSED:
+            return
+        self._outcomes.append(self._is_bad(outcome, latency))
+        if len(self._outcomes) >= self._min_calls and self._bad_rate() >= self._failure_rate:
+            self._trip()
+
+    def stats(self) -> BreakerStats:
+        return BreakerStats(
+            name=self._name,
+            state=self.state,
+            window_calls=len(self._outcomes),
+            bad_rate=self._bad_rate(),
+            opened=self._opened,
+            short_circuited=self._short_circuited,
+            retry_in=self._retry_in() if self.state == OPEN else 0.0,
+        )
+
+    def _release_probe(self, outcome: str | None, latency: float) -> None:
+        if self._state != HALF_OPEN:
+            return  # another probe already closed the circuit
+        self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+        if outcome is None:
+            return
+        if self._is_bad(outcome, latency):
+            self._trip()
+        else:
+            self._state = CLOSED
+            self._outcomes.clear()
+
+    def _is_bad(self, outcome: str, latency: float) -> bool:
+        return outcome != "success" or latency > self._slow_call_seconds
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._opened += 1
+        self._probes_in_flight = 0
+
+    def _bad_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _retry_in(self) -> float:
+        return max(self._opened_at + self._open_seconds - self._clock(), 0.0)
+
+
+__all__ = [
+    "BreakerPermit",
+    "BreakerStats",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CLOSED",
+    "HALF_OPEN",
+    "OPEN",
+]
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+
+@dataclass(slots=True)
+class LimiterStats:
+    name: str
+    limit: int
+    in_flight: int
+    queued: int
+    successes: int
+    overloads: int
+    decreases: int
+    rejected: int
+    timed_out: int
+    latency_ms: float
+    baseline_ms: float
+
+
+class LimiterRejected(RuntimeError):
+    """Raised when a request can't get a slot: the queue is full or its deadline passed."""
+
+
+class Slot:
+    """One admitted request; the caller reports how the upstream answered."""
+
+    __slots__ = ("started", "saturated", "outcome")
+
+    def __init__(self, saturated: bool) -> None:
+        self.started = time.monotonic()
+        self.saturated = saturated
+        self.outcome: str | None = None
+
+    def succeeded(self) -> None:
+        self.outcome = "success"
+
+    def overloaded(self) -> None:
+        """Throttling (429), 5xx or a timeout: the upstream wants less load."""
+        self.outcome = "overload"
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency window for one upstream.
+
+    Up to ``limit`` requests run at once; the rest wait in FIFO order for at
+    most ``queue_timeout`` seconds (``max_queue`` waiters at most). A success
+    while the window was full grows the limit by ``1 / limit`` (about +1 per
+    round trip), unless latency has drifted above ``latency_tolerance`` times
+    the baseline. An overload multiplies it by ``backoff``, at most once per
+    observed round trip so one burst of failures counts as one signal.
+    Outcomes the caller leaves unreported (e.g. a 400) don't move the limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        max_queue: int = 100,
+        queue_timeout: float = 60.0,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self._name = name
+        self._min = max(min_limit, 1)
+        self._max = max(max_limit, self._min)
+        self._limit = float(min(max(initial, self._min), self._max))
+        self._backoff = backoff
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._latency_tolerance = latency_tolerance
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._latency: float | None = None
+        self._baseline: float | None = None
+        self._last_decrease = 0.0
+        self._successes = 0
+        self._overloads = 0
+        self._decreases = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            name=self._name,
+            limit=self.limit,
+            in_flight=self._in_flight,
+            queued=len(self._waiters),
+            successes=self._successes,
+            overloads=self._overloads,
+            decreases=self._decreases,
+            rejected=self._rejected,
+            timed_out=self._timed_out,
+            latency_ms=(self._latency or 0.0) * 1000,
+            baseline_ms=(self._baseline or 0.0) * 1000,
+        )
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None) -> AsyncIterator[Slot]:
+        saturated = await self._acquire(self._queue_timeout if timeout is None else timeout)
+        slot = Slot(saturated)
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    async def _acquire(self, timeout: float) -> bool:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return self._in_flight >= self.limit
+        if len(self._waiters) >= self._max_queue:
+            self._rejected += 1
+            raise LimiterRejected(f"{self._name}: {len(self._waiters)} requests already waiting")
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            self._pass_on(waiter)
+            raise LimiterRejected(f"{self._name}: no free slot within {timeout:g} s") from None
+        except BaseException:
+            self._pass_on(waiter)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        # A waiter only gets a slot by hand-over, so the window was full.
+        return True
+
+    def _pass_on(self, waiter: asyncio.Future[None]) -> None:
+        """Hand a slot given to a waiter that timed out or was cancelled to the next one.
+
+        The slot can be handed over in the same loop iteration that the
+        deadline fires or the caller is cancelled; dropping it would leak it.
+        """
+        if waiter.done() and not waiter.cancelled():
+            self._in_flight -= 1
+            self._wake()
+
+    def _release(self, slot: Slot) -> None:
+        self._in_flight -= 1
+        now = time.monotonic()
+        if slot.outcome == "success":
+            self._on_success(now - slot.started, slot.saturated)
+        elif slot.outcome == "overload":
+            self._on_overload(now)
+        self._wake()
+
+    def _on_success(self, latency: float, saturated: bool) -> None:
+        self._successes += 1
+        self._latency = latency if self._latency is None else self._latency * 0.8 + latency * 0.2
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            # Drift up slowly so one lucky fast response doesn't pin the baseline.
+            self._baseline += (latency - self._baseline) * 0.01
+        if saturated and self._latency <= self._baseline * self._latency_tolerance:
+            self._limit = min(self._limit + 1 / self._limit, float(self._max))
+
+    def _on_overload(self, now: float) -> None:
+        self._overloads += 1
+        if now - self._last_decrease < (self._latency or 1.0):
+            return
+        self._last_decrease = now
+        self._decreases += 1
+        self._limit = max(self._limit * self._backoff, float(self._min))
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+
+__all__ = ["AdaptiveLimiter", "LimiterRejected", "LimiterStats", "Slot"]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .json_stream import Base64File
+
+# (path, mtime in ns, size): a replaced or rewritten file gets a new key.
+FaceKey = tuple[str, int, int]
+
+
+@dataclass(slots=True)
+class FaceCacheStats:
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    # Files above the per-entry limit, sent from disk instead of cached.
+    streamed: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class FaceEncodingCache:
+    """LRU of base64-encoded face photos, bounded by the encoded size.
+
+    Entries are keyed by path, mtime and size, so an overwritten file is
+    read again. ``stat``, reading and encoding run in a worker thread, never
+    on the event loop; concurrent misses for the same file share one encode.
+    Files larger than ``max_entry_bytes`` once encoded are neither encoded
+    up front nor cached: they come back as ``Base64File`` and are streamed
+    from disk when the request body is sent, so only small faces are ever
+    held in memory as base64.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024
+    ) -> None:
+        self._max_bytes = max(max_bytes, 0)
+        self._max_entry_bytes = min(max(max_entry_bytes, 0), self._max_bytes)
+        self._entries: OrderedDict[FaceKey, str] = OrderedDict()
+        self._bytes = 0
+        self._pending: dict[FaceKey, asyncio.Task[str | None]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._streamed = 0
+
+    def stats(self) -> FaceCacheStats:
+        return FaceCacheStats(
+            entries=len(self._entries),
+            bytes=self._bytes,
+            max_bytes=self._max_bytes,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            streamed=self._streamed,
+        )
+
+    async def parts(self, sources: list[str]) -> list[dict[str, Any]]:
+        """``inline_data`` parts for the files that exist, in order."""
+        encoded = await asyncio.gather(*(self.encode(Path(source)) for source in sources))
+        return [
+            {"inline_data": {"mime_type": guess_mime_type(Path(source)), "data": data}}
+            for source, data in zip(sources, encoded)
+            if data is not None
+        ]
+
+    async def encode(self, path: Path) -> str | Base64File | None:
+        """Base64 of the file, or None when it doesn't exist."""
+        key = await asyncio.to_thread(_stat_key, path)
+        if key is None:
+            return None
+        face_file = Base64File(path, key[2])
+        if face_file.encoded_size > self._max_entry_bytes:
+            self._streamed += 1
+            return face_file
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return data
+        pending = self._pending.get(key)
+        if pending is None:
+            self._misses += 1
+            # Its own task: a cancelled caller doesn't undo the encode for the others.
+            pending = self._pending[key] = asyncio.create_task(self._fill(key, path))
+        else:
+            self._hits += 1
+        return await asyncio.shield(pending)
+
+    async def _fill(self, key: FaceKey, path: Path) -> str | None:
+        try:
+            data = await asyncio.to_thread(_encode_file, path)
+        finally:
+            self._pending.pop(key, None)
+        if data is not None:
+            self._store(key, data)
+        return data
+
+    def _store(self, key: FaceKey, data: str) -> None:
+        if len(data) > self._max_entry_bytes or key in self._entries:
+            return
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._evictions += 1
+
+
+def guess_mime_type(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".png":
+        return "image/png"
+    if suffix == ".webp":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _stat_key(path: Path) -> FaceKey | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (os.fspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _encode_file(path: Path) -> str | None:
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None  # removed between stat and read
+    return base64.b64encode(raw).decode("ascii")
+
+
+__all__ = ["FaceCacheStats", "FaceEncodingCache", "guess_mime_type"]
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+
+from ..db import Database
+from ..db.timestamps import now_ms, to_epoch_ms
+from ..keyboards import sessions_keyboard
+from ..models import GenerationJob
+from ..repositories.faces import FaceRepository
+from ..repositories.jobs import JobRepository
+from ..repositories.payments import PaymentRepository
+from ..repositories.prompts import PromptRepository
+from ..repositories.sessions import SessionRepository
+from ..storage import FileStorage
+from .examples import ExamplesService
+from .nano_banana import GeneratedImage, NanoBananaClient
+from .tokens import TokenService
+
+logger = logging.getLogger(__name__)
+
+SESSION_JOB = "session"
+PROMPT_JOB = "prompt"
+
+# Scheduling classes, most urgent first; a job's ``priority`` indexes this tuple.
+PRIORITY_CLASSES = ("priority", "paid", "free")
+_PRIORITY, _PAID, _FREE = range(len(PRIORITY_CLASSES))
+
+
+@dataclass(slots=True)
+class QueueClassStats:
+    """Queue depth and claim wait times of one priority class."""
+
+    name: str
+    queued: int = 0
+    oldest_wait_ms: float = 0.0
+    claimed: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    recent_waits: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_ms / self.claimed if self.claimed else 0.0
+
+    @property
+    def p95_wait_ms(self) -> float:
+        if not self.recent_waits:
+            return 0.0
+        ordered = sorted(self.recent_waits)
+        return ordered[min(math.ceil(len(ordered) * 0.95) - 1, len(ordered) - 1)]
+
+    def record(self, wait_ms: float) -> None:
+        self.claimed += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.recent_waits.append(wait_ms)
+
+
+class GenerationQueue:
+    """Runs paid generations on a pool of background workers.
+
+    Handlers spend tokens and ``enqueue`` a job in the same transaction, then
+    reply straight away. Workers claim jobs from ``generation_jobs``, call the
+    model, store the result and message the user. A job row is deleted only
+    together with its result or refund, so jobs interrupted by a restart are
+    picked up again on ``start``; after ``max_attempts`` interrupted runs the
+    job is refunded instead.
+
+    Jobs are ordered by a virtual deadline: ``created_at`` plus
+    ``aging_seconds`` per class step. Buyers of a package with at least
+    ``priority_min_tokens`` tokens (the smallest package sold with priority
+    generation; None disables the class) get class 0, other paying users
+    class 1, everyone else class 2, so at peak times paid jobs go first
+    while a free job never waits more than ``2 * aging_seconds`` behind
+    newer paid ones.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        db: Database,
+        jobs: JobRepository,
+        *,
+        sessions: SessionRepository,
+        prompts: PromptRepository,
+        faces: FaceRepository,
+        tokens: TokenService,
+        examples: ExamplesService,
+        files: FileStorage,
+        client: NanoBananaClient,
+        payments: PaymentRepository,
+        priority_min_tokens: int | None,
+        aging_seconds: float = 60,
+        workers: int = 4,
+        max_attempts: int = 3,
+        poll_seconds: float = 5.0,
+    ) -> None:
+        self._bot = bot
+        self._db = db
+        self._jobs = jobs
+        self._sessions = sessions
+        self._prompts = prompts
+        self._faces = faces
+        self._tokens = tokens
+        self._examples = examples
+        self._files = files
+        self._client = client
+        self._payments = payments
+        self._priority_min_tokens = priority_min_tokens
+        self._aging_ms = int(aging_seconds * 1000)
+        self._class_stats = [QueueClassStats(name) for name in PRIORITY_CLASSES]
+        self._worker_count = max(workers, 1)
+        self._max_attempts = max(max_attempts, 1)
+        self._poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        requeued = await self._jobs.requeue_running()
+        if requeued:
+            logger.info("Resuming %s interrupted generation jobs", requeued)
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"generation-worker-{index}")
+                for index in range(self._worker_count)
+            ]
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running stay queued for the next start."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(
+        self,
+        kind: str,
+        record_id: int,
+        user_id: int,
+        chat_id: int,
+        payload: dict[str, Any],
+    ) -> GenerationJob:
+        """Queue a job; call it inside the transaction that spends the tokens."""
+        priority = await self.priority_for(user_id)
+        return await self._jobs.enqueue(
+            kind,
+            record_id,
+            user_id,
+            chat_id,
+            payload,
+            priority=priority,
+            due_at=now_ms() + priority * self._aging_ms,
+        )
+
+    async def priority_for(self, user_id: int) -> int:
+        """Scheduling class from the user's purchase history."""
+        largest = await self._payments.max_credited_tokens(user_id)
+        if largest is None:
+            return _FREE
+        if self._priority_min_tokens is not None and largest >= self._priority_min_tokens:
+            return _PRIORITY
+        return _PAID
+
+    async def submit(self, job: GenerationJob, status_message: Any | None = None) -> None:
+        """Hand a committed job to the workers, with the message to replace when it is done."""
+        if status_message is not None:
+            attached = await self._jobs.set_status_message(job.id, status_message.message_id)
+            if not attached:
+                # A polling worker already finished the job.
+                await self._safe(status_message.delete())
+        self._wakeup.set()
+
+    async def pending(self) -> int:
+        return await self._jobs.count_pending()
+
+    async def class_stats(self) -> list[QueueClassStats]:
+        """Per-class stats with the current queue depth filled in."""
+        depth = await self._jobs.queued_by_priority()
+        now = now_ms()
+        for priority, stats in enumerate(self._class_stats):
+            queued, oldest = depth.get(priority, (0, None))
+            stats.queued = queued
+            stats.oldest_wait_ms = float(now - oldest) if oldest else 0.0
+        return self._class_stats
+
+    async def _worker(self) -> None:
+        while True:
+            # Cleared before claiming, so a wakeup during the claim is not lost.
+            self._wakeup.clear()
+            try:
+                job = await self._jobs.claim()
+            except Exception:
+                logger.exception("Failed to claim a generation job")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._record_wait(job)
+            try:
+                await self._process(job)
+            except Exception as exc:
+                logger.exception("Generation job %s crashed", job.id)
+                try:
+                    await self._jobs.release(job.id, repr(exc))
+                except Exception:
+                    logger.exception("Failed to release generation job %s", job.id)
+
+    def _record_wait(self, job: GenerationJob) -> None:
+        if job.attempts > 1:
+            return  # resumed after a restart; its wait is not scheduling latency
+        priority = min(max(job.priority, 0), len(self._class_stats) - 1)
+        wait_ms = now_ms() - (to_epoch_ms(job.created_at) or now_ms())
+        self._class_stats[priority].record(max(wait_ms, 0))
+
+    async def _process(self, job: GenerationJob) -> None:
+        if job.attempts > self._max_attempts:
+            logger.warning("Giving up on generation job %s after %s attempts", job.id, job.attempts)
+            await self._fail(job, "Не вышло сгенерировать: задача прерывалась слишком много раз.")
+            return
+        if job.kind == SESSION_JOB:
+            await self._run_session(job)
+        elif job.kind == PROMPT_JOB:
+            await self._run_prompt(job)
+        else:
+            await self._fail(job, f"Неизвестный тип задачи: {job.kind}")
+
+    async def _run_session(self, job: GenerationJob) -> None:
+        payload = job.payload
+        note: str | None = None
+        status = "ready"
+        try:
+            face_paths = [await self._face_file(job.user_id, face) for face in payload["faces"]]
+            image = await self._client.generate_photosession(
+                style=payload["style"],
+                prompt=payload.get("prompt"),
+                orientation=payload["orientation"],
+                face_urls=face_paths,
+            )
+        except Exception as exc:
+            logger.warning("Photosession job %s failed: %s", job.id, exc)
+            fallback = self._examples.get_by_style(payload["style"])
+            if not (fallback and fallback.file_path.exists()):
+                await self._fail(job, f"Не вышло сгенерировать: {exc}")
+                return
+            path = await self._files.save_generation(fallback.file_path.read_bytes())
+            note = "Основная генерация недоступна, показан эталон из примеров. Токены возвращены."
+            status = "fallback"
+        else:
+            path = await self._save(image)
+        async with self._db.transaction():
+            if status == "fallback":
+                await self._tokens.add(job.user_id, payload["cost"])
+            await self._sessions.update_status(job.record_id, status=status, result_path=path.as_posix())
+            status_message_id = await self._jobs.complete(job.id)
+        await self._deliver(
+            job,
+            status_message_id,
+            path,
+            "Готово! Вот твоя съёмка. Хочешь ещё? Запусти новую сцену.",
+            note,
+        )
+
+    async def _run_prompt(self, job: GenerationJob) -> None:
+        payload = job.payload
+        try:
+            face_urls: list[str] | None = None
+            if payload.get("face_id"):
+                face = await self._faces.get_by_id(payload["face_id"], job.user_id)
+                if not face:
+                    raise RuntimeError("Лицо не найдено.")
+                face_urls = [
+                    await self._face_file(
+                        job.user_id,
+                        {"face_id": face.id, "file_id": face.file_id, "file_path": face.file_path},
+                    )
+                ]
+            image = await self._client.generate_prompt(
+                prompt=payload["prompt"], template=payload.get("template"), face_urls=face_urls
+            )
+        except Exception as exc:
+            logger.warning("Prompt job %s failed: %s", job.id, exc)
+            await self._fail(job, f"Не вышло сгенерировать: {exc}")
+            return
+        path = await self._save(image)
+        async with self._db.transaction():
+            await self._prompts.update_status(job.record_id, status="ready", result_path=path.as_posix())
+            status_message_id = await self._jobs.complete(job.id)
+        await self._deliver(job, status_message_id, path, "Готово!")
+
+    async def _save(self, image: GeneratedImage) -> Path:
+        try:
+            return await self._files.save_generation_file(image.path, image.mime_type)
+        except BaseException:
+            image.discard()
+            raise
+
+    async def _fail(self, job: GenerationJob, text: str) -> None:
+        """Refund, mark the record failed and tell the user, all or nothing."""
+        async with self._db.transaction():
+            await self._tokens.add(job.user_id, job.payload["cost"])
+            if job.kind == SESSION_JOB:
+                await self._sessions.update_status(job.record_id, status="failed")
+            elif job.kind == PROMPT_JOB:
+                await self._prompts.update_status(job.record_id, status="failed")
+            status_message_id = await self._jobs.complete(job.id)
+        if status_message_id:
+            await self._safe(
+                self._bot.edit_message_text(text, chat_id=job.chat_id, message_id=status_message_id)
+            )
+        else:
+            await self._safe(self._bot.send_message(job.chat_id, text))
+
+    async def _deliver(
+        self,
+        job: GenerationJob,
+        status_message_id: int | None,
+        path: Path,
+        caption: str,
+        note: str | None = None,
+    ) -> None:
+        # The result is already committed; delivery failures are only logged.
+        if status_message_id:
+            await self._safe(self._bot.delete_message(job.chat_id, status_message_id))
+        await self._safe(
+            self._bot.send_photo(
+                job.chat_id,
+                FSInputFile(path),
+                caption=caption,
+                reply_markup=sessions_keyboard(),
+            )
+        )
+        if note:
+            await self._safe(self._bot.send_message(job.chat_id, note))
+
+    async def _face_file(self, user_id: int, face: dict[str, Any]) -> str:
+        path_value = face.get("file_path")
+        if path_value and Path(path_value).exists():
+            return Path(path_value).as_posix()
+        file_id = face.get("file_id")
+        if not file_id:
+            raise RuntimeError("Не удалось получить файл лица.")
+        new_path = await self._files.save_face(self._bot, user_id, file_id)
+        if face.get("face_id"):
+            await self._faces.update_file_path(face["face_id"], user_id, new_path.as_posix())
+        return new_path.as_posix()
+
+    @staticmethod
+    async def _safe(call: Any) -> None:
+        try:
+            await call
+        except Exception:
+            logger.warning("Telegram call failed", exc_info=True)
+
+
+__all__ = ["GenerationQueue", "PRIORITY_CLASSES", "PROMPT_JOB", "QueueClassStats", "SESSION_JOB"]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    requests: int
+    hedged: int
+    hedge_wins: int
+    budget_denied: int
+    trigger_ms: float | None
+
+
+class Hedger:
+    """Sends a backup request when the primary is slower than usual.
+
+    The trigger is the ``percentile`` of the last ``window`` primary
+    latencies (no hedging until ``min_samples`` were seen). A primary that
+    loses to its hedge is sampled at the time the hedge won, a lower bound
+    of its latency, so slow primaries keep pulling the trigger up.
+    Whichever request succeeds first wins and the other is cancelled (or
+    handed to ``discard`` if it succeeded at the same moment); if one fails
+    the other is still awaited. Spend is capped by a token bucket: every request earns
+    ``budget`` tokens (up to ``burst``) and a hedge costs one, so at most
+    about ``budget`` of requests are duplicated.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.95,
+        budget: float = 0.1,
+        burst: float = 5.0,
+        min_samples: int = 20,
+        window: int = 200,
+    ) -> None:
+        self._percentile = min(max(percentile, 0.0), 1.0)
+        self._budget = max(budget, 0.0)
+        self._burst = max(burst, 1.0)
+        self._min_samples = max(min_samples, 1)
+        self._latencies: deque[float] = deque(maxlen=max(window, 1))
+        self._tokens = 1.0
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._budget_denied = 0
+
+    def trigger(self) -> float | None:
+        """Seconds after which the primary counts as slow, or None while warming up."""
+        if len(self._latencies) < self._min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(math.ceil(len(ordered) * self._percentile) - 1, len(ordered) - 1)
+        return ordered[max(index, 0)]
+
+    def stats(self) -> HedgeStats:
+        trigger = self.trigger()
+        return HedgeStats(
+            requests=self._requests,
+            hedged=self._hedged,
+            hedge_wins=self._hedge_wins,
+            budget_denied=self._budget_denied,
+            trigger_ms=trigger * 1000 if trigger is not None else None,
+        )
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        backup: Callable[[], Awaitable[T]],
+        discard: Callable[[T], None] | None = None,
+    ) -> T:
+        self._requests += 1
+        self._tokens = min(self._tokens + self._budget, self._burst)
+        trigger = self.trigger()
+        started = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+        backup_task: asyncio.Future[T] | None = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=trigger)
+            if done:
+                return self._primary_result(primary_task, started)
+            if self._tokens < 1:
+                self._budget_denied += 1
+                await asyncio.wait({primary_task})
+                return self._primary_result(primary_task, started)
+            self._tokens -= 1
+            self._hedged += 1
+            backup_task = asyncio.ensure_future(backup())
+            pending: set[asyncio.Future[T]] = {primary_task, backup_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if not succeeded:
+                    continue
+                if len(succeeded) > 1 and discard is not None:
+                    discard(backup_task.result())
+                if primary_task in succeeded:
+                    return self._primary_result(primary_task, started)
+                self._hedge_wins += 1
+                if not primary_task.done():
+                    self._latencies.append(time.monotonic() - started)
+                return backup_task.result()
+            # Both failed; surface the primary's error so callers classify it as before.
+            return primary_task.result()
+        finally:
+            for task in (primary_task, backup_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def _primary_result(self, task: asyncio.Future[T], started: float) -> T:
+        result = task.result()
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+
+__all__ = ["HedgeStats", "Hedger"]
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+IMAGE_KEYS = frozenset({"inline_data", "inlineData"})
+MIME_KEYS = frozenset({"mime_type", "mimeType"})
+
+_STRUCTURAL = re.compile(rb'[\[\]{},"]')
+_STRING_STOP = re.compile(rb'["\\]')
+
+# What the scanner does with the string it is inside of.
+_KEY, _VALUE, _MIME, _IMAGE, _SKIP = range(5)
+
+
+@dataclass(frozen=True, slots=True)
+class Base64File:
+    """A file that goes into a streamed JSON body as a base64 string.
+
+    It is read and encoded chunk by chunk while the body is being sent, so
+    the encoded file is never held in memory as a whole.
+    """
+
+    path: Path
+    size: int
+
+    @property
+    def encoded_size(self) -> int:
+        return -(-self.size // 3) * 4
+
+    async def chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        # Whole 3-byte groups encode without padding, so the pieces concatenate.
+        step = max(chunk_size // 4 * 3, 3)
+        handle = await asyncio.to_thread(self.path.open, "rb")
+        try:
+            carry = b""
+            while True:
+                raw = await asyncio.to_thread(handle.read, step)
+                if not raw:
+                    break
+                raw = carry + raw
+                cut = len(raw) - len(raw) % 3
+                carry = raw[cut:]
+                yield base64.b64encode(raw[:cut])
+            if carry:
+                yield base64.b64encode(carry)
+        finally:
+            handle.close()
+
+
+async def iter_json(value: Any, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """``value`` serialised as JSON in pieces of about ``chunk_size`` bytes.
+
+    Produces the same document as ``json.dumps`` (which is what aiohttp's
+    ``json=`` uses), but long strings are escaped slice by slice and
+    ``Base64File`` values are streamed from disk, so memory per body stays
+    around ``chunk_size`` however large the embedded images are.
+    """
+    buffer = bytearray()
+    for piece in _pieces(value, chunk_size):
+        if isinstance(piece, Base64File):
+            buffer += b'"'
+            async for chunk in piece.chunks(chunk_size):
+                buffer += chunk
+                if len(buffer) >= chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+            buffer += b'"'
+            continue
+        buffer += piece.encode("ascii")
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _pieces(value: Any, chunk_size: int) -> Iterator[str | Base64File]:
+    if isinstance(value, Base64File):
+        yield value
+    elif isinstance(value, str):
+        if len(value) <= chunk_size:
+            yield json.dumps(value)
+            return
+        yield '"'
+        for start in range(0, len(value), chunk_size):
+            yield json.dumps(value[start : start + chunk_size])[1:-1]
+        yield '"'
+    elif isinstance(value, dict):
+        yield "{"
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                yield ", "
+            yield json.dumps(str(key))
+            yield ": "
+            yield from _pieces(item, chunk_size)
+        yield "}"
+    elif isinstance(value, (list, tuple)):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ", "
+            yield from _pieces(item, chunk_size)
+        yield "]"
+    else:
+        yield json.dumps(value)
+
+
+@dataclass(slots=True)
+class _Frame:
+    is_object: bool
+    # Key this container is stored under in its parent object.
+    name: str | None
+    key: str | None = None
+    expect_key: bool = False
+    mime: str | None = None
+    captured: bool = False
+
+
+class InlineImageScanner:
+    """Incremental reader for a generateContent response body.
+
+    ``feed`` takes the body chunk by chunk and returns the bytes of the first
+    ``inline_data.data`` image decoded so far, so the caller can write them
+    out as they arrive. Everything else is kept as JSON text and parsed by
+    ``result``, with every inline image's ``data`` left as an empty string;
+    memory therefore stays at about one chunk plus the (small) metadata.
+    Only string boundaries and nesting are tracked, not full JSON validity:
+    a malformed body fails in ``result``.
+    """
+
+    def __init__(self) -> None:
+        self._skeleton = bytearray()
+        self._stack: list[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._role = _VALUE
+        self._token = bytearray()
+        self._carry = b""
+        self.found = False
+        self.mime_type: str | None = None
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> bytes:
+        out = bytearray()
+        pos = 0
+        while pos < len(chunk):
+            if self._in_string:
+                pos = self._scan_string(chunk, pos, out)
+            else:
+                pos = self._scan_structure(chunk, pos)
+        return bytes(out)
+
+    def result(self) -> dict[str, Any]:
+        """The response without image data; raises ``ValueError`` on a truncated body."""
+        if self._stack or self._in_string:
+            raise ValueError("Truncated JSON response")
+        return json.loads(self._skeleton)
+
+    def _scan_structure(self, chunk: bytes, pos: int) -> int:
+        match = _STRUCTURAL.search(chunk, pos)
+        if match is None:
+            self._skeleton += chunk[pos:]
+            return len(chunk)
+        index = match.start()
+        self._skeleton += chunk[pos : index + 1]
+        char = chunk[index : index + 1]
+        frame = self._stack[-1] if self._stack else None
+        if char == b'"':
+            self._in_string = True
+            self._role = self._string_role(frame)
+        elif char in (b"{", b"["):
+            name = frame.key if frame is not None and frame.is_object else None
+            is_object = char == b"{"
+            self._stack.append(_Frame(is_object, name, expect_key=is_object))
+        elif char in (b"}", b"]"):
+            if frame is None:
+                raise ValueError("Unbalanced JSON response")
+            self._stack.pop()
+            if frame.captured:
+                self.mime_type = frame.mime
+        elif char == b"," and frame is not None and frame.is_object:
+            frame.expect_key = True
+        return index + 1
+
+    def _string_role(self, frame: _Frame | None) -> int:
+        if frame is None or not frame.is_object:
+            return _VALUE
+        if frame.expect_key:
+            frame.expect_key = False
+            return _KEY
+        if frame.name in IMAGE_KEYS:
+            if frame.key == "data":
+                # Later images are dropped rather than buffered.
+                return _SKIP if self.found else _IMAGE
+            if frame.key in MIME_KEYS:
+                return _MIME
+        return _VALUE
+
+    def _scan_string(self, chunk: bytes, pos: int, out: bytearray) -> int:
+        if self._escape:
+            self._escape = False
+            escaped = chunk[pos : pos + 1]
+            if self._role == _IMAGE:
+                # JSON may escape "/"; anything else (e.g. "\n") isn't base64.
+                if escaped == b"/":
+                    out += self._decode(escaped)
+            else:
+                self._keep(b"\\" + escaped)
+            return pos + 1
+        match = _STRING_STOP.search(chunk, pos)
+        end = match.start() if match else len(chunk)
+        if self._role == _IMAGE:
+            out += self._decode(chunk[pos:end])
+        else:
+            self._keep(chunk[pos:end])
+        if match is None:
+            return len(chunk)
+        if chunk[end : end + 1] == b"\\":
+            self._escape = True
+        else:
+            self._end_string(out)
+        return end + 1
+
+    def _keep(self, raw: bytes) -> None:
+        if self._role == _SKIP:
+            return
+        self._skeleton += raw
+        if self._role in (_KEY, _MIME):
+            self._token += raw
+
+    def _end_string(self, out: bytearray) -> None:
+        self._in_string = False
+        self._skeleton += b'"'
+        frame = self._stack[-1] if self._stack else None
+        if self._role == _KEY and frame is not None:
+            frame.key = json.loads(b'"' + self._token + b'"')
+        elif self._role == _MIME and frame is not None:
+            frame.mime = json.loads(b'"' + self._token + b'"')
+        elif self._role == _IMAGE and frame is not None:
+            if self._carry:
+                out += self._decode(b"=" * (-len(self._carry) % 4))
+            frame.captured = True
+            self.found = True
+        self._token.clear()
+
+    def _decode(self, raw: bytes) -> bytes:
+        data = self._carry + raw
+        cut = len(data) - len(data) % 4
+        self._carry = data[cut:]
+        decoded = base64.b64decode(data[:cut])
+        self.size += len(decoded)
+        return decoded
+
+
+__all__ = ["Base64File", "CHUNK_SIZE", "InlineImageScanner", "iter_json"]
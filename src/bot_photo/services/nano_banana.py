@@ -1,19 +1,61 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Any, Awaitable, Callable, Iterable
 
 import aiohttp
+from aiohttp.payload import AsyncIterablePayload
+
+from .circuit import BreakerStats, CircuitBreaker, CircuitOpenError
+from .concurrency import AdaptiveLimiter, LimiterStats, Slot
+from .face_cache import FaceCacheStats, FaceEncodingCache
+from .hedging import HedgeStats, Hedger
+from .json_stream import CHUNK_SIZE, InlineImageScanner, iter_json
+from .retry import DeadlineExceeded, Retrier, RetryPolicy, RetryStats
+
+# Statuses worth another attempt: timeouts, throttling and transient server errors.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Prefix of in-progress downloads, so leftovers of a crashed run can be swept.
+_DOWNLOAD_PREFIX = "nano-banana-"
+
+
+@dataclass(frozen=True, slots=True)
+class GeneratedImage:
+    """A generated image already written to a temporary file.
+
+    ``response`` is the rest of the API response (finish reason, text parts,
+    usage) with the image data left out. The caller owns ``path``: move it
+    into place or ``discard`` it.
+    """
+
+    path: Path
+    mime_type: str
+    size: int
+    response: dict[str, Any]
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
 
 
 class NanoBananaAPIError(RuntimeError):
-    def __init__(self, status: int, payload: Any) -> None:
+    def __init__(self, status: int, payload: Any, retry_after: float | None = None) -> None:
         self.status = status
         self.payload = payload
+        self.retry_after = retry_after
         super().__init__(f"Nano Banana API error {status}: {payload}")
 
+    def is_retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUSES and not self.is_guardrail_model_block()
+
     def is_model_error(self) -> bool:
         if self.status in {400, 401, 403, 404} and isinstance(self.payload, dict):
             detail = str(self.payload.get("detail", "")).lower()
@@ -24,6 +66,12 @@ class NanoBananaAPIError(RuntimeError):
             return "model" in message
         return False
 
+    def is_overload(self) -> bool:
+        """Throttling or a server-side failure, as opposed to a problem with the request."""
+        if self.status == 429:
+            return True
+        return self.status >= 500 and not self.is_guardrail_model_block()
+
     def is_guardrail_model_block(self) -> bool:
         if self.status in {400, 500} and isinstance(self.payload, dict):
             error = self.payload.get("error")
@@ -35,12 +83,48 @@ class NanoBananaAPIError(RuntimeError):
 
 
 class NanoBananaClient:
-    def __init__(self, api_key: str, base_url: str, model: str, fallback_model: str | None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str,
+        fallback_model: str | None,
+        *,
+        concurrency: int = 4,
+        max_concurrency: int = 16,
+        queue_timeout: float = 120.0,
+        retry_policy: RetryPolicy | None = None,
+        breaker_failure_rate: float = 0.5,
+        breaker_slow_seconds: float = 90.0,
+        breaker_open_seconds: float = 30.0,
+        hedger: Hedger | None = None,
+        face_cache: FaceEncodingCache | None = None,
+        download_dir: Path | None = None,
+    ) -> None:
         self._api_key = api_key
         self._base_url = base_url.rstrip("/")
         self._model = model
         self._fallback_model = fallback_model
         self._session: aiohttp.ClientSession | None = None
+        self._concurrency = concurrency
+        self._max_concurrency = max_concurrency
+        self._queue_timeout = queue_timeout
+        # One adaptive window per model: the fallback has its own capacity upstream.
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+        self._breaker_options = {
+            "failure_rate": breaker_failure_rate,
+            "slow_call_seconds": breaker_slow_seconds,
+            "open_seconds": breaker_open_seconds,
+        }
+        self._breakers: dict[str, CircuitBreaker] = {}
+        # Hedging needs somewhere to send the duplicate, so only with a fallback model.
+        self._hedger = hedger if fallback_model and fallback_model != model else None
+        self._retrier = Retrier(retry_policy or RetryPolicy(), _retry_reason, _retry_after)
+        self._face_cache = face_cache or FaceEncodingCache()
+        self._download_dir = download_dir or Path(tempfile.gettempdir())
+        self._download_dir.mkdir(parents=True, exist_ok=True)
+        for leftover in self._download_dir.glob(f"{_DOWNLOAD_PREFIX}*.part"):
+            leftover.unlink(missing_ok=True)
 
     async def _ensure_session(self) -> aiohttp.ClientSession:
         if self._session and not self._session.closed:
@@ -52,13 +136,51 @@ class NanoBananaClient:
         if self._session and not self._session.closed:
             await self._session.close()
 
+    def retry_stats(self) -> RetryStats:
+        return self._retrier.stats
+
+    def hedge_stats(self) -> HedgeStats | None:
+        return self._hedger.stats() if self._hedger else None
+
+    def face_cache_stats(self) -> FaceCacheStats:
+        return self._face_cache.stats()
+
+    def breaker_stats(self) -> list[BreakerStats]:
+        return [self._breaker(model).stats() for model in self._models()]
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model, **self._breaker_options)
+        return breaker
+
+    def _models(self) -> list[str]:
+        models = [self._model]
+        if self._fallback_model and self._fallback_model not in models:
+            models.append(self._fallback_model)
+        return models
+
+    def limiter_stats(self) -> list[LimiterStats]:
+        return [limiter.stats() for limiter in self._limiters.values()]
+
+    def _limiter(self, model: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters[model] = AdaptiveLimiter(
+                model,
+                initial=self._concurrency,
+                max_limit=self._max_concurrency,
+                queue_timeout=self._queue_timeout,
+            )
+        return limiter
+
     async def generate_photosession(
         self,
         style: str,
         prompt: str | None,
         orientation: str,
         face_urls: Iterable[str],
-    ) -> dict[str, Any]:
+    ) -> GeneratedImage:
         base_prompt = prompt or f"Высококлассная реалистичная фотосессия в стиле {style}"
 
         if orientation == "vertical":
@@ -79,22 +201,26 @@ class NanoBananaClient:
             "premium fashion lighting, cinematic depth of field"
         )
 
-        async def _request(model: str, include_faces: bool) -> dict[str, Any]:
+        deadline = self._retrier.deadline()
+        # Encoded once per generation; retries, fallback and hedges reuse the parts.
+        face_parts = await self._inline_face_parts(face_urls)
+
+        async def _request(model: str, include_faces: bool) -> GeneratedImage:
             parts: list[dict[str, Any]] = []
             if include_faces:
-                parts.extend(self._inline_face_parts(face_urls))
+                parts.extend(face_parts)
             parts.append({"text": prompt_text})
             payload = {
                 "contents": [{"role": "user", "parts": parts}],
                 "safetySettings": self._safety_settings(),
             }
-            return await self._post(f"/models/{model}:generateContent", payload)
+            return await self._post(model, payload, deadline)
 
         try:
-            return await self._with_fallback(lambda m: _request(m, True))
+            return await self._with_fallback(lambda m: _request(m, True), deadline)
         except NanoBananaAPIError as exc:
             if exc.is_guardrail_model_block():
-                return await self._with_fallback(lambda m: _request(m, False))
+                return await self._with_fallback(lambda m: _request(m, False), deadline)
             raise
 
     async def generate_prompt(
@@ -102,74 +228,137 @@ class NanoBananaClient:
         prompt: str,
         template: str | None = None,
         face_urls: Iterable[str] | None = None,
-    ) -> dict[str, Any]:
+    ) -> GeneratedImage:
         text_prompt = f"{template}: {prompt}" if template else prompt
+        deadline = self._retrier.deadline()
+        face_parts = await self._inline_face_parts(face_urls or [])
 
-        async def _request(model: str) -> dict[str, Any]:
-            parts: list[dict[str, Any]] = []
-            if face_urls:
-                parts.extend(self._inline_face_parts(face_urls))
+        async def _request(model: str) -> GeneratedImage:
+            parts: list[dict[str, Any]] = list(face_parts)
             parts.append({"text": text_prompt})
             payload = {
                 "contents": [{"role": "user", "parts": parts}],
                 "safetySettings": self._safety_settings(),
             }
-            return await self._post(f"/models/{model}:generateContent", payload)
+            return await self._post(model, payload, deadline)
 
-        return await self._with_fallback(_request)
+        return await self._with_fallback(_request, deadline)
 
-    async def _post(self, endpoint: str, payload: dict[str, Any]) -> dict[str, Any]:
+    async def _post(self, model: str, payload: dict[str, Any], deadline: float) -> GeneratedImage:
         session = await self._ensure_session()
-        url = f"{self._base_url}{endpoint}"
-        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=120)) as resp:
-            if resp.status >= 400:
-                text = await resp.text()
+        url = f"{self._base_url}/models/{model}:generateContent"
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"No time left for a request to {model}")
+        breaker = self._breaker(model)
+        # An open circuit fails here in microseconds instead of after a full timeout.
+        permit = breaker.acquire()
+        slot: Slot | None = None
+        try:
+            async with self._limiter(model).slot(min(self._queue_timeout, remaining)) as slot:
+                # Waiting for the slot spends the same budget.
+                timeout = min(120.0, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise DeadlineExceeded(f"No time left for a request to {model}")
+                # Streamed, so face images are never serialised into one big string.
+                body = AsyncIterablePayload(iter_json(payload), content_type="application/json")
                 try:
-                    data = json.loads(text)
-                except json.JSONDecodeError:
-                    data = text
-                raise NanoBananaAPIError(resp.status, data)
-            return await resp.json()
+                    async with session.post(
+                        url, data=body, timeout=aiohttp.ClientTimeout(total=timeout)
+                    ) as resp:
+                        if resp.status >= 400:
+                            text = await resp.text()
+                            try:
+                                data = json.loads(text)
+                            except json.JSONDecodeError:
+                                data = text
+                            error = NanoBananaAPIError(
+                                resp.status, data, _parse_retry_after(resp.headers.get("Retry-After"))
+                            )
+                            if error.is_overload():
+                                slot.overloaded()
+                            raise error
+                        result = await self._download(resp)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    slot.overloaded()
+                    raise
+                slot.succeeded()
+                return result
+        finally:
+            if slot is None:
+                breaker.release(permit, None, 0.0)
+            else:
+                breaker.release(permit, slot.outcome, time.monotonic() - slot.started)
+
+    async def _download(self, resp: aiohttp.ClientResponse) -> GeneratedImage:
+        """Decode the response's image into a temporary file while it streams in."""
+        scanner = InlineImageScanner()
+        fd, name = await asyncio.to_thread(
+            tempfile.mkstemp, prefix=_DOWNLOAD_PREFIX, suffix=".part", dir=self._download_dir
+        )
+        path = Path(name)
+        try:
+            with open(fd, "wb") as handle:
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    data = scanner.feed(chunk)
+                    if data:
+                        await asyncio.to_thread(handle.write, data)
+                response = scanner.result()
+                size = scanner.size
+                if not scanner.found:
+                    # Images-style responses keep the picture in the parsed JSON.
+                    image = extract_image(response)
+                    await asyncio.to_thread(handle.write, image)
+                    size = len(image)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return GeneratedImage(path, scanner.mime_type or "image/jpeg", size, response)
 
     async def _with_fallback(
-        self, request: Callable[[str], Awaitable[dict[str, Any]]]
-    ) -> dict[str, Any]:
-        models_to_try = [self._model]
-        if self._fallback_model and self._fallback_model not in models_to_try:
-            models_to_try.append(self._fallback_model)
-        last_error: NanoBananaAPIError | None = None
-        for model in models_to_try:
+        self, request: Callable[[str], Awaitable[GeneratedImage]], deadline: float
+    ) -> GeneratedImage:
+        """Try each model in turn, retrying transient failures within ``deadline``.
+
+        Moves on to the fallback model on model/guardrail errors, when the
+        primary keeps failing with retryable statuses and, without sending
+        anything, when the primary's circuit is open. With hedging on, a
+        primary slower than its usual tail also races a copy on the fallback.
+        """
+        models_to_try = self._models()
+        last_error: Exception | None = None
+        # Models that already ran as a hedge and failed; the loop doesn't call them again.
+        hedged: set[str] = set()
+        for index, model in enumerate(models_to_try):
+            if model in hedged:
+                continue
+
+            def attempt(model: str = model) -> Awaitable[GeneratedImage]:
+                return self._retrier.run(lambda: request(model), deadline)
+
+            def hedge() -> Awaitable[GeneratedImage]:
+                hedged.add(models_to_try[1])
+                return attempt(models_to_try[1])
+
             try:
-                return await request(model)
+                if index == 0 and self._hedger is not None:
+                    return await self._hedger.run(attempt, hedge, discard=GeneratedImage.discard)
+                return await attempt()
+            except CircuitOpenError as exc:
+                last_error = exc
+                continue
             except NanoBananaAPIError as exc:
-                if (exc.is_model_error() or exc.is_guardrail_model_block()) and model != models_to_try[-1]:
+                switch = exc.is_model_error() or exc.is_guardrail_model_block() or exc.is_retryable()
+                if switch and model != models_to_try[-1]:
                     last_error = exc
                     continue
                 raise
         if last_error:
             raise last_error
 
-    def _inline_face_parts(self, sources: Iterable[str]) -> Iterable[dict[str, Any]]:
-        for source in sources:
-            path = Path(source)
-            if not path.exists():
-                continue
-            mime = self._guess_mime_type(path)
-            yield {
-                "inline_data": {
-                    "mime_type": mime,
-                    "data": base64.b64encode(path.read_bytes()).decode("utf-8"),
-                }
-            }
-
-    @staticmethod
-    def _guess_mime_type(path: Path) -> str:
-        suffix = path.suffix.lower()
-        if suffix == ".png":
-            return "image/png"
-        if suffix == ".webp":
-            return "image/webp"
-        return "image/jpeg"
+    async def _inline_face_parts(self, sources: Iterable[str]) -> list[dict[str, Any]]:
+        """Faces as ``inline_data`` parts; missing files are skipped."""
+        return await self._face_cache.parts(list(sources))
 
     @staticmethod
     def _safety_settings() -> list[dict[str, str]]:
@@ -191,4 +380,70 @@ class NanoBananaClient:
         return headers
 
 
-__all__ = ["NanoBananaClient", "NanoBananaAPIError"]
+def _retry_reason(exc: BaseException) -> str | None:
+    if isinstance(exc, NanoBananaAPIError):
+        return str(exc.status) if exc.is_retryable() else None
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, aiohttp.ClientError):
+        return type(exc).__name__
+    return None
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    return exc.retry_after if isinstance(exc, NanoBananaAPIError) else None
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """``Retry-After`` as seconds; the header is either a number or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def extract_image(response: dict[str, Any]) -> bytes:
+    """First image of a generateContent (or images-style) response."""
+    data = _extract_inline_image(response)
+    if data:
+        return data
+    images = response.get("images") or response.get("data")
+    if images:
+        raw = images[0]
+        if isinstance(raw, dict):
+            raw = raw.get("b64_json") or raw.get("content")
+        if isinstance(raw, str):
+            return base64.b64decode(raw)
+        if isinstance(raw, bytes):
+            return raw
+    raise RuntimeError("Nano banana вернул пустой результат")
+
+
+def _extract_inline_image(response: dict[str, Any]) -> bytes | None:
+    contents = [candidate.get("content") or {} for candidate in response.get("candidates") or []]
+    contents.extend(response.get("contents") or [])
+    for content in contents:
+        data = _decode_inline_parts(content.get("parts") or [])
+        if data:
+            return data
+    return None
+
+
+def _decode_inline_parts(parts: list[dict[str, Any]]) -> bytes | None:
+    for part in parts:
+        inline_data = part.get("inline_data") or part.get("inlineData")
+        if isinstance(inline_data, dict) and inline_data.get("data"):
+            return base64.b64decode(inline_data["data"])
+    return None
+
+
+__all__ = ["GeneratedImage", "NanoBananaClient", "NanoBananaAPIError", "extract_image"]
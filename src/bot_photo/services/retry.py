@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter inside an overall time budget.
+
+    Retry ``n`` (1-based) sleeps a random time in ``[0, base_delay *
+    multiplier ** (n - 1)]`` capped at ``max_delay``, or the server's
+    ``Retry-After`` when it sent one. ``deadline`` is the budget in seconds for
+    all attempts of one call, including the sleeps between them.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 20.0
+    multiplier: float = 2.0
+    deadline: float = 240.0
+
+    def delay(self, retry: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return max(retry_after, 0.0)
+        ceiling = min(self.base_delay * self.multiplier ** (retry - 1), self.max_delay)
+        return random.uniform(0, ceiling)
+
+
+@dataclass(slots=True)
+class RetryStats:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    # Calls that succeeded only thanks to a retry.
+    recovered: int = 0
+    exhausted: int = 0
+    out_of_budget: int = 0
+    reasons: dict[str, int] = field(default_factory=dict)
+
+
+class DeadlineExceeded(RuntimeError):
+    """The call's time budget ran out before an attempt could start."""
+
+
+class Retrier:
+    """Runs a call under a ``RetryPolicy``.
+
+    ``classify`` returns a short reason (e.g. ``"503"``) for errors worth
+    retrying and ``None`` for the rest, which are raised immediately;
+    ``retry_after`` extracts a server-requested delay from an error.
+    A retry whose sleep would end past the deadline is not attempted.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        classify: Callable[[BaseException], str | None],
+        retry_after: Callable[[BaseException], float | None] = lambda exc: None,
+    ) -> None:
+        self._policy = policy
+        self._classify = classify
+        self._retry_after = retry_after
+        self.stats = RetryStats()
+
+    @property
+    def policy(self) -> RetryPolicy:
+        return self._policy
+
+    def deadline(self) -> float:
+        """A fresh ``time.monotonic()`` deadline for one call."""
+        return time.monotonic() + self._policy.deadline
+
+    async def run(self, call: Callable[[], Awaitable[T]], deadline: float) -> T:
+        self.stats.calls += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats.attempts += 1
+            try:
+                result = await call()
+            except Exception as exc:
+                reason = self._classify(exc)
+                if reason is None:
+                    raise
+                if attempt >= self._policy.max_attempts:
+                    self.stats.exhausted += 1
+                    raise
+                delay = self._policy.delay(attempt, self._retry_after(exc))
+                if time.monotonic() + delay >= deadline:
+                    self.stats.out_of_budget += 1
+                    raise
+                self.stats.retries += 1
+                self.stats.reasons[reason] = self.stats.reasons.get(reason, 0) + 1
+                logger.info("Retrying after %s in %.1f s (attempt %s)", reason, delay, attempt + 1)
+                await asyncio.sleep(delay)
+                continue
+            if attempt > 1:
+                self.stats.recovered += 1
+            return result
+
+
+__all__ = ["DeadlineExceeded", "Retrier", "RetryPolicy", "RetryStats"]
@@ -1,4 +1,5 @@
 from .files import FileStorage
+from .fsm import SQLiteStorage
 from .s3_storage import S3Storage
 
-__all__ = ["FileStorage", "S3Storage"]
+__all__ = ["FileStorage", "S3Storage", "SQLiteStorage"]
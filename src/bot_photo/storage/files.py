@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import shutil
 import uuid
 from pathlib import Path
 
@@ -7,6 +9,8 @@ from aiogram import Bot
 
 from .s3_storage import S3Storage
 
+_SUFFIXES = {"image/png": ".png", "image/webp": ".webp"}
+
 
 class FileStorage:
     def __init__(
@@ -53,3 +57,19 @@ class FileStorage:
             except Exception:
                 pass
         return destination
+
+    async def save_generation_file(self, source: Path, mime_type: str = "image/jpeg") -> Path:
+        """Move an already written image into the sessions folder."""
+        filename = f"{uuid.uuid4().hex}{_SUFFIXES.get(mime_type, '.jpg')}"
+        destination = self._sessions_root / filename
+        await asyncio.to_thread(shutil.move, source, destination)
+        if self._s3:
+            try:
+                await self._s3.upload_file(
+                    destination,
+                    f"sessions/{filename}",
+                    content_type=mime_type,
+                )
+            except Exception:
+                pass
+        return destination
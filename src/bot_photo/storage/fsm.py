@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, cast
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from ..db import Database
+from ..db.timestamps import now_ms
+
+logger = logging.getLogger(__name__)
+
+# Rows per statement when flushing; keeps well below SQLite's parameter limit.
+_FLUSH_CHUNK = 200
+
+_JsonLoads = Callable[..., Any]
+_JsonDumps = Callable[..., str]
+
+
+@dataclass(slots=True)
+class _Record:
+    state: str | None
+    data: bytes
+    touched_at: int
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def _encode_key(key: StorageKey) -> str:
+    return ":".join(
+        (
+            str(key.bot_id),
+            str(key.chat_id),
+            str(key.user_id),
+            str(key.thread_id or ""),
+            key.business_connection_id or "",
+            key.destiny,
+        )
+    )
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram FSM storage persisted in the ``fsm_storage`` table.
+
+    Recently used records live in a bounded LRU hot tier; writes land there
+    and are flushed to SQLite in batches every ``flush_seconds`` (and on
+    ``close``). Data is kept JSON-encoded (``json_dumps``/``json_loads``, as
+    in aiogram's ``RedisStorage``), so every ``get_data`` hands out a fresh
+    copy just like ``MemoryStorage``. Records untouched for ``ttl_seconds``
+    are treated as abandoned and deleted.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        cache_size: int = 5_000,
+        flush_seconds: float = 1.0,
+        ttl_seconds: float = 3 * 24 * 3600,
+        json_loads: _JsonLoads = json.loads,
+        json_dumps: _JsonDumps = json.dumps,
+    ) -> None:
+        self._db = db
+        self.json_loads = json_loads
+        self.json_dumps = json_dumps
+        self._cache_size = max(cache_size, 0)
+        self._flush_interval = flush_seconds
+        self._ttl_ms = int(ttl_seconds * 1000)
+        self._hot: OrderedDict[str, _Record] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._in_flight: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._flush_interval > 0 and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(_encode_key(key), record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        record = await self._record(key)
+        record.data = self.json_dumps(dict(data)).encode() if data else b""
+        self._touch(_encode_key(key), record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        blob = (await self._record(key)).data
+        if not blob:
+            return {}
+        try:
+            return cast(dict[str, Any], self.json_loads(blob))
+        except ValueError:
+            # Rows written before data was stored as JSON start over empty.
+            logger.warning("Dropping undecodable FSM data for %s", _encode_key(key))
+            return {}
+
+    async def flush(self) -> int:
+        """Write dirty records to SQLite; returns how many were written."""
+        async with self._flush_lock:
+            keys, self._dirty = self._dirty, set()
+            if not keys:
+                return 0
+            snapshot = {key: self._hot[key] for key in keys if key in self._hot}
+            self._in_flight = set(snapshot)
+            try:
+                await self._write(snapshot)
+            except BaseException:
+                self._dirty |= keys
+                raise
+            finally:
+                self._in_flight = set()
+            self._trim()
+            return len(snapshot)
+
+    async def purge_expired(self) -> None:
+        cutoff = now_ms() - self._ttl_ms
+        await self._db.execute("DELETE FROM fsm_storage WHERE updated_at < ?", (cutoff,))
+        for key in [key for key, record in self._hot.items() if record.touched_at < cutoff]:
+            if key not in self._dirty and key not in self._in_flight:
+                del self._hot[key]
+
+    async def _record(self, key: StorageKey) -> _Record:
+        encoded = _encode_key(key)
+        record = self._hot.get(encoded)
+        if record is not None:
+            self._hot.move_to_end(encoded)
+            return record
+        row = await self._db.fetchone(
+            "SELECT state, data, updated_at FROM fsm_storage WHERE key=?", (encoded,)
+        )
+        # Another task may have loaded or written the key while we awaited.
+        record = self._hot.get(encoded)
+        if record is None:
+            if row and row["updated_at"] >= now_ms() - self._ttl_ms:
+                record = _Record(row["state"], row["data"] or b"", row["updated_at"])
+            else:
+                record = _Record(None, b"", now_ms())
+            self._hot[encoded] = record
+            self._trim()
+        return record
+
+    def _touch(self, encoded: str, record: _Record) -> None:
+        record.touched_at = now_ms()
+        self._hot[encoded] = record
+        self._hot.move_to_end(encoded)
+        self._dirty.add(encoded)
+
+    def _trim(self) -> None:
+        """Evict least recently used records that are already persisted."""
+        excess = len(self._hot) - self._cache_size
+        if excess <= 0:
+            return
+        for key in list(self._hot):
+            if excess <= 0:
+                break
+            if key in self._dirty or key in self._in_flight:
+                continue
+            del self._hot[key]
+            excess -= 1
+
+    async def _write(self, snapshot: dict[str, _Record]) -> None:
+        upserts = [(key, record) for key, record in snapshot.items() if not record.empty]
+        deletes = [key for key, record in snapshot.items() if record.empty]
+        async with self._db.transaction():
+            for start in range(0, len(upserts), _FLUSH_CHUNK):
+                chunk = upserts[start : start + _FLUSH_CHUNK]
+                values = ", ".join("(?, ?, ?, ?)" for _ in chunk)
+                await self._db.execute(
+                    f"""
+                    INSERT INTO fsm_storage(key, state, data, updated_at) VALUES {values}
+                    ON CONFLICT(key) DO UPDATE SET
+                        state=excluded.state,
+                        data=excluded.data,
+                        updated_at=excluded.updated_at
+                    """,
+                    tuple(
+                        value
+                        for key, record in chunk
+                        for value in (key, record.state, record.data or None, record.touched_at)
+                    ),
+                )
+            for start in range(0, len(deletes), _FLUSH_CHUNK):
+                chunk_keys = deletes[start : start + _FLUSH_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk_keys)
+                await self._db.execute(
+                    f"DELETE FROM fsm_storage WHERE key IN ({placeholders})", chunk_keys
+                )
+
+    async def _flush_loop(self) -> None:
+        purge_every = max(int(60 / self._flush_interval), 1)
+        ticks = 0
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            ticks += 1
+            try:
+                await self.flush()
+                if ticks % purge_every == 0:
+                    await self.purge_expired()
+            except Exception:
+                logger.exception("FSM storage flush failed")
+
+
+__all__ = ["SQLiteStorage"]
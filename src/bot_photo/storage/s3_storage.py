@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Any
+
 import aioboto3
 
 
@@ -25,22 +28,45 @@ class S3Storage:
         data: bytes,
         s3_key: str,
         content_type: str = "image/jpeg",
+        public: bool = True,
     ) -> str:
-        async with self._session.client(
-            "s3",
-            endpoint_url=self.endpoint_url,
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key,
-            region_name=self.region,
-        ) as s3:
+        extra = {"ACL": "public-read"} if public else {}
+        async with self._client() as s3:
             await s3.put_object(
                 Bucket=self.bucket_name,
                 Key=s3_key,
                 Body=data,
                 ContentType=content_type,
-                ACL="public-read",
+                **extra,
             )
         return f"{self.endpoint_url}/{self.bucket_name}/{s3_key}"
 
+    async def upload_file(
+        self,
+        path: Path,
+        s3_key: str,
+        content_type: str = "image/jpeg",
+        public: bool = True,
+    ) -> str:
+        """Like ``upload_bytes``, but streams the file from disk."""
+        extra = {"ACL": "public-read"} if public else {}
+        async with self._client() as s3:
+            await s3.upload_file(
+                str(path),
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={"ContentType": content_type, **extra},
+            )
+        return f"{self.endpoint_url}/{self.bucket_name}/{s3_key}"
+
+    def _client(self) -> Any:
+        return self._session.client(
+            "s3",
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id=self.access_key,
+            aws_secret_access_key=self.secret_key,
+            region_name=self.region,
+        )
+
 
 __all__ = ["S3Storage"]
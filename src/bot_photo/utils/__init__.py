@@ -1,15 +1,19 @@
 from .context import (
     get_database,
+    get_db_maintenance,
     get_examples_service,
     get_faces_repo,
     get_file_storage,
     get_generation_client,
+    get_generation_queue,
+    get_jobs_repo,
     get_limit_service,
     get_prompt_repo,
     get_repo,
     get_service,
     get_sessions_repo,
     get_settings,
+    get_stats_repo,
     get_token_service,
     get_usage_repo,
     get_users_repo,
@@ -20,16 +24,20 @@ from .context import (
 
 __all__ = [
     "get_database",
+    "get_db_maintenance",
     "get_examples_service",
     "get_faces_repo",
     "get_file_storage",
     "get_generation_client",
+    "get_generation_queue",
+    "get_jobs_repo",
     "get_limit_service",
     "get_prompt_repo",
     "get_repo",
     "get_service",
     "get_sessions_repo",
     "get_settings",
+    "get_stats_repo",
     "get_token_service",
     "get_usage_repo",
     "get_users_repo",
@@ -5,14 +5,17 @@ from typing import Any
 from aiogram import Bot
 
 from ..config import Settings
-from ..db import Database
-from ..repositories.faces import FaceRepository
-from ..repositories.prompts import PromptRepository
-from ..repositories.sessions import SessionRepository
-from ..repositories.usage import UsageRepository
-from ..repositories.users import UserRepository
-from ..repositories.payments import PaymentRepository
+from ..db import Database, MaintenanceScheduler
+from ..repositories.faces import FaceRepository
+from ..repositories.jobs import JobRepository
+from ..repositories.prompts import PromptRepository
+from ..repositories.sessions import SessionRepository
+from ..repositories.stats import StatsRepository
+from ..repositories.usage import UsageRepository
+from ..repositories.users import UserRepository
+from ..repositories.payments import PaymentRepository
 from ..services.examples import ExamplesService
+from ..services.generation_queue import GenerationQueue
 from ..services.limits import RateLimitService
 from ..services.nano_banana import NanoBananaClient
 from ..services.tokens import TokenService
@@ -75,16 +78,24 @@ def get_sessions_repo(bot: Bot | None) -> SessionRepository:
     return get_repo(bot, "sessions")
 
 
-def get_prompt_repo(bot: Bot | None) -> PromptRepository:
-    return get_repo(bot, "prompts")
-
-
-def get_usage_repo(bot: Bot | None) -> UsageRepository:
-    return get_repo(bot, "usage")
-
-
-def get_payments_repo(bot: Bot | None) -> PaymentRepository:
-    return get_repo(bot, "payments")
+def get_prompt_repo(bot: Bot | None) -> PromptRepository:
+    return get_repo(bot, "prompts")
+
+
+def get_usage_repo(bot: Bot | None) -> UsageRepository:
+    return get_repo(bot, "usage")
+
+
+def get_stats_repo(bot: Bot | None) -> StatsRepository:
+    return get_repo(bot, "stats")
+
+
+def get_payments_repo(bot: Bot | None) -> PaymentRepository:
+    return get_repo(bot, "payments")
+
+
+def get_jobs_repo(bot: Bot | None) -> JobRepository:
+    return get_repo(bot, "jobs")
 
 
 def get_token_service(bot: Bot | None) -> TokenService:
@@ -103,9 +114,17 @@ def get_examples_service(bot: Bot | None) -> ExamplesService:
     return get_service(bot, "examples")
 
 
+def get_generation_queue(bot: Bot | None) -> GenerationQueue:
+    return get_service(bot, "generation_queue")
+
+
 def get_file_storage(bot: Bot | None) -> FileStorage:
     return _get_context("file_storage")
 
 
 def get_crypto_pay_service(bot: Bot | None) -> CryptoPayService:
     return get_service(bot, "crypto_pay")
+
+
+def get_db_maintenance(bot: Bot | None) -> MaintenanceScheduler:
+    return get_service(bot, "db_maintenance")
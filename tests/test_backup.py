@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from src.bot_photo.db import BackupManager, Database, MigrationRunner
+
+
+class FakeS3:
+    """Records streamed uploads; ``upload_bytes`` must not be used for backups."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.uploads: list[dict[str, Any]] = []
+
+    async def upload_file(
+        self, path: Path, s3_key: str, content_type: str = "image/jpeg", public: bool = True
+    ) -> str:
+        if self.fail:
+            raise OSError("network down")
+        self.uploads.append(
+            {
+                "path": path,
+                "key": s3_key,
+                "content_type": content_type,
+                "public": public,
+                "body": gzip.decompress(path.read_bytes()),
+            }
+        )
+        return f"https://s3.example/bucket/{s3_key}"
+
+    async def upload_bytes(self, *args: Any, **kwargs: Any) -> str:
+        raise AssertionError("backups must be streamed from a file")
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "app.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    await db.execute(
+        "INSERT INTO users(telegram_id, username, full_name, tokens) VALUES (1, 'u', 'User', 7)"
+    )
+    return db
+
+
+def test_snapshot_is_verified_and_uploaded_privately(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        s3 = FakeS3()
+        try:
+            manager = BackupManager(db, tmp_path / "backups", s3=s3, s3_prefix="db/")
+            result = await manager.run_once()
+        finally:
+            await db.close()
+        assert result.s3_url == f"https://s3.example/bucket/db/{result.path.name}.gz"
+        (upload,) = s3.uploads
+        assert upload["public"] is False
+        assert upload["content_type"] == "application/gzip"
+        assert upload["body"] == result.path.read_bytes()
+        # The compressed temp file is gone, only the snapshot is left.
+        assert sorted(p.name for p in (tmp_path / "backups").iterdir()) == [result.path.name]
+        with sqlite3.connect(result.path) as snapshot:
+            assert snapshot.execute("SELECT tokens FROM users").fetchone() == (7,)
+
+    asyncio.run(scenario())
+
+
+def test_failed_upload_keeps_the_snapshot(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            result = await BackupManager(db, tmp_path / "backups", s3=FakeS3(fail=True)).run_once()
+        finally:
+            await db.close()
+        assert result.s3_url is None
+        assert [p.name for p in (tmp_path / "backups").iterdir()] == [result.path.name]
+
+    asyncio.run(scenario())
+
+
+def test_old_snapshots_are_rotated(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        directory = tmp_path / "backups"
+        directory.mkdir()
+        for day in range(1, 4):
+            (directory / f"app-2024010{day}-000000.db").write_bytes(b"")
+        try:
+            result = await BackupManager(db, directory, keep=2).run_once()
+        finally:
+            await db.close()
+        assert sorted(p.name for p in directory.iterdir()) == [
+            "app-20240103-000000.db",
+            result.path.name,
+        ]
+
+    asyncio.run(scenario())
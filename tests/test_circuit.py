@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pytest
+
+from src.bot_photo.services.circuit import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        "model",
+        window=4,
+        min_calls=2,
+        failure_rate=0.5,
+        slow_call_seconds=5.0,
+        open_seconds=10.0,
+        clock=clock,
+    )
+
+
+def _call(breaker: CircuitBreaker, outcome: str | None, latency: float = 1.0) -> None:
+    breaker.release(breaker.acquire(), outcome, latency)
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    _call(breaker, "overload")
+    _call(breaker, "overload")
+    assert breaker.state == OPEN
+
+
+def test_opens_once_bad_share_reaches_the_threshold() -> None:
+    breaker = _breaker(FakeClock())
+    _call(breaker, "success")
+    _call(breaker, "success")
+    _call(breaker, "overload")
+    assert breaker.state == CLOSED
+    _call(breaker, "overload")
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    assert breaker.stats().short_circuited == 1
+
+
+def test_slow_success_counts_as_bad() -> None:
+    breaker = _breaker(FakeClock())
+    _call(breaker, "success", latency=6.0)
+    _call(breaker, "success", latency=6.0)
+    assert breaker.state == OPEN
+
+
+def test_unreported_outcome_is_not_counted() -> None:
+    breaker = _breaker(FakeClock())
+    for _ in range(5):
+        _call(breaker, None)
+    assert breaker.stats().window_calls == 0
+
+
+def test_good_probe_closes_with_a_clean_window() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    probe = breaker.acquire()
+    assert probe.probe
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()  # only one probe at a time
+    breaker.release(probe, "success", 1.0)
+    assert breaker.state == CLOSED
+    assert breaker.stats().window_calls == 0
+
+
+def test_bad_probe_opens_again() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.now = 10.0
+    breaker.release(breaker.acquire(), "overload", 1.0)
+    assert breaker.state == OPEN
+    assert breaker.stats().opened == 2
+    assert breaker.stats().retry_in == pytest.approx(10.0)
+
+
+def test_probe_without_outcome_frees_its_slot() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.now = 10.0
+    breaker.release(breaker.acquire(), None, 0.0)
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire().probe
+
+
+def test_call_admitted_while_closed_does_not_act_as_probe() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    straggler = breaker.acquire()
+    _trip(breaker)
+    clock.now = 10.0
+    probe = breaker.acquire()
+    breaker.release(straggler, "success", 1.0)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()  # the probe slot is still taken
+    breaker.release(probe, "overload", 1.0)
+    assert breaker.state == OPEN
+
+
+def test_straggler_from_an_earlier_closed_period_is_ignored() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    straggler = breaker.acquire()
+    _trip(breaker)
+    clock.now = 10.0
+    breaker.release(breaker.acquire(), "success", 1.0)
+    assert breaker.state == CLOSED
+    breaker.release(straggler, "overload", 1.0)
+    assert breaker.stats().window_calls == 0
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from src.bot_photo.services.concurrency import AdaptiveLimiter, LimiterRejected
+
+
+def test_waiters_get_slots_in_fifo_order() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=1)
+        order: list[int] = []
+        release = asyncio.Event()
+
+        async def call(index: int) -> None:
+            async with limiter.slot():
+                order.append(index)
+                await release.wait()
+
+        tasks = [asyncio.create_task(call(index)) for index in range(3)]
+        await asyncio.sleep(0)
+        stats = limiter.stats()
+        assert (stats.in_flight, stats.queued) == (1, 2)
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+        assert limiter.stats().in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_immediately() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=1, max_queue=1)
+
+        async def wait_for_slot() -> None:
+            async with limiter.slot():
+                pass
+
+        async with limiter.slot():
+            waiting = asyncio.create_task(wait_for_slot())
+            await asyncio.sleep(0)
+            with pytest.raises(LimiterRejected):
+                async with limiter.slot():
+                    pass
+        await waiting
+        assert limiter.stats().rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=1)
+        async with limiter.slot():
+            with pytest.raises(LimiterRejected):
+                async with limiter.slot(timeout=0.01):
+                    pass
+        stats = limiter.stats()
+        assert (stats.timed_out, stats.queued, stats.in_flight) == (1, 0, 0)
+
+    asyncio.run(scenario())
+
+
+
+def test_slot_handed_over_as_the_deadline_fires_is_passed_on(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    real_wait_for = asyncio.wait_for
+    raced: list[bool] = []
+
+    async def wait_for(waiter: asyncio.Future[None], timeout: float) -> None:
+        if raced:
+            return await real_wait_for(waiter, timeout)
+        raced.append(True)
+        # The slot arrives, but the timeout wins before the waiter resumes.
+        await asyncio.wait({waiter})
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, "wait_for", wait_for)
+
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=1)
+        order: list[str] = []
+
+        async def call(name: str) -> None:
+            async with limiter.slot(timeout=5):
+                order.append(name)
+
+        async with limiter.slot():
+            late = asyncio.create_task(call("late"))
+            await asyncio.sleep(0)
+            next_in_line = asyncio.create_task(call("next"))
+            await asyncio.sleep(0)
+        with pytest.raises(LimiterRejected):
+            await late
+        await asyncio.wait_for(next_in_line, 1)
+        assert order == ["next"]
+        stats = limiter.stats()
+        assert (stats.timed_out, stats.queued, stats.in_flight) == (1, 0, 0)
+
+    asyncio.run(scenario())
+
+def test_overload_backs_off_once_per_round_trip() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=8, backoff=0.5)
+        for _ in range(3):
+            async with limiter.slot() as slot:
+                slot.overloaded()
+        stats = limiter.stats()
+        assert stats.limit == 4
+        assert (stats.overloads, stats.decreases) == (3, 1)
+
+    asyncio.run(scenario())
+
+
+def test_limit_never_drops_below_min() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=2, min_limit=2)
+        async with limiter.slot() as slot:
+            slot.overloaded()
+        assert limiter.limit == 2
+
+    asyncio.run(scenario())
+
+
+def test_success_grows_limit_only_when_saturated() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=1, max_limit=4)
+        async with limiter.slot() as slot:
+            assert slot.saturated
+            slot.succeeded()
+        assert limiter.limit == 2
+        async with limiter.slot() as slot:
+            assert not slot.saturated
+            slot.succeeded()
+        assert limiter.limit == 2
+
+    asyncio.run(scenario())
+
+
+def test_unreported_outcome_leaves_limit_alone() -> None:
+    async def scenario() -> None:
+        limiter = AdaptiveLimiter("m", initial=3)
+        async with limiter.slot():
+            pass
+        stats = limiter.stats()
+        assert (stats.limit, stats.successes, stats.overloads) == (3, 0, 0)
+
+    asyncio.run(scenario())
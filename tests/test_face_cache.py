@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.bot_photo.services import face_cache
+from src.bot_photo.services.face_cache import FaceEncodingCache
+from src.bot_photo.services.json_stream import Base64File
+
+
+def _face(path: Path, size: int) -> bytes:
+    raw = os.urandom(size)
+    path.write_bytes(raw)
+    return raw
+
+
+def test_small_faces_are_encoded_and_cached(tmp_path: Path) -> None:
+    raw = _face(tmp_path / "small.jpg", 3000)
+    cache = FaceEncodingCache(max_bytes=1_000_000, max_entry_bytes=10_000)
+
+    async def scenario() -> None:
+        first = await cache.encode(tmp_path / "small.jpg")
+        second = await cache.encode(tmp_path / "small.jpg")
+        assert first == base64.b64encode(raw).decode("ascii")
+        assert second is first
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses, stats.streamed) == (1, 1, 1, 0)
+    assert stats.bytes == 4000
+
+
+def test_faces_above_the_entry_limit_are_streamed(tmp_path: Path) -> None:
+    _face(tmp_path / "large.jpg", 30_000)
+    cache = FaceEncodingCache(max_bytes=1_000_000, max_entry_bytes=10_000)
+
+    async def scenario() -> None:
+        for _ in range(2):
+            encoded = await cache.encode(tmp_path / "large.jpg")
+            assert encoded == Base64File(tmp_path / "large.jpg", 30_000)
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats.entries, stats.bytes, stats.streamed) == (0, 0, 2)
+
+
+def test_entry_limit_never_exceeds_the_cache_size(tmp_path: Path) -> None:
+    _face(tmp_path / "face.jpg", 3000)
+    cache = FaceEncodingCache(max_bytes=1000)
+    assert isinstance(asyncio.run(cache.encode(tmp_path / "face.jpg")), Base64File)
+
+
+def test_rewritten_file_is_encoded_again(tmp_path: Path) -> None:
+    path = tmp_path / "face.jpg"
+    _face(path, 300)
+    cache = FaceEncodingCache()
+
+    async def scenario() -> None:
+        await cache.encode(path)
+        raw = _face(path, 600)
+        assert await cache.encode(path) == base64.b64encode(raw).decode("ascii")
+
+    asyncio.run(scenario())
+    assert cache.stats().misses == 2
+
+
+def test_lru_evicts_oldest_entries(tmp_path: Path) -> None:
+    for name in "abc":
+        _face(tmp_path / f"{name}.jpg", 300)
+    cache = FaceEncodingCache(max_bytes=900, max_entry_bytes=900)
+
+    async def scenario() -> None:
+        for name in "abca":
+            await cache.encode(tmp_path / f"{name}.jpg")
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    # Room for two 400-byte entries: "c" evicts "a", then "a" evicts "b".
+    assert (stats.entries, stats.evictions, stats.hits) == (2, 2, 0)
+
+
+def test_missing_files_are_skipped_in_parts(tmp_path: Path) -> None:
+    _face(tmp_path / "face.png", 30)
+    cache = FaceEncodingCache()
+    parts = asyncio.run(cache.parts([str(tmp_path / "face.png"), str(tmp_path / "gone.jpg")]))
+    assert len(parts) == 1
+    assert parts[0]["inline_data"]["mime_type"] == "image/png"
+
+
+def test_cancelled_caller_does_not_drop_the_shared_encode(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    raw = _face(tmp_path / "face.jpg", 300)
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[Path] = []
+
+    def slow_encode(path: Path) -> str | None:
+        calls.append(path)
+        started.set()
+        release.wait(5)
+        return base64.b64encode(path.read_bytes()).decode("ascii")
+
+    monkeypatch.setattr(face_cache, "_encode_file", slow_encode)
+    cache = FaceEncodingCache()
+
+    async def scenario() -> None:
+        first = asyncio.create_task(cache.encode(tmp_path / "face.jpg"))
+        await asyncio.to_thread(started.wait, 5)
+        second = asyncio.create_task(cache.encode(tmp_path / "face.jpg"))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        assert await second == base64.b64encode(raw).decode("ascii")
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # Stored by the fill itself, so later callers hit the cache.
+        assert await cache.encode(tmp_path / "face.jpg") == await second
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats.entries, stats.misses, stats.hits) == (1, 1, 2)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import pickle
+from pathlib import Path
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.storage.fsm import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+OTHER = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+
+class Form(StatesGroup):
+    name = State()
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "test.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    return db
+
+
+def test_state_and_data_round_trip(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        storage = SQLiteStorage(db, flush_seconds=0)
+        try:
+            assert await storage.get_state(KEY) is None
+            assert await storage.get_data(KEY) == {}
+            await storage.set_state(KEY, Form.name)
+            await storage.set_data(KEY, {"style": "noir", "faces": [1, 2]})
+            assert await storage.update_data(KEY, {"orientation": "portrait"}) == {
+                "style": "noir",
+                "faces": [1, 2],
+                "orientation": "portrait",
+            }
+            assert await storage.get_state(KEY) == Form.name.state
+            assert await storage.get_value(KEY, "style") == "noir"
+            assert await storage.get_data(OTHER) == {}
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_get_data_returns_a_fresh_copy(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        storage = SQLiteStorage(db, flush_seconds=0)
+        try:
+            await storage.set_data(KEY, {"faces": [1]})
+            data = await storage.get_data(KEY)
+            data["faces"].append(2)
+            data["extra"] = True
+            assert await storage.get_data(KEY) == {"faces": [1]}
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_flushed_records_survive_a_restart(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            storage = SQLiteStorage(db, flush_seconds=0)
+            await storage.set_state(KEY, "Form:name")
+            await storage.set_data(KEY, {"prompt": "привет"})
+            await storage.close()
+            row = await db.fetchone("SELECT data FROM fsm_storage")
+            assert row["data"] == '{"prompt": "\\u043f\\u0440\\u0438\\u0432\\u0435\\u0442"}'.encode()
+
+            restarted = SQLiteStorage(db, flush_seconds=0)
+            assert await restarted.get_state(KEY) == "Form:name"
+            assert await restarted.get_data(KEY) == {"prompt": "привет"}
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_clearing_deletes_the_row(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            storage = SQLiteStorage(db, flush_seconds=0)
+            await storage.set_state(KEY, "Form:name")
+            await storage.set_data(KEY, {"a": 1})
+            assert await storage.flush() == 1
+            # FSMContext.clear() sets an empty state and data.
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+            assert await storage.flush() == 1
+            assert await db.fetchval("SELECT COUNT(*) FROM fsm_storage") == 0
+            assert await SQLiteStorage(db, flush_seconds=0).get_state(KEY) is None
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_legacy_pickled_data_is_not_unpickled(tmp_path: Path) -> None:
+    class Boom:
+        def __reduce__(self) -> tuple[object, tuple[str]]:
+            return (exec, ("raise SystemExit('unpickled')",))
+
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            await db.execute(
+                "INSERT INTO fsm_storage(key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                (
+                    "1:10:10:::default",
+                    "Form:name",
+                    pickle.dumps({"x": Boom()}),
+                    2**62,
+                ),
+            )
+            storage = SQLiteStorage(db, flush_seconds=0)
+            assert await storage.get_state(KEY) == "Form:name"
+            assert await storage.get_data(KEY) == {}
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_custom_json_codec(tmp_path: Path) -> None:
+    calls: list[str] = []
+
+    def dumps(value: object) -> str:
+        calls.append("dumps")
+        return json.dumps(value, sort_keys=True)
+
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            storage = SQLiteStorage(db, flush_seconds=0, json_dumps=dumps)
+            await storage.set_data(KEY, {"b": 1, "a": 2})
+            await storage.flush()
+            assert await db.fetchval("SELECT data FROM fsm_storage") == b'{"a": 2, "b": 1}'
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+    assert calls == ["dumps"]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.handlers.payment import PACKAGES, priority_min_tokens
+from src.bot_photo.repositories.jobs import JobRepository
+from src.bot_photo.repositories.payments import PaymentRepository
+from src.bot_photo.services import generation_queue
+from src.bot_photo.services.generation_queue import PROMPT_JOB, GenerationQueue
+
+FREE, PAID, PRIORITY = 1, 2, 3
+_NOW = 1_700_000_000_000
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "test.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    for user_id in (FREE, PAID, PRIORITY):
+        await db.execute(
+            "INSERT INTO users(telegram_id, username, full_name, tokens) VALUES (?, 'u', 'User', 0)",
+            (user_id,),
+        )
+    payments = PaymentRepository(db)
+    for invoice_id, user_id, tokens in ((1, PAID, 75), (2, PRIORITY, 250), (3, FREE, 750)):
+        await payments.save_invoice(
+            invoice_id=invoice_id, user_id=user_id, amount_usdt=1.0, tokens=tokens, status="paid"
+        )
+    # FREE's invoice was never paid, so it must not count.
+    await payments.mark_credited(1)
+    await payments.mark_credited(2)
+    return db
+
+
+def _queue(db: Database, **kwargs: Any) -> GenerationQueue:
+    kwargs.setdefault("priority_min_tokens", priority_min_tokens())
+    return GenerationQueue(
+        None,  # type: ignore[arg-type]
+        db,
+        JobRepository(db),
+        sessions=None,  # type: ignore[arg-type]
+        prompts=None,  # type: ignore[arg-type]
+        faces=None,  # type: ignore[arg-type]
+        tokens=None,  # type: ignore[arg-type]
+        examples=None,  # type: ignore[arg-type]
+        files=None,  # type: ignore[arg-type]
+        client=None,  # type: ignore[arg-type]
+        payments=PaymentRepository(db),
+        **kwargs,
+    )
+
+
+def test_priority_threshold_comes_from_the_package_table() -> None:
+    smallest = min(pkg.tokens for pkg in PACKAGES if pkg.priority)
+    assert priority_min_tokens() == smallest
+    assert all(not pkg.priority for pkg in PACKAGES if pkg.tokens < smallest)
+
+
+def test_purchase_history_picks_the_class(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            queue = _queue(db)
+            assert [await queue.priority_for(user) for user in (PRIORITY, PAID, FREE)] == [0, 1, 2]
+            # Without a priority package every buyer is just "paid".
+            assert await _queue(db, priority_min_tokens=None).priority_for(PRIORITY) == 1
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_priority_and_aging_order_the_queue(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clock = [_NOW]
+    monkeypatch.setattr(generation_queue, "now_ms", lambda: clock[0])
+
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            queue = _queue(db, aging_seconds=60)
+            jobs = JobRepository(db)
+
+            async def enqueue(user_id: int, at_ms: int) -> int:
+                clock[0] = _NOW + at_ms
+                job = await queue.enqueue(PROMPT_JOB, 0, user_id, user_id, {"cost": 1})
+                return job.id
+
+            old_free = await enqueue(FREE, 0)
+            paid = await enqueue(PAID, 30_000)
+            priority = await enqueue(PRIORITY, 30_000)
+            new_free = await enqueue(FREE, 30_000)
+            late_paid = await enqueue(PAID, 70_000)
+            late_priority = await enqueue(PRIORITY, 125_000)
+
+            claimed: list[int] = []
+            while (job := await jobs.claim()) is not None:
+                claimed.append(job.id)
+            # Due at 30, 90, 120, 125, 130 and 150 s: the free job enqueued
+            # first has waited out its 120 s allowance and now goes ahead of
+            # newer paid and priority jobs, while the newer free one waits.
+            assert claimed == [priority, paid, old_free, late_priority, late_paid, new_free]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
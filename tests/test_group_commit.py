@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.bot_photo.db import Database
+
+
+async def _open(path: Path, group_commit_ms: float = 20) -> Database:
+    db = Database(path / "test.db", read_pool_size=2, group_commit_ms=group_commit_ms)
+    await db.connect()
+    await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    db.query_stats.reset()
+    return db
+
+
+def _commits(db: Database) -> int:
+    return sum(item.count for item in db.query_stats.summaries() if item.statement == "COMMIT")
+
+
+def test_concurrent_writes_share_one_commit(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            await asyncio.gather(
+                *(db.execute("INSERT INTO items(name) VALUES (?)", (f"item-{i}",)) for i in range(10))
+            )
+            assert await db.fetchval("SELECT COUNT(*) FROM items") == 10
+            assert _commits(db) == 1
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failing_statement_only_fails_its_caller(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            await db.execute("INSERT INTO items(name) VALUES ('taken')")
+            results = await asyncio.gather(
+                db.execute("INSERT INTO items(name) VALUES ('first')"),
+                db.execute("INSERT INTO items(name) VALUES ('taken')"),
+                db.execute("INSERT INTO items(name) VALUES ('second')"),
+                return_exceptions=True,
+            )
+            assert results[0] is None and results[2] is None
+            assert isinstance(results[1], sqlite3.IntegrityError)
+            rows = await db.fetchall("SELECT name FROM items ORDER BY id")
+            assert [row["name"] for row in rows] == ["taken", "first", "second"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_returning_rows_go_to_their_own_caller(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            rows = await asyncio.gather(
+                *(
+                    db.fetchone("INSERT INTO items(name) VALUES (?) RETURNING id, name", (f"row-{i}",))
+                    for i in range(5)
+                )
+            )
+            assert [row["name"] for row in rows] == [f"row-{i}" for i in range(5)]
+            assert len({row["id"] for row in rows}) == 5
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_without_group_commit_each_write_commits(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path, group_commit_ms=0)
+        try:
+            await db.execute("INSERT INTO items(name) VALUES ('a')")
+            with pytest.raises(sqlite3.IntegrityError):
+                await db.execute("INSERT INTO items(name) VALUES ('a')")
+            assert await db.fetchval("SELECT COUNT(*) FROM items") == 1
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from src.bot_photo.services.hedging import Hedger
+
+
+async def _value(value: str, delay: float = 0.0) -> str:
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail(delay: float = 0.0) -> str:
+    await asyncio.sleep(delay)
+    raise RuntimeError("upstream failed")
+
+
+async def _warm(hedger: Hedger) -> None:
+    """One instant primary: with ``min_samples=1`` the trigger becomes ~0."""
+    await hedger.run(lambda: _value("warm"), lambda: _value("unused"))
+
+
+def test_no_hedge_while_warming_up() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(min_samples=3)
+        for _ in range(2):
+            result = await hedger.run(lambda: _value("primary", 0.01), lambda: _value("backup"))
+            assert result == "primary"
+        stats = hedger.stats()
+        assert (stats.requests, stats.hedged, stats.trigger_ms) == (2, 0, None)
+
+    asyncio.run(scenario())
+
+
+def test_backup_wins_when_primary_is_slow() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(min_samples=1, budget=1.0)
+        await _warm(hedger)
+        result = await hedger.run(lambda: _value("primary", 1.0), lambda: _value("backup"))
+        assert result == "backup"
+        stats = hedger.stats()
+        assert (stats.hedged, stats.hedge_wins) == (1, 1)
+        # The losing primary is still sampled, so the trigger keeps up with it.
+        assert len(hedger._latencies) == 2
+
+    asyncio.run(scenario())
+
+
+def test_budget_caps_hedges() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(percentile=0.0, min_samples=1, budget=0.0, burst=1.0)
+        await _warm(hedger)
+        results = [
+            await hedger.run(lambda: _value("primary", 0.02), lambda: _value("backup"))
+            for _ in range(3)
+        ]
+        # The bucket starts with one token and earns none.
+        assert results == ["backup", "primary", "primary"]
+        stats = hedger.stats()
+        assert (stats.hedged, stats.budget_denied) == (1, 2)
+
+    asyncio.run(scenario())
+
+
+def test_budget_refills_per_request() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(percentile=0.0, min_samples=1, budget=0.5, burst=1.0)
+        await _warm(hedger)
+        for _ in range(4):
+            await hedger.run(lambda: _value("primary", 0.02), lambda: _value("backup"))
+        # Tokens: 1 after warm-up, then +0.5 per request and -1 per hedge.
+        assert hedger.stats().hedged == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_backup_falls_back_to_the_primary() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(min_samples=1, budget=1.0)
+        await _warm(hedger)
+        result = await hedger.run(lambda: _value("primary", 0.02), lambda: _fail())
+        assert result == "primary"
+        assert hedger.stats().hedge_wins == 0
+
+    asyncio.run(scenario())
+
+
+def test_primary_error_surfaces_when_both_fail() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(min_samples=1, budget=1.0)
+        await _warm(hedger)
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            await hedger.run(lambda: _fail(0.02), lambda: _fail())
+
+    asyncio.run(scenario())
+
+
+def test_loser_is_cancelled() -> None:
+    async def scenario() -> None:
+        hedger = Hedger(min_samples=1, budget=1.0)
+        await _warm(hedger)
+        cancelled = asyncio.Event()
+
+        async def slow_primary() -> str:
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "primary"
+
+        assert await hedger.run(slow_primary, lambda: _value("backup")) == "backup"
+        await asyncio.wait_for(cancelled.wait(), 1.0)
+
+    asyncio.run(scenario())
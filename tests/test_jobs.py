@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.repositories.jobs import JobRepository
+from src.bot_photo.repositories.payments import PaymentRepository
+from src.bot_photo.repositories.prompts import PromptRepository
+from src.bot_photo.repositories.users import UserRepository
+from src.bot_photo.services.generation_queue import PROMPT_JOB, GenerationQueue
+from src.bot_photo.services.tokens import TokenService
+
+USER = 1
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.calls.append(("send_message", {"chat_id": chat_id, "text": text}))
+
+    async def edit_message_text(self, text: str, *, chat_id: int, message_id: int) -> None:
+        self.calls.append(("edit_message_text", {"chat_id": chat_id, "message_id": message_id}))
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "test.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    await db.execute(
+        "INSERT OR IGNORE INTO users(telegram_id, username, full_name, tokens) "
+        "VALUES (?, 'u', 'User', 0)",
+        (USER,),
+    )
+    return db
+
+
+async def _enqueue(jobs: JobRepository, due_at: int, **payload: Any) -> int:
+    job = await jobs.enqueue(PROMPT_JOB, 0, USER, USER, payload, priority=1, due_at=due_at)
+    return job.id
+
+
+def test_claim_takes_the_earliest_due_job(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            jobs = JobRepository(db)
+            late = await _enqueue(jobs, 3000)
+            first_tie = await _enqueue(jobs, 1000, prompt="a")
+            second_tie = await _enqueue(jobs, 1000)
+
+            job = await jobs.claim()
+            assert job is not None
+            assert (job.id, job.status, job.attempts, job.payload) == (
+                first_tie,
+                "running",
+                1,
+                {"prompt": "a"},
+            )
+            rest = [await jobs.claim(), await jobs.claim()]
+            assert [job.id for job in rest if job] == [second_tie, late]
+            assert await jobs.claim() is None
+            # Running jobs stay in the table until they are completed.
+            assert await jobs.count_pending() == 3
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_claims_never_share_a_job(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            jobs = JobRepository(db)
+            queued = {await _enqueue(jobs, due_at) for due_at in range(3)}
+            claimed = await asyncio.gather(*(jobs.claim() for _ in range(5)))
+            ids = [job.id for job in claimed if job is not None]
+            assert sorted(ids) == sorted(queued)
+            assert claimed.count(None) == 2
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_running_jobs_are_requeued_after_a_restart(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        jobs = JobRepository(db)
+        job_id = await _enqueue(jobs, 0)
+        await _enqueue(jobs, 1)
+        await jobs.claim()
+        await db.close()
+
+        db = await _open(tmp_path)
+        try:
+            jobs = JobRepository(db)
+            assert await jobs.requeue_running() == 1
+            assert await jobs.requeue_running() == 0
+            job = await jobs.claim()
+            assert job is not None
+            assert (job.id, job.attempts) == (job_id, 2)
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_released_job_keeps_its_error_and_runs_again(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            jobs = JobRepository(db)
+            job_id = await _enqueue(jobs, 0)
+            await jobs.claim()
+            await jobs.release(job_id, "RuntimeError('boom')")
+            job = await jobs.claim()
+            assert job is not None
+            assert (job.id, job.attempts, job.last_error) == (job_id, 2, "RuntimeError('boom')")
+            assert await jobs.set_status_message(job_id, 77)
+            assert await jobs.complete(job_id) == 77
+            assert await jobs.count_pending() == 0
+            assert not await jobs.set_status_message(job_id, 78)
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_job_out_of_attempts_is_refunded_and_failed(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            jobs = JobRepository(db)
+            prompts = PromptRepository(db)
+            bot = FakeBot()
+            queue = GenerationQueue(
+                bot,  # type: ignore[arg-type]
+                db,
+                jobs,
+                sessions=None,  # type: ignore[arg-type]
+                prompts=prompts,
+                faces=None,  # type: ignore[arg-type]
+                tokens=TokenService(UserRepository(db)),
+                examples=None,  # type: ignore[arg-type]
+                files=None,  # type: ignore[arg-type]
+                client=None,  # type: ignore[arg-type]
+                payments=PaymentRepository(db),
+                priority_min_tokens=None,
+                max_attempts=2,
+            )
+            record = await prompts.create(USER, "p", None, "queued", 3)
+            job = await queue.enqueue(PROMPT_JOB, record.id, USER, USER, {"cost": 3, "prompt": "p"})
+            await jobs.set_status_message(job.id, 55)
+            # Interrupted twice by a restart; the third claim gives up.
+            for _ in range(2):
+                await jobs.claim()
+                await jobs.requeue_running()
+            claimed = await jobs.claim()
+            assert claimed is not None and claimed.attempts == 3
+            await queue._process(claimed)
+
+            assert await db.fetchval("SELECT tokens FROM users WHERE telegram_id=?", (USER,)) == 3
+            assert await db.fetchval(
+                "SELECT status FROM prompt_generations WHERE id=?", (record.id,)
+            ) == "failed"
+            assert await jobs.count_pending() == 0
+            assert bot.calls == [("edit_message_text", {"chat_id": USER, "message_id": 55})]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from src.bot_photo.services.json_stream import Base64File, InlineImageScanner, iter_json
+
+IMAGE = os.urandom(1000)
+SECOND_IMAGE = os.urandom(300)
+
+
+def _response() -> bytes:
+    first = base64.b64encode(IMAGE).decode("ascii")
+    second = base64.b64encode(SECOND_IMAGE).decode("ascii")
+    body = {
+        "candidates": [
+            {
+                "content": {
+                    "parts": [
+                        {"text": 'A "quoted" caption \\ with escapes'},
+                        {"inlineData": {"mimeType": "image/png", "data": first}},
+                        {"inline_data": {"mime_type": "image/jpeg", "data": second}},
+                    ]
+                }
+            }
+        ],
+        "usageMetadata": {"totalTokenCount": 42},
+    }
+    # JSON may escape "/", which is a base64 character.
+    return json.dumps(body).replace("/", "\\/").encode("ascii")
+
+
+def _scan(body: bytes, chunk_size: int) -> tuple[InlineImageScanner, bytes]:
+    scanner = InlineImageScanner()
+    image = b"".join(
+        scanner.feed(body[start : start + chunk_size]) for start in range(0, len(body), chunk_size)
+    )
+    return scanner, image
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 7, 64, 1000, 1 << 20])
+def test_first_image_is_decoded_at_any_chunk_boundary(chunk_size: int) -> None:
+    body = _response()
+    scanner, image = _scan(body, chunk_size)
+    assert image == IMAGE
+    assert scanner.found and scanner.size == len(IMAGE)
+    assert scanner.mime_type == "image/png"
+    result = scanner.result()
+    parts = result["candidates"][0]["content"]["parts"]
+    assert parts[0]["text"] == 'A "quoted" caption \\ with escapes'
+    assert parts[1]["inlineData"] == {"mimeType": "image/png", "data": ""}
+    assert parts[2]["inline_data"]["data"] == ""
+    assert result["usageMetadata"] == {"totalTokenCount": 42}
+
+
+def test_every_split_of_a_small_body() -> None:
+    body = json.dumps({"inline_data": {"mime_type": "image/webp", "data": "aGVsbG8\\/"}}).encode()
+    for cut in range(1, len(body)):
+        scanner = InlineImageScanner()
+        image = scanner.feed(body[:cut]) + scanner.feed(body[cut:])
+        assert image == base64.b64decode("aGVsbG8/")
+        assert scanner.mime_type == "image/webp"
+
+
+def test_unpadded_base64_is_completed() -> None:
+    data = base64.b64encode(b"abcd").decode().rstrip("=")
+    scanner = InlineImageScanner()
+    assert scanner.feed(json.dumps({"inline_data": {"data": data}}).encode()) == b"abcd"
+
+
+def test_body_without_image() -> None:
+    scanner, image = _scan(json.dumps({"candidates": [{"finishReason": "SAFETY"}]}).encode(), 3)
+    assert image == b"" and not scanner.found
+    assert scanner.result() == {"candidates": [{"finishReason": "SAFETY"}]}
+
+
+def test_truncated_body_fails_in_result() -> None:
+    body = _response()
+    scanner, _ = _scan(body[: len(body) // 2], 64)
+    with pytest.raises(ValueError):
+        scanner.result()
+
+
+def test_iter_json_matches_json_dumps(tmp_path: Path) -> None:
+    path = tmp_path / "face.jpg"
+    path.write_bytes(IMAGE)
+
+    def payload(data: object) -> dict[str, object]:
+        return {"contents": [{"parts": [{"text": "x" * 300}, {"inline_data": {"data": data}}]}]}
+
+    async def collect() -> bytes:
+        streamed = payload(Base64File(path, len(IMAGE)))
+        return b"".join([chunk async for chunk in iter_json(streamed, chunk_size=64)])
+
+    expected = json.dumps(payload(base64.b64encode(IMAGE).decode("ascii")))
+    assert asyncio.run(collect()) == expected.encode()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from src.bot_photo.db import Database, MaintenanceScheduler, MigrationRunner
+
+
+async def _pragma(db: Database, name: str) -> int:
+    async with db.writer() as conn:
+        async with conn.execute(f"PRAGMA {name}") as cursor:
+            row = await cursor.fetchone()
+    return int(row[0])
+
+
+def test_migrations_enable_incremental_auto_vacuum(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = Database(tmp_path / "test.db")
+        await db.connect()
+        try:
+            assert 11 in await MigrationRunner(db).run()
+            assert await _pragma(db, "auto_vacuum") == 2
+            # Recorded like any other migration, so the VACUUM runs once.
+            assert await MigrationRunner(db).run() == []
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_optimize_reclaims_pages_after_bulk_delete(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = Database(tmp_path / "test.db")
+        await db.connect()
+        try:
+            await MigrationRunner(db).run()
+            await db.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, body TEXT)")
+            async with db.transaction():
+                for _ in range(2000):
+                    await db.execute("INSERT INTO blobs(body) VALUES (?)", ("x" * 1000,))
+            await db.execute("DELETE FROM blobs")
+            free_before = await _pragma(db, "freelist_count")
+            pages_before = await _pragma(db, "page_count")
+            assert free_before > 300
+
+            maintenance = MaintenanceScheduler(db, vacuum_pages=300)
+            await maintenance.optimize()
+
+            assert await _pragma(db, "freelist_count") == free_before - 300
+            assert await _pragma(db, "page_count") == pages_before - 300
+            assert maintenance.stats.vacuumed_pages == 300
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.db.migrator import MIGRATIONS_DIR
+
+
+def _epoch_ms(value: str) -> int:
+    parsed = datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    return round(parsed.timestamp() * 1000)
+
+
+async def _baseline(path: Path) -> Database:
+    """A database as it looked before timestamps moved to epoch milliseconds."""
+    directory = path / "baseline"
+    directory.mkdir()
+    for migration in sorted(MIGRATIONS_DIR.glob("*.sql"))[:2]:
+        shutil.copy(migration, directory)
+    db = Database(path / "test.db")
+    await db.connect()
+    assert await MigrationRunner(db, directory).run() == [1, 2]
+    async with db.transaction():
+        await db.execute(
+            """
+            INSERT INTO users(telegram_id, username, tokens, last_seen_at, agreement_accepted_at)
+            VALUES (1, 'u', 5, '2024-01-02 03:04:05', '2024-01-02 03:04:05.250'),
+                   (2, 'v', 0, 'not a date', NULL)
+            """
+        )
+        for created_at in ("2024-03-01 12:00:00", "garbage", "2024-03-02 12:00:00"):
+            await db.execute(
+                "INSERT INTO sessions(user_id, style, status, created_at, updated_at) "
+                "VALUES (1, 's', 'ready', ?, ?)",
+                (created_at, created_at),
+            )
+        await db.execute("DELETE FROM sessions WHERE id=3")
+    return db
+
+
+def test_text_timestamps_become_epoch_ms(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _baseline(tmp_path)
+        try:
+            started = round(datetime.now(timezone.utc).timestamp() * 1000)
+            applied = await MigrationRunner(db).run()
+            assert applied == list(range(3, MigrationRunner(db).discover()[-1].version + 1))
+
+            users = await db.fetchall(
+                "SELECT telegram_id, tokens, last_seen_at, agreement_accepted_at "
+                "FROM users ORDER BY telegram_id"
+            )
+            assert [tuple(row.values()) for row in users] == [
+                (1, 5, _epoch_ms("2024-01-02 03:04:05"), _epoch_ms("2024-01-02 03:04:05.250")),
+                (2, 0, None, None),
+            ]
+            sessions = await db.fetchall("SELECT id, created_at, updated_at FROM sessions ORDER BY id")
+            assert tuple(sessions[0].values()) == (
+                1,
+                _epoch_ms("2024-03-01 12:00:00"),
+                _epoch_ms("2024-03-01 12:00:00"),
+            )
+            # Unparseable values in NOT NULL columns fall back to the migration time.
+            assert sessions[1]["id"] == 2
+            assert started <= sessions[1]["created_at"] <= started + 60_000
+            assert await db.fetchval("SELECT COUNT(*) FROM sessions") == 2
+
+            # The AUTOINCREMENT counter survived the rebuild: id 3 is not reused.
+            await db.execute("INSERT INTO sessions(user_id, style, status) VALUES (1, 's', 'ready')")
+            assert await db.fetchval("SELECT MAX(id) FROM sessions") == 4
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_second_run_is_a_no_op(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _baseline(tmp_path)
+        try:
+            runner = MigrationRunner(db)
+            await runner.run()
+            version = await runner.current_version()
+            snapshot = await db.fetchall("SELECT * FROM users ORDER BY telegram_id")
+            assert await MigrationRunner(db).run() == []
+            assert await runner.current_version() == version == runner.discover()[-1].version
+            assert await db.fetchall("SELECT * FROM users ORDER BY telegram_id") == snapshot
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
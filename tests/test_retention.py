@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.db.retention import RetentionEngine, RetentionPolicy
+
+_DAY_MS = 86_400_000
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "test.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    await db.execute(
+        "INSERT INTO users(telegram_id, username, full_name, tokens) VALUES (1, 'u', 'User', 0)"
+    )
+    return db
+
+
+async def _add_sessions(db: Database, count: int, age_days: int, prompt: str = "p") -> None:
+    async with db.transaction():
+        for _ in range(count):
+            await db.execute(
+                """
+                INSERT INTO sessions(user_id, style, prompt, status, created_at)
+                VALUES (1, 'style', ?, 'ready',
+                        CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER) - ?)
+                """,
+                (prompt, age_days * _DAY_MS),
+            )
+
+
+def _engine(db: Database, path: Path) -> RetentionEngine:
+    return RetentionEngine(
+        db,
+        [RetentionPolicy("sessions", 30, archive=True)],
+        archive_path=path / "archive.db",
+        batch_size=50,
+        pause_ms=0,
+    )
+
+
+def test_expired_rows_move_to_the_archive(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            await _add_sessions(db, 120, age_days=40)
+            await _add_sessions(db, 5, age_days=1)
+            report = await _engine(db, tmp_path).run_once()
+            assert report.deleted == 120
+            assert report.tables[0].batches == 3
+            assert await db.fetchval("SELECT COUNT(*) FROM sessions") == 5
+        finally:
+            await db.close()
+        with sqlite3.connect(tmp_path / "archive.db") as archive:
+            assert archive.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 120
+
+    asyncio.run(scenario())
+
+
+def test_archive_follows_columns_added_to_the_hot_table(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        engine = _engine(db, tmp_path)
+        try:
+            await _add_sessions(db, 3, age_days=40, prompt="before")
+            await engine.run_once()
+            # A later migration adds a column the archive table doesn't have yet.
+            await db.execute("ALTER TABLE sessions ADD COLUMN rating INTEGER")
+            await _add_sessions(db, 2, age_days=40, prompt="after")
+            await db.execute("UPDATE sessions SET rating = 5")
+            await engine.run_once()
+        finally:
+            await db.close()
+        with sqlite3.connect(tmp_path / "archive.db") as archive:
+            rows = archive.execute("SELECT prompt, status, rating FROM sessions ORDER BY id").fetchall()
+        assert rows == [("before", "ready", None)] * 3 + [("after", "ready", 5)] * 2
+
+    asyncio.run(scenario())
+
+
+def test_run_hands_freed_pages_back(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            await _add_sessions(db, 1000, age_days=40, prompt="x" * 1000)
+            page_count = await db.fetchval("PRAGMA page_count")
+            report = await _engine(db, tmp_path).run_once()
+            assert report.freed_bytes > 0
+            assert await db.fetchval("PRAGMA freelist_count") == 0
+            assert await db.fetchval("PRAGMA page_count") < page_count
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
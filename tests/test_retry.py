@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from src.bot_photo.services import retry as retry_module
+from src.bot_photo.services.retry import Retrier, RetryPolicy
+
+
+class Transient(Exception):
+    def __init__(self, retry_after: float | None = None) -> None:
+        super().__init__("transient")
+        self.retry_after = retry_after
+
+
+class Fatal(Exception):
+    pass
+
+
+def _classify(exc: BaseException) -> str | None:
+    return "transient" if isinstance(exc, Transient) else None
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    return getattr(exc, "retry_after", None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    recorded: list[float] = []
+
+    async def fake_sleep(delay: float) -> None:
+        recorded.append(delay)
+
+    monkeypatch.setattr(retry_module.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def _flaky(errors: list[Exception]):
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return call, lambda: calls
+
+
+def test_delay_uses_full_jitter_under_the_cap() -> None:
+    policy = RetryPolicy(base_delay=1.0, multiplier=2.0, max_delay=5.0)
+    for retry in range(1, 6):
+        ceiling = min(2.0 ** (retry - 1), 5.0)
+        delays = [policy.delay(retry) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter spreads over the whole range rather than sitting at the cap.
+        assert min(delays) < ceiling / 4 and max(delays) > ceiling * 3 / 4
+
+
+def test_retry_after_overrides_backoff() -> None:
+    policy = RetryPolicy(base_delay=1.0)
+    assert policy.delay(1, retry_after=7.5) == 7.5
+    assert policy.delay(3, retry_after=-1) == 0.0
+
+
+def test_transient_errors_are_retried_until_success(sleeps: list[float]) -> None:
+    retrier = Retrier(RetryPolicy(max_attempts=3, base_delay=0.5), _classify, _retry_after)
+    call, calls = _flaky([Transient(), Transient()])
+    assert asyncio.run(retrier.run(call, retrier.deadline())) == "ok"
+    assert calls() == 3
+    assert len(sleeps) == 2
+    stats = retrier.stats
+    assert (stats.retries, stats.recovered, stats.reasons) == (2, 1, {"transient": 2})
+
+
+def test_unclassified_errors_are_raised_at_once(sleeps: list[float]) -> None:
+    retrier = Retrier(RetryPolicy(), _classify, _retry_after)
+    call, calls = _flaky([Fatal()])
+    with pytest.raises(Fatal):
+        asyncio.run(retrier.run(call, retrier.deadline()))
+    assert calls() == 1 and sleeps == []
+
+
+def test_attempts_are_capped(sleeps: list[float]) -> None:
+    retrier = Retrier(RetryPolicy(max_attempts=2), _classify, _retry_after)
+    call, calls = _flaky([Transient(), Transient(), Transient()])
+    with pytest.raises(Transient):
+        asyncio.run(retrier.run(call, retrier.deadline()))
+    assert calls() == 2
+    assert retrier.stats.exhausted == 1
+
+
+def test_server_retry_after_is_slept(sleeps: list[float]) -> None:
+    retrier = Retrier(RetryPolicy(max_attempts=2), _classify, _retry_after)
+    call, _ = _flaky([Transient(retry_after=3.0)])
+    asyncio.run(retrier.run(call, retrier.deadline()))
+    assert sleeps == [3.0]
+
+
+def test_retry_past_the_deadline_is_not_attempted(sleeps: list[float]) -> None:
+    retrier = Retrier(RetryPolicy(max_attempts=5), _classify, _retry_after)
+    call, calls = _flaky([Transient(retry_after=30.0)])
+    with pytest.raises(Transient):
+        asyncio.run(retrier.run(call, time.monotonic() + 10.0))
+    assert calls() == 1 and sleeps == []
+    assert retrier.stats.out_of_budget == 1
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.bot_photo.db import Database
+
+
+async def _open(path: Path) -> Database:
+    db = Database(path / "test.db", read_pool_size=2, group_commit_ms=5)
+    await db.connect()
+    await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    return db
+
+
+async def _names(db: Database) -> list[str]:
+    rows = await db.fetchall("SELECT name FROM items ORDER BY id")
+    return [row["name"] for row in rows]
+
+
+def test_transaction_commits_all_statements(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            async with db.transaction():
+                await db.execute("INSERT INTO items(name) VALUES ('a')")
+                # Reads inside the block see the uncommitted write.
+                assert await db.fetchval("SELECT COUNT(*) FROM items") == 1
+                await db.execute("INSERT INTO items(name) VALUES ('b')")
+            assert await _names(db) == ["a", "b"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    await db.execute("INSERT INTO items(name) VALUES ('a')")
+                    raise RuntimeError("boom")
+            assert await _names(db) == []
+            assert not db.in_transaction
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_nested_block_rolls_back_to_its_savepoint(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            async with db.transaction():
+                await db.execute("INSERT INTO items(name) VALUES ('outer')")
+                with pytest.raises(RuntimeError):
+                    async with db.transaction():
+                        await db.execute("INSERT INTO items(name) VALUES ('inner')")
+                        raise RuntimeError("boom")
+                async with db.transaction():
+                    async with db.transaction():
+                        await db.execute("INSERT INTO items(name) VALUES ('deep')")
+            assert await _names(db) == ["outer", "deep"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_after_transaction_runs_once_the_outer_block_exits(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        calls: list[str] = []
+        try:
+            db.after_transaction(lambda: calls.append("immediate"))
+            assert calls == ["immediate"]
+            async with db.transaction():
+                db.after_transaction(lambda: calls.append("committed"))
+                async with db.transaction():
+                    db.after_transaction(lambda: calls.append("nested"))
+                assert calls == ["immediate"]
+            assert calls == ["immediate", "committed", "nested"]
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    db.after_transaction(lambda: calls.append("rolled back"))
+                    raise RuntimeError("boom")
+            assert calls[-1] == "rolled back"
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_other_tasks_wait_for_the_transaction(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path)
+        try:
+            async with db.transaction():
+                await db.execute("INSERT INTO items(name) VALUES ('first')")
+                other = asyncio.create_task(db.execute("INSERT INTO items(name) VALUES ('second')"))
+                await asyncio.sleep(0.05)
+                assert not other.done()
+            await other
+            assert await _names(db) == ["first", "second"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
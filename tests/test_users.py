@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.bot_photo.db import Database, MigrationRunner
+from src.bot_photo.repositories import users as users_module
+from src.bot_photo.repositories.users import UserRepository
+
+_SEEN_AT = 1_700_000_000_000
+
+
+async def _open(path: Path, *user_ids: int) -> Database:
+    db = Database(path / "test.db")
+    await db.connect()
+    await MigrationRunner(db).run()
+    for user_id in user_ids:
+        await db.execute(
+            "INSERT INTO users(telegram_id, username, full_name, tokens) VALUES (?, 'u', 'User', 10)",
+            (user_id,),
+        )
+    return db
+
+
+def test_reads_are_served_from_the_cache(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path, 1)
+        try:
+            users = UserRepository(db)
+            first = await users.get_by_id(1)
+            assert first is not None and first.tokens == 10
+            assert await users.get_by_id(1) is first
+            assert await users.get_by_id(2) is None
+            # Unknown users are not cached, so they are looked up again.
+            assert await users.get_by_id(2) is None
+            stats = users.cache_stats()
+            assert (stats.size, stats.hits, stats.misses) == (1, 1, 3)
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_writes_refresh_the_cached_user(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path, 1)
+        try:
+            users = UserRepository(db)
+            await users.get_by_id(1)
+            assert await users.update_tokens(1, -3) == 7
+            cached = await users.get_by_id(1)
+            assert cached is not None and cached.tokens == 7
+            assert users.cache_stats().hits == 1
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_update_inside_a_transaction_invalidates_the_cache(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path, 1)
+        try:
+            users = UserRepository(db)
+            await users.get_by_id(1)
+            async with db.transaction():
+                assert await users.update_tokens(1, 5) == 15
+                # The cache is bypassed, so the balance check sees the write.
+                inside = await users.get_by_id(1)
+                assert inside is not None and inside.tokens == 15
+            assert users.cache_stats().size == 0
+            after = await users.get_by_id(1)
+            assert after is not None and after.tokens == 15
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_rolled_back_update_leaves_no_stale_user(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        db = await _open(tmp_path, 1)
+        try:
+            users = UserRepository(db)
+            await users.get_by_id(1)
+            with pytest.raises(RuntimeError):
+                async with db.transaction():
+                    await users.update_tokens(1, 5)
+                    raise RuntimeError("abort")
+            user = await users.get_by_id(1)
+            assert user is not None and user.tokens == 10
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_flush_last_seen_writes_marks_in_batches(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(users_module, "_SEEN_BATCH", 2)
+    clock = [_SEEN_AT]
+    monkeypatch.setattr(users_module, "now_ms", lambda: clock[0])
+
+    async def scenario() -> None:
+        db = await _open(tmp_path, 1, 2, 3, 4)
+        try:
+            users = UserRepository(db)
+            untouched = await db.fetchval("SELECT last_seen_at FROM users WHERE telegram_id=4")
+            for user_id in (1, 2, 3):
+                users.mark_seen(user_id)
+            clock[0] += 1000
+            users.mark_seen(1)
+            assert await users.flush_last_seen() == 3
+            rows = await db.fetchall("SELECT telegram_id, last_seen_at FROM users ORDER BY telegram_id")
+            assert [(row["telegram_id"], row["last_seen_at"]) for row in rows] == [
+                (1, _SEEN_AT + 1000),
+                (2, _SEEN_AT),
+                (3, _SEEN_AT),
+                (4, untouched),
+            ]
+            # The pending marks were cleared by the flush.
+            assert await users.flush_last_seen() == 0
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())